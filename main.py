@@ -1,10 +1,14 @@
 """."""
-from dataclasses import dataclass
+import os
+import sys
+import threading
 import tkinter as tk
 import customtkinter as ctk
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy import create_engine, Column, TEXT, REAL
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "structural_loads"))
+
+from project_model import BackgroundEngine
+from reference_data import get_reference_data
 
 
 class App(ctk.CTk):
@@ -27,6 +31,28 @@ class App(ctk.CTk):
         self.loads_tabview.add("W")
         self.loads_tabview.add("E")
 
+        self.engine = BackgroundEngine()
+        self.protocol("WM_DELETE_WINDOW", self.close)
+        self.after(100, self.poll_results)
+
+    def poll_results(self):
+        """Affiche les résultats calculés en arrière-plan, sans bloquer l'interface."""
+
+        changed, errors = self.engine.poll()
+        if "dead" in changed or "dead" in errors:
+            text = f"D = {changed.get('dead')} kPa"
+            if "dead" in errors:
+                text = str(errors["dead"])
+            self.dead_label.configure(text=text)
+
+        self.after(100, self.poll_results)
+
+    def close(self):
+        """Arrête le calcul en arrière-plan et ferme l'application."""
+
+        self.engine.close()
+        self.destroy()
+
     def set_window_geometry(self):
         """Ajuste les dimensions et position de la fenêtre de l'application."""
 
@@ -49,6 +75,9 @@ class App(ctk.CTk):
         self.output_frame.pack(padx=5, pady=5, side="left", fill="both")
         vertical_line = ctk.CTkFrame(self.output_frame, width=5, height=600)
         vertical_line.pack(padx=5, pady=5, fill="y")
+        self.dead_label = ctk.CTkLabel(self.output_frame, text="D = 0 kPa")
+        self.dead_label.pack(padx=5, pady=5)
+        self.materials = []
 
         add_element_button = ctk.CTkButton(
             self.input_frame,
@@ -57,12 +86,13 @@ class App(ctk.CTk):
         )
         add_element_button.pack(padx=5, pady=5, ipady=30, fill="x")
 
-        add_material_button = ctk.CTkButton(
+        self.add_material_button = ctk.CTkButton(
             self.input_frame,
             text="Ajouter matériau",
             command=self.add_material,
+            state="disabled",
         )
-        add_material_button.pack(padx=5, pady=5, ipady=30, fill="x")
+        self.add_material_button.pack(padx=5, pady=5, ipady=30, fill="x")
 
         horizontal_line = ctk.CTkFrame(self.input_frame, width=300, height=5)
         horizontal_line.pack(padx=5, pady=5)
@@ -75,22 +105,56 @@ class App(ctk.CTk):
         )
         element_name_entry.pack(padx=5, pady=5, anchor="w")
 
+        self.load_categories()
+
+    def load_categories(self):
+        """Charge les catégories et matériaux de loads.db en arrière-plan."""
+
+        self.loading_bar = ctk.CTkProgressBar(self.input_frame, mode="indeterminate")
+        self.loading_bar.pack(padx=5, pady=5, fill="x")
+        self.loading_bar.start()
+
+        self.categories = {}
+        self.loading_error = None
+        loader = threading.Thread(target=self._read_categories, daemon=True)
+        loader.start()
+        self.after(50, self.wait_categories, loader)
+
+    def _read_categories(self):
+        """Lecture de loads.db, exécutée hors du fil de l'interface.
+        Une erreur est conservée pour être affichée par le fil de l'interface.
+        """
+
+        try:
+            self.categories = get_reference_data().refresh().categories
+        except Exception as error:
+            self.loading_error = error
+
+    def wait_categories(self, loader):
+        """Affiche les listes dès que le chargement est terminé, ou l'erreur de chargement.
+        Le bouton "Ajouter matériau" reste désactivé tant que la liste des matériaux n'existe pas.
+        """
+
+        if loader.is_alive():
+            self.after(50, self.wait_categories, loader)
+            return
+
+        self.loading_bar.stop()
+        self.loading_bar.destroy()
+        if self.loading_error is not None:
+            error_label = ctk.CTkLabel(
+                self.input_frame,
+                text=f"Chargement de loads.db impossible: {self.loading_error}",
+                wraplength=300,
+            )
+            error_label.pack(padx=5, pady=5, fill="x")
+            return
+
         self.select_category()
+        self.add_material_button.configure(state="normal")
 
     def select_category(self):
-        @dataclass
-        class DeadLoadsTable(declarative_base()):
-            __tablename__ = "dead_loads"
-            category: str = Column("category", TEXT)
-            material: str = Column("material", TEXT, primary_key=True)
-            session = sessionmaker(create_engine("sqlite:///loads.db"))()
-
-        category_list = []
-        categories = DeadLoadsTable.session.query(DeadLoadsTable.category).all()
-        for i in categories:
-            for j in i:
-                if j not in category_list:
-                    category_list.append(j)
+        category_list = list(self.categories)
 
         category_combobox = ctk.CTkComboBox(
             self.input_frame,
@@ -108,23 +172,7 @@ class App(ctk.CTk):
             self.is_material = False
         self.is_material = True
 
-        @dataclass
-        class DeadLoadsTable(declarative_base()):
-            __tablename__ = "dead_loads"
-            category: str = Column("category", TEXT)
-            material: str = Column("material", TEXT, primary_key=True)
-            session = sessionmaker(create_engine("sqlite:///loads.db"))()
-
-        material_list = []
-        materials = (
-            DeadLoadsTable.session.query(DeadLoadsTable.material)
-            .filter(DeadLoadsTable.category == str(category))
-            .all()
-        )
-        for i in materials:
-            for j in i:
-                if j not in material_list:
-                    material_list.append(j)
+        material_list = self.categories.get(str(category), [])
 
         self.material_combobox = ctk.CTkComboBox(self.input_frame, values=material_list)
         self.material_combobox.pack(padx=5, pady=5, fill="x")
@@ -135,9 +183,10 @@ class App(ctk.CTk):
         pass
 
     def add_material(self):
-        """Créer un nouvel élément structural."""
+        """Ajoute le matériau choisi à l'élément structural."""
 
-        pass
+        self.materials.append(self.material_combobox.get())
+        self.engine.set("materials", tuple(self.materials))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,17 @@
+"""Point d'entrée de python -m structural_loads (voir cli.py)."""
+
+# IMPORTS
+import os
+import sys
+
+# Les modules de structural_loads s'importent entre eux par leur nom (from dead_loads import ...).
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from cli import main  # pylint: disable=wrong-import-position
+
+
+# RUN FILE
+if __name__ == "__main__":
+    main()
+
+# END
@@ -0,0 +1,104 @@
+"""
+
+CNB 2020: Partie 4. Règles de calcul.
+Section 4.1. Charges et méthodes de calcul.
+-----------------------------------------------
+
+Outils NumPy pour les calculs en lot.
+
+    Les calculs en lot doivent donner exactement les mêmes résultats que les classes scalaires.
+    np.exp, np.power et np.round peuvent différer au dernier bit de math.exp, de ** et de round();
+    ces fonctions reproduisent le comportement de la bibliothèque standard.
+____________________________________________________________________________________________________
+
+
+    auteur: GabPoulin
+    email: poulin33@me.com
+
+====================================================================================================
+"""
+
+# IMPORTS
+from itertools import repeat
+from math import exp
+
+
+# CODE
+def exact_exp(values):
+    """Exponentielle identique à math.exp (np.exp peut différer au dernier bit)."""
+
+    import numpy as np
+
+    values = np.asarray(values, dtype=float)
+
+    return np.fromiter(map(exp, values.ravel().tolist()), float, values.size).reshape(
+        values.shape
+    )
+
+
+def exact_power(values, exponent):
+    """Puissance identique à ** (np.power et np.sqrt peuvent différer au dernier bit)."""
+
+    import numpy as np
+
+    values = np.asarray(values, dtype=float)
+
+    return np.fromiter(
+        map(pow, values.ravel().tolist(), repeat(exponent)), float, values.size
+    ).reshape(values.shape)
+
+
+def exact_round(values, digits):
+    """Arrondi identique à round() (np.round peut différer lorsque la valeur est à mi-chemin)."""
+
+    import numpy as np
+
+    values = np.asarray(values, dtype=float)
+    rounded = np.array(np.round(values, digits))
+    scaled = values * 10**digits
+    ties = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+    rounded[ties] = [round(value, digits) for value in values[ties].tolist()]
+
+    return rounded
+
+
+# TESTS
+def tests():
+    """Tests pour exact_exp, exact_power et exact_round."""
+
+    import numpy as np
+
+    print("------START_TESTS------")
+
+    values = np.linspace(-5, 5, 10001)
+    test_exact_exp = exact_exp(values).tolist()
+    expected_result = [exp(value) for value in values.tolist()]
+    if test_exact_exp != expected_result:
+        print("test_exact_exp -> FAILED")
+    else:
+        print("test_exact_exp -> PASSED")
+
+    values = np.linspace(0.0002, 1, 10001)
+    test_exact_power = exact_power(values, 0.5).tolist()
+    expected_result = [value**0.5 for value in values.tolist()]
+    if test_exact_power != expected_result:
+        print("test_exact_power -> FAILED")
+    else:
+        print("test_exact_power -> PASSED")
+
+    values = np.arange(0, 10, 0.005)
+    test_exact_round = exact_round(values, 2).tolist()
+    expected_result = [round(value, 2) for value in values.tolist()]
+    if test_exact_round != expected_result:
+        print("test_exact_round -> FAILED")
+    else:
+        print("test_exact_round -> PASSED")
+
+    print("-------END_TESTS-------")
+
+
+# RUN FILE
+if __name__ == "__main__":
+    tests()
+
+# END
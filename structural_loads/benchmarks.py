@@ -0,0 +1,195 @@
+"""
+
+CNB 2020: Partie 4. Règles de calcul.
+Section 4.1. Charges et méthodes de calcul.
+-----------------------------------------------
+
+Mesures de performance.
+
+    Chronomètre les calculateurs (DeadLoads, LiveLoads, SnowLoads et LimitStatesDesign):
+        1- Latence d'un appel, avec les données de référence à froid et à chaud.
+        2- Débit pour 10k, 100k et 1M appels.
+    Les mesures sont faites sur une copie de loads.db et enregistrées en JSON pour comparer les
+    versions entre elles.
+____________________________________________________________________________________________________
+
+
+    auteur: GabPoulin
+    email: poulin33@me.com
+
+====================================================================================================
+"""
+
+# IMPORTS
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+from contextlib import chdir, redirect_stdout
+from datetime import datetime, timezone
+from time import perf_counter, perf_counter_ns
+import numpy as np
+from dead_loads import DeadLoads
+from limit_state_design import LimitStatesDesign
+from live_loads import LiveLoads
+from database import DB_PATH, dispose
+from reference_data import clear_reference_data
+from snow_loads import SnowLoads
+
+
+# CODE
+FLOOR = [
+    "Bois de feuillus 20mm",
+    "É-P-S 19mm",
+    "2x10 à 16po",
+    "Liens continus",
+    "Panneau de gypse 12mm",
+]
+GARAGE = "Garage (véhicules > 9000 kg)"
+DESIGN = LimitStatesDesign(dead=1.5, live=4.8, snow=2.6, wind=0.8, earthquake=0.5)
+
+CASES = {
+    "DeadLoads.sum_dead_loads": lambda: DeadLoads(FLOOR).sum_dead_loads(True, 2),
+    "LiveLoads.uniform_load": lambda: LiveLoads(GARAGE).uniform_load(10, 20),
+    "LiveLoads.concentrated_load": lambda: LiveLoads(GARAGE).concentrated_load(),
+    "SnowLoads.specified_load": lambda: SnowLoads("Gaspé", 5, 20, 10, 25).specified_load(),
+    "LimitStatesDesign.uls": DESIGN.uls,
+    "LimitStatesDesign.sls": DESIGN.sls,
+}
+SIZES = (10_000, 100_000, 1_000_000)
+
+
+def _single_call(func):
+    """Durée (s) d'un seul appel."""
+
+    start = perf_counter_ns()
+    func()
+
+    return (perf_counter_ns() - start) / 1e9
+
+
+def _latency(func, repeat):
+    """Latence médiane (s) d'un appel, données de référence à chaud."""
+
+    return statistics.median(_single_call(func) for _ in range(repeat))
+
+
+def _throughput(func, calls):
+    """Nombre d'appels par seconde pour une série de `calls` appels."""
+
+    start = perf_counter()
+    for _ in range(calls):
+        func()
+
+    return calls / (perf_counter() - start)
+
+
+def run_benchmarks(sizes=SIZES, repeat=1000, db_path=DB_PATH, cases=None):
+    """Chronomètre chaque calculateur sur une copie de loads.db.
+
+    Args:
+        sizes: Nombres d'appels pour les mesures de débit.
+        repeat: Nombre d'appels pour la latence médiane à chaud.
+        db_path: Fichier loads.db à copier.
+        cases: Noms des calculateurs à mesurer (tous par défaut).
+    Returns:
+        Rapport des mesures.
+    """
+
+    results = {}
+    with tempfile.TemporaryDirectory() as folder:
+        shutil.copy(db_path, os.path.join(folder, DB_PATH))
+        with chdir(folder), open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+            for name in cases or CASES:
+                func = CASES[name]
+                dispose()
+                clear_reference_data()
+                cold = _single_call(func)
+                results[name] = {
+                    "cold_latency_s": cold,
+                    "warm_latency_s": _latency(func, repeat),
+                    "throughput_per_s": {str(size): _throughput(func, size) for size in sizes},
+                }
+        dispose()
+        clear_reference_data()
+
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": sys.version.split()[0],
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "results": results,
+    }
+
+
+def main(argv=None):
+    """Point d'entrée: python benchmarks.py -o resultats.json"""
+
+    parser = argparse.ArgumentParser(description="Mesures de performance des calculateurs.")
+    parser.add_argument("-o", "--output", help="Fichier JSON de sortie (stdout par défaut).")
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES)
+    parser.add_argument("--repeat", type=int, default=1000)
+    parser.add_argument("--db", default=DB_PATH, help="Fichier loads.db à copier.")
+    parser.add_argument("--case", action="append", choices=list(CASES), dest="cases")
+    args = parser.parse_args(argv)
+
+    report = run_benchmarks(args.sizes, args.repeat, args.db, args.cases)
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(text + "\n")
+    else:
+        print(text)
+
+    return report
+
+
+# TESTS
+def tests():
+    """Tests pour run_benchmarks."""
+
+    print("------START_TESTS------")
+
+    report = run_benchmarks(sizes=(10, 100), repeat=10)
+    test_cases = sorted(report["results"])
+    expected_result = sorted(CASES)
+    if test_cases != expected_result:
+        print("test_cases -> FAILED")
+        print("result = ", test_cases)
+        print("expected = ", expected_result)
+    else:
+        print("test_cases -> PASSED")
+
+    test_sizes = sorted(report["results"]["SnowLoads.specified_load"]["throughput_per_s"])
+    expected_result = ["10", "100"]
+    if test_sizes != expected_result:
+        print("test_sizes -> FAILED")
+        print("result = ", test_sizes)
+        print("expected = ", expected_result)
+    else:
+        print("test_sizes -> PASSED")
+
+    test_json = json.loads(json.dumps(report)) == report
+    expected_result = True
+    if test_json != expected_result:
+        print("test_json -> FAILED")
+        print("result = ", test_json)
+        print("expected = ", expected_result)
+    else:
+        print("test_json -> PASSED")
+
+    print("-------END_TESTS-------")
+
+
+# RUN FILE
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        main()
+    else:
+        tests()
+
+# END
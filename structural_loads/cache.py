@@ -0,0 +1,334 @@
+"""
+
+CNB 2020: Partie 4. Règles de calcul.
+Section 4.1. Charges et méthodes de calcul.
+-----------------------------------------------
+
+Cache des résultats.
+
+    Les mêmes toits, planchers et assemblages reviennent des milliers de fois dans les projets:
+        1- La clé réunit les champs canoniques du calculateur (dataclass), la méthode appelée et
+           ses arguments, et la version des données de référence; le second niveau l'indexe par
+           son empreinte SHA-256.
+        2- Un cache LRU borné en mémoire, et au besoin un second niveau SQLite qui survit aux
+           redémarrages.
+        3- La version est l'empreinte SHA-256 de loads.db, recalculée seulement lorsque la date de
+           modification ou la taille du fichier change; les entrées d'une version antérieure sont
+           alors retirées des deux niveaux.
+    Le fichier SQLite contient des valeurs pickle: il ne doit provenir que de ce cache.
+____________________________________________________________________________________________________
+
+
+    auteur: GabPoulin
+    email: poulin33@me.com
+
+====================================================================================================
+"""
+
+# IMPORTS
+import hashlib
+import os
+import pickle
+import sqlite3
+import threading
+from collections import OrderedDict
+from dataclasses import fields, is_dataclass
+from operator import attrgetter
+from database import db_path
+from snapshot import db_fingerprint
+
+
+# CODE
+_SCALARS = frozenset((bool, int, float, str, type(None)))
+_field_getters = {}
+
+
+def canonical(value):
+    """Forme canonique et hachable d'un argument: dataclass en (type, champs), séquences et
+    dictionnaires en tuples. Deux dataclasses égales (==) donnent la même forme.
+    """
+
+    kind = type(value)
+    if kind in _SCALARS:
+        return value
+    if kind in (list, tuple):
+        return tuple(canonical(item) for item in value)
+
+    getter = _field_getters.get(kind)
+    if getter is None and is_dataclass(value) and not isinstance(value, type):
+        getter = attrgetter(*(field.name for field in fields(value)), "__class__")
+        _field_getters[kind] = getter
+    if getter is not None:
+        values = getter(value)[:-1]
+        if all(type(item) in _SCALARS for item in values):
+            return kind.__qualname__, values
+        return kind.__qualname__, tuple(canonical(item) for item in values)
+    if isinstance(value, dict):
+        return tuple(sorted((str(key), canonical(item)) for key, item in value.items()))
+    if hasattr(value, "tolist"):
+        return canonical(value.tolist())
+
+    raise TypeError(f"Argument non canonisable: {kind.__name__}")
+
+
+def cache_key(calculator, method, args=(), kwargs=None, version=""):
+    """Clé d'un appel calculator.method(*args, **kwargs) pour une version des données."""
+
+    return version, canonical(calculator), method, canonical(args), canonical(kwargs or {})
+
+
+def disk_key(key):
+    """Empreinte SHA-256 d'une clé, pour le second niveau."""
+
+    return hashlib.sha256(repr(key).encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """Cache des résultats des calculateurs.
+
+    Optional:
+        maxsize: Nombre maximal d'entrées en mémoire.
+        path: Fichier SQLite du second niveau (aucun par défaut).
+        source: Fichier loads.db dont dépend la validité des entrées (la base configurée dans
+            database par défaut).
+    """
+
+    def __init__(self, maxsize=4096, path=None, source=None):
+        self.maxsize = maxsize
+        self.path = path
+        self.source = source
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._entries = OrderedDict()
+        self._lock = threading.RLock()
+        self._stamp = None
+        self._version = None
+        self._connection = None
+        if path is not None:
+            self._connection = sqlite3.connect(path, check_same_thread=False)
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS results "
+                "(key TEXT PRIMARY KEY, version TEXT NOT NULL, value BLOB NOT NULL)"
+            )
+            self._connection.commit()
+
+    def version(self):
+        """Version des données de référence (empreinte de loads.db).
+        Un changement de contenu vide le cache en mémoire et retire les entrées périmées du disque.
+        """
+
+        path = self.source or db_path()
+        stat = os.stat(path)
+        stamp = path, stat.st_mtime_ns, stat.st_size
+        if stamp == self._stamp:
+            return self._version
+
+        with self._lock:
+            if stamp != self._stamp:
+                version = db_fingerprint(path)
+                if version != self._version:
+                    self._invalidate(version)
+                self._version = version
+                self._stamp = stamp
+
+        return self._version
+
+    def _invalidate(self, version):
+        if self._version is not None:
+            self.invalidations += 1
+        self._entries.clear()
+        if self._connection is not None:
+            self._connection.execute("DELETE FROM results WHERE version != ?", (version,))
+            self._connection.commit()
+
+    def get(self, key, default=None):
+        """Valeur en cache pour la clé (mémoire, puis disque), sinon default."""
+
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+
+            if self._connection is not None:
+                row = self._connection.execute(
+                    "SELECT value FROM results WHERE key = ? AND version = ?",
+                    (disk_key(key), self._version),
+                ).fetchone()
+                if row is not None:
+                    value = pickle.loads(row[0])
+                    self._remember(key, value)
+                    self.hits += 1
+                    self.disk_hits += 1
+                    return value
+
+            self.misses += 1
+
+        return default
+
+    def put(self, key, value):
+        """Ajoute une valeur aux deux niveaux."""
+
+        with self._lock:
+            self._remember(key, value)
+            if self._connection is not None:
+                self._connection.execute(
+                    "INSERT OR REPLACE INTO results VALUES (?, ?, ?)",
+                    (disk_key(key), self._version, pickle.dumps(value, pickle.HIGHEST_PROTOCOL)),
+                )
+                self._connection.commit()
+
+    def _remember(self, key, value):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def call(self, calculator, method, *args, **kwargs):
+        """Résultat de calculator.method(*args, **kwargs), calculé au premier appel seulement.
+
+        Args:
+            calculator: Instance d'un calculateur (dataclass), par exemple SnowLoads(...).
+            method: Nom de la méthode, par exemple "specified_load".
+        """
+
+        key = cache_key(calculator, method, args, kwargs, self.version())
+        missing = object()
+        value = self.get(key, missing)
+        if value is missing:
+            value = getattr(calculator, method)(*args, **kwargs)
+            self.put(key, value)
+
+        return value
+
+    def clear(self):
+        """Vide les deux niveaux."""
+
+        with self._lock:
+            self._entries.clear()
+            if self._connection is not None:
+                self._connection.execute("DELETE FROM results")
+                self._connection.commit()
+
+    def close(self):
+        """Ferme le fichier SQLite."""
+
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def stats(self):
+        """Statistiques d'utilisation du cache."""
+
+        lookups = self.hits + self.misses
+
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "size": len(self._entries),
+            "hit_rate": self.hits / lookups if lookups else 0,
+        }
+
+
+# TESTS
+def tests():
+    """Tests pour la classe ResultCache."""
+
+    import shutil
+    import tempfile
+    from time import perf_counter
+    from dead_loads import DeadLoads, Layer
+    from live_loads import LiveLoads
+    from snow_loads import SnowLoads
+
+    print("------START_TESTS------")
+
+    cache = ResultCache(maxsize=2)
+    roof = SnowLoads("Gaspé", 5, 20, 10, 25)
+    first = cache.call(roof, "specified_load")
+    second = cache.call(SnowLoads("Gaspé", 5, 20, 10, 25), "specified_load")
+    cache.call(LiveLoads("Entrepôt"), "uniform_load", 15, 8)
+    cache.call(DeadLoads([Layer("Eau douce", 20)]), "sum_dead_loads", add_partitions=True)
+    cache.call(roof, "specified_load")
+    test_stats = first, second, cache.stats()["hits"], cache.stats()["evictions"]
+    expected_result = roof.specified_load(), roof.specified_load(), 1, 2
+    if test_stats != expected_result:
+        print("test_stats -> FAILED")
+        print("result = ", test_stats)
+        print("expected = ", expected_result)
+    else:
+        print("test_stats -> PASSED")
+
+    test_keys = (
+        cache_key(DeadLoads([("Eau douce", 20)]), "member_load")
+        == cache_key(DeadLoads([["Eau douce", 20]]), "member_load"),
+        cache_key(roof, "specified_load", version="a")
+        == cache_key(roof, "specified_load", version="b"),
+    )
+    expected_result = True, False
+    if test_keys != expected_result:
+        print("test_keys -> FAILED")
+        print("result = ", test_keys)
+        print("expected = ", expected_result)
+    else:
+        print("test_keys -> PASSED")
+
+    with tempfile.TemporaryDirectory() as folder:
+        source = os.path.join(folder, "loads.db")
+        shutil.copy(db_path(), source)
+        path = os.path.join(folder, "cache.sqlite")
+
+        cache = ResultCache(path=path, source=source)
+        expected_result = cache.call(LiveLoads("Entrepôt"), "uniform_load", 15, 8)
+        cache.close()
+        cache = ResultCache(path=path, source=source)
+        test_disk = cache.call(LiveLoads("Entrepôt"), "uniform_load", 15, 8), cache.disk_hits
+        if test_disk != (expected_result, 1):
+            print("test_disk -> FAILED")
+            print("result = ", test_disk)
+            print("expected = ", (expected_result, 1))
+        else:
+            print("test_disk -> PASSED")
+
+        with sqlite3.connect(source) as connection:
+            connection.execute("CREATE TABLE IF NOT EXISTS cache_test (x INTEGER)")
+        cache.call(LiveLoads("Entrepôt"), "uniform_load", 15, 8)
+        rows = cache._connection.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+        test_invalidation = cache.invalidations, cache.misses, rows
+        expected_result = 1, 1, 1
+        if test_invalidation != expected_result:
+            print("test_invalidation -> FAILED")
+            print("result = ", test_invalidation)
+            print("expected = ", expected_result)
+        else:
+            print("test_invalidation -> PASSED")
+        cache.close()
+
+    cache = ResultCache()
+    repeat = 20000
+    options = {"case": 2, "upper_roof": 3, "parapet_height": 0.5}
+    start = perf_counter()
+    for _ in range(repeat):
+        cache.call(SnowLoads("Gaspé", 5, 40, 15, 25, **options), "specified_load")
+    cached = (perf_counter() - start) / repeat
+    start = perf_counter()
+    for _ in range(repeat):
+        SnowLoads("Gaspé", 5, 40, 15, 25, **options).specified_load()
+    live = (perf_counter() - start) / repeat
+    print(f"cache = {cached * 1e6:.2f} µs, SnowLoads = {live * 1e6:.2f} µs (toit à deux niveaux)")
+
+    print("-------END_TESTS-------")
+
+
+# RUN FILE
+if __name__ == "__main__":
+    tests()
+
+# END
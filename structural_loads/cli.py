@@ -0,0 +1,332 @@
+"""
+
+CNB 2020: Partie 4. Règles de calcul.
+Section 4.1. Charges et méthodes de calcul.
+-----------------------------------------------
+
+Ligne de commande.
+
+    Calcule D, L, S et les combinaisons ÉLU/ÉLTS à partir d'un fichier JSON ou CSV, sans
+    interface graphique:
+        python -m structural_loads projets.json
+        python -m structural_loads projets.csv --format csv -o resultats.csv
+        python -m structural_loads projets.json --db /chemin/vers/loads.db
+        python -m structural_loads projets.json --snapshot loads.snapshot
+
+    Chaque projet est un dictionnaire à un seul niveau (une ligne du CSV):
+        D: dead, ou materials (liste, ou "mat1;mat2:épaisseur" en CSV), add_partitions,
+           additional_loads.
+        L: live, ou use, width, length, reinforced_slab.
+        S: snow, ou location, roof_height, roof_larger_dimension, roof_smaller_dimension, slope et
+           les options de SnowLoads.
+        Combinaisons: wind, earthquake, h_s, counter_d, liquid_l, storage_area, exterior_area,
+           car_access.
+        importance s'applique à L et à S.
+        id (facultatif, le rang du projet par défaut) est reporté dans la ligne de résultat.
+    L'erreur d'un projet est rapportée dans la colonne error de sa ligne sans arrêter les autres.
+    --snapshot lit les tables de référence dans l'instantané compilé (voir snapshot.py) au lieu
+    de charger loads.db par SQLAlchemy.
+____________________________________________________________________________________________________
+
+
+    auteur: GabPoulin
+    email: poulin33@me.com
+
+====================================================================================================
+"""
+
+# IMPORTS
+import argparse
+import csv
+import io
+import json
+import sys
+from dataclasses import fields
+from database import DB_PATH, configure
+from dead_loads import DeadLoads
+from limit_state_design import LimitStatesDesign
+from live_loads import LiveLoads
+from snow_loads import SnowLoads
+
+
+# CODE
+SNOW_FIELDS = {field.name for field in fields(SnowLoads)}
+DESIGN_FLAGS = ("h_s", "counter_d", "liquid_l", "storage_area", "exterior_area", "car_access")
+OUTPUT_FIELDS = ("id", "dead", "live", "snow", "wind", "earthquake", "uls", "sls", "error")
+
+
+def _parse_value(value):
+    """Convertit une cellule CSV en booléen, nombre ou texte (None si vide)."""
+
+    value = value.strip()
+    if value == "":
+        return None
+    if value.lower() in ("true", "vrai", "oui"):
+        return True
+    if value.lower() in ("false", "faux", "non"):
+        return False
+    try:
+        return float(value)
+    except ValueError:
+        return value
+
+
+def _parse_materials(value):
+    """Convertit "mat1;mat2:épaisseur" en liste de matériaux et de paires (matériau, épaisseur)."""
+
+    materials = []
+    for item in value.split(";"):
+        name, _, thickness = item.strip().rpartition(":")
+        if name and _parse_value(thickness) is not None:
+            materials.append((name, float(thickness)))
+        elif item.strip():
+            materials.append(item.strip())
+
+    return materials
+
+
+def read_projects(file, file_format="json"):
+    """Lit les projets d'un fichier JSON (objet ou liste d'objets) ou CSV."""
+
+    if file_format == "csv":
+        projects = []
+        for row in csv.DictReader(file):
+            project = {key: _parse_value(value) for key, value in row.items()}
+            if row.get("id", "").strip():
+                project["id"] = row["id"].strip()
+            if isinstance(project.get("materials"), str):
+                project["materials"] = _parse_materials(project["materials"])
+            projects.append({key: value for key, value in project.items() if value is not None})
+        return projects
+
+    projects = json.load(file)
+    if isinstance(projects, dict):
+        projects = [projects]
+
+    return projects
+
+
+def evaluate(project):
+    """Calcule D, L, S et les combinaisons de charges d'un projet.
+
+    Args:
+        project: Données du projet (voir l'en-tête du module).
+    Returns:
+        Dictionnaire des charges (kPa) et des états limites ÉLU et ÉLTS.
+    """
+
+    dead = project.get("dead")
+    if dead is None:
+        dead = DeadLoads(project.get("materials", ())).sum_dead_loads(
+            project.get("add_partitions", False),
+            project.get("additional_loads", 0),
+        )
+
+    live = project.get("live")
+    if live is None:
+        live = 0
+        if "use" in project:
+            live, _ = LiveLoads(project["use"], project.get("importance", "Normal")).uniform_load(
+                project["width"],
+                project["length"],
+                project.get("reinforced_slab", False),
+            )
+
+    snow = project.get("snow")
+    if snow is None:
+        snow = 0
+        if "location" in project:
+            snow = SnowLoads(
+                **{key: value for key, value in project.items() if key in SNOW_FIELDS}
+            ).specified_load()
+
+    design = LimitStatesDesign(
+        dead=dead,
+        live=live,
+        snow=snow,
+        wind=project.get("wind", 0),
+        earthquake=project.get("earthquake", 0),
+        **{key: project[key] for key in DESIGN_FLAGS if key in project},
+    )
+
+    return {
+        "dead": dead,
+        "live": live,
+        "snow": snow,
+        "wind": design.wind,
+        "earthquake": design.earthquake,
+        "uls": design.uls(),
+        "sls": design.sls(),
+    }
+
+
+def evaluate_all(projects):
+    """Calcule chaque projet; l'erreur d'un projet est rapportée dans sa ligne (colonne error).
+
+    Args:
+        projects: Liste des projets.
+    Returns:
+        Une ligne de résultat par projet, identifiée par l'id du projet ou par son rang.
+    """
+
+    results = []
+    for index, project in enumerate(projects, 1):
+        row = {"id": project.get("id", index) if isinstance(project, dict) else index}
+        try:
+            row.update(evaluate(project))
+        except Exception as error:  # pylint: disable=broad-except
+            row["error"] = f"{type(error).__name__}: {error}"
+        results.append(row)
+
+    return results
+
+
+def write_results(results, file, file_format="json"):
+    """Écrit les résultats en JSON ou en CSV."""
+
+    if file_format == "csv":
+        writer = csv.DictWriter(file, OUTPUT_FIELDS, lineterminator="\n")
+        writer.writeheader()
+        writer.writerows(results)
+    else:
+        json.dump(results, file, indent=2, ensure_ascii=False)
+        file.write("\n")
+
+
+def main(argv=None):
+    """Point d'entrée de python -m structural_loads."""
+
+    parser = argparse.ArgumentParser(
+        prog="python -m structural_loads",
+        description="CNB 2020: calcul de D, L, S et des combinaisons ÉLU/ÉLTS.",
+    )
+    parser.add_argument("input", nargs="?", default="-", help="Fichier JSON ou CSV (- = stdin).")
+    parser.add_argument("-o", "--output", default="-", help="Fichier de sortie (- = stdout).")
+    parser.add_argument("--format", choices=("json", "csv"), help="Format d'entrée.")
+    parser.add_argument("--output-format", choices=("json", "csv"), help="Format de sortie.")
+    parser.add_argument("--db", default=DB_PATH, help="Base de données loads.db.")
+    parser.add_argument("--snapshot", help="Instantané des tables de référence (sans SQLAlchemy).")
+    args = parser.parse_args(argv)
+
+    configure(args.db)
+    if args.snapshot:
+        from snapshot import install_snapshot
+
+        install_snapshot(args.snapshot, args.db)
+
+    input_format = args.format or ("csv" if args.input.endswith(".csv") else "json")
+    output_format = args.output_format or input_format
+
+    if args.input == "-":
+        projects = read_projects(sys.stdin, input_format)
+    else:
+        with open(args.input, newline="", encoding="utf-8") as file:
+            projects = read_projects(file, input_format)
+
+    results = evaluate_all(projects)
+
+    if args.output == "-":
+        write_results(results, sys.stdout, output_format)
+    else:
+        with open(args.output, "w", newline="", encoding="utf-8") as file:
+            write_results(results, file, output_format)
+
+    return results
+
+
+# TESTS
+def tests():
+    """Tests pour la ligne de commande."""
+
+    print("------START_TESTS------")
+
+    project = {
+        "materials": ["2x10 à 16po", ["Eau douce", 100]],
+        "use": "Résidentiel",
+        "width": 4,
+        "length": 5,
+        "location": "Gaspé",
+        "roof_height": 5,
+        "roof_larger_dimension": 5,
+        "roof_smaller_dimension": 5,
+        "slope": 25,
+        "wind": 0.5,
+    }
+    test_evaluate = evaluate(project)
+    dead = DeadLoads(["2x10 à 16po", ("Eau douce", 100)]).sum_dead_loads()
+    snow = SnowLoads("Gaspé", 5, 5, 5, 25).specified_load()
+    design = LimitStatesDesign(dead, 1.9, snow, 0.5)
+    expected_result = {
+        "dead": dead,
+        "live": 1.9,
+        "snow": snow,
+        "wind": 0.5,
+        "earthquake": 0,
+        "uls": design.uls(),
+        "sls": design.sls(),
+    }
+    if test_evaluate != expected_result:
+        print("test_evaluate -> FAILED")
+        print("result = ", test_evaluate)
+        print("expected = ", expected_result)
+    else:
+        print("test_evaluate -> PASSED")
+
+    table = io.StringIO(
+        "materials,use,width,length,dead,snow,storage_area\n"
+        "2x10 à 16po;Eau douce:100,Résidentiel,4,5,,,faux\n"
+        ",,,,1.5,2.5,vrai\n"
+    )
+    test_csv = [evaluate(project) for project in read_projects(table, "csv")]
+    expected_result = [
+        evaluate(
+            {
+                "materials": ["2x10 à 16po", ("Eau douce", 100)],
+                "use": "Résidentiel",
+                "width": 4,
+                "length": 5,
+                "storage_area": False,
+            }
+        ),
+        evaluate({"dead": 1.5, "snow": 2.5, "storage_area": True}),
+    ]
+    if test_csv != expected_result:
+        print("test_csv -> FAILED")
+        print("result = ", test_csv)
+        print("expected = ", expected_result)
+    else:
+        print("test_csv -> PASSED")
+
+    test_errors = [
+        (row["id"], "error" in row)
+        for row in evaluate_all(
+            [{"dead": 1.5}, {"id": "B", "use": "Inconnu", "width": 4, "length": 5}, None]
+        )
+    ]
+    expected_result = [(1, False), ("B", True), (3, True)]
+    if test_errors != expected_result:
+        print("test_errors -> FAILED")
+        print("result = ", test_errors)
+        print("expected = ", expected_result)
+    else:
+        print("test_errors -> PASSED")
+
+    output = io.StringIO()
+    write_results(test_csv, output, "csv")
+    test_write = output.getvalue().splitlines()[0]
+    expected_result = ",".join(OUTPUT_FIELDS)
+    if test_write != expected_result:
+        print("test_write -> FAILED")
+        print("result = ", test_write)
+        print("expected = ", expected_result)
+    else:
+        print("test_write -> PASSED")
+
+    print("-------END_TESTS-------")
+
+
+# RUN FILE
+if __name__ == "__main__":
+    tests()
+
+# END
@@ -0,0 +1,215 @@
+"""
+
+CNB 2020: Partie 4. Règles de calcul.
+Section 4.1. Charges et méthodes de calcul.
+-----------------------------------------------
+
+Accès à loads.db.
+
+    Point d'accès unique à la base de données:
+        1- Moteur SQLAlchemy configurable, créé au premier usage et partagé entre les fils
+           d'exécution (un moteur par fichier).
+        2- Connexions SQLite en lecture seule (mode=ro) dans un bassin de connexions utilisables
+           depuis n'importe quel fil (check_same_thread=False).
+        3- Une session par fil d'exécution (scoped_session).
+____________________________________________________________________________________________________
+
+
+    auteur: GabPoulin
+    email: poulin33@me.com
+
+====================================================================================================
+"""
+
+# IMPORTS
+import os
+import threading
+from contextlib import contextmanager
+from urllib.parse import quote
+
+
+# DB CONNECTION
+DB_PATH = "loads.db"
+
+_settings = {"path": DB_PATH, "read_only": True, "pool_size": 5, "max_overflow": 10}
+_engines = {}
+_sessions = None
+_lock = threading.RLock()
+
+
+# CODE
+def configure(path=DB_PATH, read_only=True, pool_size=5, max_overflow=10):
+    """Change la base de données utilisée par défaut.
+
+    Args:
+        path: Chemin du fichier loads.db.
+        read_only: Ouvre les connexions en lecture seule.
+        pool_size: Nombre de connexions gardées ouvertes par moteur.
+        max_overflow: Nombre de connexions supplémentaires permises au besoin.
+    """
+
+    global _sessions
+
+    with _lock:
+        dispose()
+        _settings.update(
+            path=path,
+            read_only=read_only,
+            pool_size=pool_size,
+            max_overflow=max_overflow,
+        )
+        _sessions = None
+
+
+@contextmanager
+def configured(path=DB_PATH, **settings):
+    """Comme configure(), le temps d'un bloc with; la configuration précédente est ensuite
+    rétablie.
+    """
+
+    with _lock:
+        previous = dict(_settings)
+    configure(path, **settings)
+    try:
+        yield
+    finally:
+        configure(**previous)
+
+
+def db_path():
+    """Chemin de la base de données configurée."""
+
+    return _settings["path"]
+
+
+def _url(path, read_only):
+    """URL SQLAlchemy du fichier, en lecture seule au besoin."""
+
+    if not read_only:
+        return f"sqlite:///{path}"
+
+    return f"sqlite:///file:{quote(os.path.abspath(path))}?mode=ro&uri=true"
+
+
+def get_engine(path=None):
+    """Moteur partagé pour le fichier demandé (la base configurée par défaut).
+    SQLAlchemy n'est importé qu'au premier appel.
+    """
+
+    from sqlalchemy import create_engine
+    from sqlalchemy.pool import QueuePool
+
+    path = path or db_path()
+    key = os.path.abspath(path), _settings["read_only"]
+    with _lock:
+        if key not in _engines:
+            _engines[key] = create_engine(
+                _url(path, _settings["read_only"]),
+                poolclass=QueuePool,
+                pool_size=_settings["pool_size"],
+                max_overflow=_settings["max_overflow"],
+                connect_args={"check_same_thread": False},
+            )
+
+        return _engines[key]
+
+
+def get_session():
+    """Session du fil d'exécution courant sur la base configurée."""
+
+    from sqlalchemy.orm import scoped_session, sessionmaker
+
+    global _sessions
+
+    with _lock:
+        if _sessions is None:
+            _sessions = scoped_session(sessionmaker(get_engine()))
+
+    return _sessions()
+
+
+def remove_session():
+    """Ferme la session du fil d'exécution courant (à appeler à la fin d'une tâche)."""
+
+    if _sessions is not None:
+        _sessions.remove()
+
+
+def dispose():
+    """Ferme toutes les connexions et oublie les moteurs."""
+
+    with _lock:
+        if _sessions is not None:
+            _sessions.remove()
+        for engine in _engines.values():
+            engine.dispose()
+        _engines.clear()
+
+
+# TESTS
+def tests():
+    """Tests pour l'accès à loads.db depuis plusieurs fils d'exécution."""
+
+    from concurrent.futures import ThreadPoolExecutor
+    from sqlalchemy import text
+    from sqlalchemy.exc import OperationalError
+    from dead_loads import DeadLoads
+    from live_loads import LiveLoads
+    from reference_data import clear_reference_data
+    from snow_loads import SnowLoads
+
+    print("------START_TESTS------")
+
+    try:
+        with get_engine().connect() as connection:
+            connection.execute(text("DELETE FROM dead_loads WHERE 0"))
+        test_read_only = False
+    except OperationalError:
+        test_read_only = True
+    expected_result = True
+    if test_read_only != expected_result:
+        print("test_read_only -> FAILED")
+        print("result = ", test_read_only)
+        print("expected = ", expected_result)
+    else:
+        print("test_read_only -> PASSED")
+
+    def task(i):
+        session = get_session()
+        count = session.execute(text("SELECT COUNT(*) FROM climatic_data")).scalar()
+        loads = (
+            SnowLoads("Gaspé", 5, 20 + i % 7, 10, i % 60).specified_load(),
+            LiveLoads("Salle à manger").uniform_load(10, 5 + i % 20),
+            DeadLoads(["2x10 à 16po", ("Eau douce", i % 50)]).member_load(),
+        )
+        remove_session()
+        return count, loads
+
+    serial = [task(i) for i in range(200)]
+    clear_reference_data()
+    with ThreadPoolExecutor(8) as executor:
+        test_threads = list(executor.map(task, range(200)))
+    if test_threads != serial:
+        print("test_threads -> FAILED")
+    else:
+        print("test_threads -> PASSED")
+
+    with ThreadPoolExecutor(1) as executor:
+        other = executor.submit(get_session).result()
+    test_scoped = get_session() is get_session() and get_session() is not other
+    expected_result = True
+    if test_scoped != expected_result:
+        print("test_scoped -> FAILED")
+        print("result = ", test_scoped)
+        print("expected = ", expected_result)
+    else:
+        print("test_scoped -> PASSED")
+
+    print("-------END_TESTS-------")
+
+
+# RUN FILE
+if __name__ == "__main__":
+    tests()
+
+# END
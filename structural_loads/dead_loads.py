@@ -18,34 +18,80 @@ ________________________________________________________________________________
 
 # IMPORTS
 from dataclasses import dataclass
-from tkinter import filedialog
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy import create_engine, Column, TEXT, REAL
+from array_math import exact_round
+from reference_data import get_reference_data
 
 
-# DB CONNECTION
-@dataclass
-class DeadLoadsTable(declarative_base()):
-    """Se connecte à la table dead_loads de loads.db."""
+# CODE
+@dataclass(frozen=True)
+class Layer:
+    """Couche d'un élément structural.
+
+    Args:
+        material: Matériau de la table dead_loads.
+        thickness: Épaisseur (mm), requise pour les matériaux en N/m3 et en N/m2/mm.
+    """
 
-    __tablename__ = "dead_loads"
-    material: str = Column("material", TEXT, primary_key=True)
-    load: float = Column("load", REAL)
-    unit: str = Column("unit", TEXT)
-    session = sessionmaker(create_engine("sqlite:///loads.db"))()
+    material: str
+    thickness: float = None
+
+
+def _as_layer(item):
+    """Convertit un matériau, une paire (matériau, épaisseur) ou une Layer en Layer."""
+
+    if isinstance(item, Layer):
+        return item
+    if isinstance(item, str):
+        return Layer(item)
+
+    return Layer(*item)
+
+
+def _layer_load(layer, mat):
+    """Poids d'une couche (kPa) selon l'unité du matériau."""
+
+    unit = mat.unit
+    load = mat.load
+    if unit in ("N/m3", "N/m2/mm"):
+        if layer.thickness is None:
+            raise ValueError(f"Épaisseur requise (mm) pour {mat.material}.")
+        load *= layer.thickness
+        if unit == "N/m3":
+            load /= 1000
+    load /= 1000
+
+    return load
+
+
+def total_dead_load(member_load, add_partitions=False, additional_loads=0):
+    """4.1.4.1. Charge permanente d'un élément dont le poids des matériaux est connu.
+
+    Args:
+        member_load: Poids des matériaux de l'élément (voir DeadLoads.member_load()).
+        add_partitions: Ajoute 1 kPa pour le poids des cloisons.
+        additional_loads: Poids additionnel (en kPa).
+    Returns:
+        Charge permanente.
+    """
+
+    d = additional_loads
+    if add_partitions:
+        d += 1
+    d += round(member_load, 2)
+
+    return d
 
 
-# CODE
 @dataclass
 class DeadLoads:
     """4.1.4. Charge permanente.
 
     Args:
-        materials: Liste des matériaux qui composent l'élément.
+        materials: Liste des matériaux qui composent l'élément. Chaque matériau est un nom, une
+            paire (nom, épaisseur en mm) ou une Layer.
     """
 
-    materials: list[str] = ()
+    materials: list[str | tuple[str, float] | Layer] = ()
 
     def member_load(self):
         """Calcul la poids total des matériaux qui composent l'élément.
@@ -54,23 +100,11 @@ class DeadLoads:
             Poids total de l'élément structural.
         """
 
+        reference_data = get_reference_data()
         total = 0
         for item in self.materials:
-            mat = (
-                DeadLoadsTable.session.query(DeadLoadsTable)
-                .filter(DeadLoadsTable.material == item)
-                .first()
-            )
-            unit = mat.unit
-            load = mat.load
-            thickness = ""
-            if unit in ("N/m3", "N/m2/mm"):
-                thickness = float(input(f"Épaisseur pour {mat.material} en mm: "))
-                load *= thickness
-                if unit == "N/m3":
-                    load /= 1000
-            load /= 1000
-            total += load
+            layer = _as_layer(item)
+            total += _layer_load(layer, reference_data.dead_load(layer.material))
         total = round(total, 2)
 
         return total
@@ -87,12 +121,40 @@ class DeadLoads:
             Charge permanente.
         """
 
-        d = additional_loads
-        if add_partitions:
-            d += 1
-        d += round(self.member_load(), 2)
+        return total_dead_load(self.member_load(), add_partitions, additional_loads)
+
 
-        return d
+def member_loads(assemblies):
+    """Calcul en lot du poids de plusieurs éléments structuraux.
+        Le poids de chaque matériau distinct est calculé une seule fois, puis les couches de
+        chaque élément sont additionnées en une seule opération.
+
+    Args:
+        assemblies: Éléments structuraux (DeadLoads ou listes de matériaux).
+    Returns:
+        Poids total de chaque élément structural (identique à DeadLoads.member_load()).
+    """
+
+    import numpy as np
+
+    reference_data = get_reference_data()
+    layer_loads = {}
+    loads = []
+    owners = []
+    for index, assembly in enumerate(assemblies):
+        if isinstance(assembly, DeadLoads):
+            assembly = assembly.materials
+        for item in assembly:
+            layer = _as_layer(item)
+            if layer not in layer_loads:
+                mat = reference_data.dead_load(layer.material)
+                layer_loads[layer] = _layer_load(layer, mat)
+            loads.append(layer_loads[layer])
+            owners.append(index)
+
+    totals = np.bincount(owners, weights=loads, minlength=len(assemblies))
+
+    return exact_round(totals, 2)
 
 
 # TESTS
@@ -145,8 +207,44 @@ def tests():
     else:
         print("test2_member_load -> PASSED")
 
-    test3_member_load = DeadLoads(["Eau douce"]).member_load()
-    print(test3_member_load)
+    test3_member_load = DeadLoads([("Eau douce", 100)]).member_load()
+    expected_result = 0.98
+    if test3_member_load != expected_result:
+        print("test3_member_load -> FAILED")
+        print("result = ", test3_member_load)
+        print("expected = ", expected_result)
+    else:
+        print("test3_member_load -> PASSED")
+
+    test_member_loads = member_loads(
+        [floor, DeadLoads(toiture), [Layer("Eau douce", 100), "Liens continus"], []]
+    ).tolist()
+    expected_result = [
+        DeadLoads(floor).member_load(),
+        DeadLoads(toiture).member_load(),
+        DeadLoads([("Eau douce", 100), "Liens continus"]).member_load(),
+        0,
+    ]
+    if test_member_loads != expected_result:
+        print("test_member_loads -> FAILED")
+        print("result = ", test_member_loads)
+        print("expected = ", expected_result)
+    else:
+        print("test_member_loads -> PASSED")
+
+    test_total_dead_load = [
+        total_dead_load(load, True, 2) for load in member_loads([floor, toiture]).tolist()
+    ]
+    expected_result = [
+        DeadLoads(floor).sum_dead_loads(True, 2),
+        DeadLoads(toiture).sum_dead_loads(True, 2),
+    ]
+    if test_total_dead_load != expected_result:
+        print("test_total_dead_load -> FAILED")
+        print("result = ", test_total_dead_load)
+        print("expected = ", expected_result)
+    else:
+        print("test_total_dead_load -> PASSED")
 
     print("-------END_TESTS-------")
 
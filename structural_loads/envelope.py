@@ -0,0 +1,427 @@
+"""
+
+CNB 2020: Partie 4. Règles de calcul.
+Section 4.1. Charges et méthodes de calcul.
+-----------------------------------------------
+
+Enveloppe des combinaisons de charges.
+
+    Pour un élément donné (coefficients de LimitStatesDesign), détermine analytiquement quel cas
+    des tableaux 4.1.3.2.-A et 4.1.3.4. gouverne selon les rapports L/D, S/D, W/D et E/D:
+        1- Chaque cas est le maximum de quelques fonctions linéaires des rapports (un terme par
+           branche des max() du tableau). Les termes qui ne gouvernent jamais sont éliminés.
+        2- L'enveloppe est formée des régions où chaque terme est maximal (inégalités linéaires).
+           Les branches de 4.1.5.5. 3) (toit extérieur) sont des termes valides seulement d'un
+           côté de la droite l5·L = s5·S.
+        3- Le long d'un rapport (les autres fixés), l'enveloppe est une suite d'intervalles dont
+           les bornes sont calculées en arithmétique rationnelle exacte; le cas déterminant d'une
+           valeur est ensuite trouvé par recherche dichotomique.
+    Les rapports supposent D > 0. En cas d'égalité, le cas de plus petit numéro gouverne, comme
+    dans LimitStatesDesign.
+____________________________________________________________________________________________________
+
+
+    auteur: GabPoulin
+    email: poulin33@me.com
+
+====================================================================================================
+"""
+
+# IMPORTS
+from bisect import bisect_left
+from dataclasses import replace
+from fractions import Fraction
+from limit_state_design import LimitStatesDesign
+
+
+# CODE
+RATIOS = ("live", "snow", "wind", "earthquake")
+
+
+def _exact(value):
+    """Valeur rationnelle exacte d'un coefficient décimal (1.4 -> 7/5, et non son approximation
+    binaire).
+    """
+
+    return Fraction(str(value))
+
+
+class Term:
+    """Fonction linéaire d'un cas: c + l·L/D + s·S/D + w·W/D + e·E/D.
+
+    Args:
+        case: Numéro du cas de charge.
+        coefficients: Coefficients (c, l, s, w, e).
+        guard: Coefficients (c, l, s, w, e) d'une condition g·x < 0 (ou g·x >= 0 si
+            `negated`), None si le terme s'applique partout.
+        negated: Inverse la condition.
+    """
+
+    __slots__ = ("case", "coefficients", "guard", "negated")
+
+    def __init__(self, case, coefficients, guard=None, negated=False):
+        self.case = case
+        self.coefficients = tuple(_exact(value) for value in coefficients)
+        self.guard = None if guard is None else tuple(_exact(value) for value in guard)
+        self.negated = negated
+
+    def __repr__(self):
+        return f"Term({self.case}, {[float(value) for value in self.coefficients]})"
+
+    def value(self, point):
+        """Valeur du terme au point (1, l, s, w, e)."""
+
+        return sum(a * x for a, x in zip(self.coefficients, point))
+
+    def applies(self, point):
+        """Vrai si la condition du terme est respectée au point (1, l, s, w, e)."""
+
+        if self.guard is None:
+            return True
+
+        below = sum(g * x for g, x in zip(self.guard, point)) < 0
+
+        return below != self.negated
+
+    def dominates(self, other):
+        """Vrai si `other` ne peut jamais être le terme déterminant à cause de ce terme."""
+
+        if self.guard is not None and (self.guard, self.negated) != (other.guard, other.negated):
+            return False
+        if any(a < b for a, b in zip(self.coefficients, other.coefficients)):
+            return False
+
+        return self.coefficients[0] > other.coefficients[0] or self.case <= other.case
+
+
+def _uls_terms(design):
+    """Termes des cas 1 à 5 du tableau 4.1.3.2.-A, à partir de _uls_factors()."""
+
+    # Les coefficients de 4.1.5.5. 3) dépendent des charges: une branche par côté de
+    # l5·L = s5·S, obtenue avec des charges qui mènent à chaque branche.
+    d1, d234, l2, l3, l4, l5, s2, s4, s5 = replace(design, live=1, snow=0)._uls_factors()
+    terms = [
+        Term(1, (d1, 0, 0, 0, 0)),
+        Term(2, (d234, l2, s2, 0, 0)),
+        Term(2, (d234, l2, 0, 0.4, 0)),
+        Term(3, (d234, l3, 1.5, 0, 0)),
+        Term(3, (d234, 0, 1.5, 0.4, 0)),
+        Term(4, (d234, l4, 0, 1.4, 0)),
+        Term(4, (d234, 0, s4, 1.4, 0)),
+        Term(5, (0, 0, 1, 0, 0)),
+    ]
+
+    if design.exterior_area and not design.car_access:
+        *_, roof_l5, _, _, roof_s5 = replace(design, live=0, snow=1)._uls_factors()
+        guard = (0, l5, -0.25, 0, 0)
+        terms.append(Term(5, (1, roof_l5, roof_s5, 0, 1), guard))
+        terms.append(Term(5, (1, l5, s5, 0, 1), guard, negated=True))
+    else:
+        terms.append(Term(5, (1, l5, s5, 0, 1)))
+
+    return terms
+
+
+def _sls_terms(design):
+    """Termes des cas 1 à 3 du tableau 4.1.3.4., à partir de _sls_factors()."""
+
+    sls_l = design._sls_factors()
+
+    return [
+        Term(1, (1, 1, 0, 0.3, 0)),
+        Term(1, (1, 1, 0.35, 0, 0)),
+        Term(2, (1, sls_l, 0, 1, 0)),
+        Term(2, (1, 0, 0.35, 1, 0)),
+        Term(3, (1, 0, 1, 0.3, 0)),
+        Term(3, (1, sls_l, 1, 0, 0)),
+    ]
+
+
+class Region:
+    """Région où un terme est déterminant: x >= 0 et chaque inégalité a·(1, l, s, w, e) <= 0.
+
+    Args:
+        term: Terme déterminant.
+        inequalities: Coefficients des inégalités (exacts).
+    """
+
+    __slots__ = ("term", "inequalities")
+
+    def __init__(self, term, inequalities):
+        self.term = term
+        self.inequalities = inequalities
+
+    @property
+    def case(self):
+        return self.term.case
+
+    def contains(self, live=0, snow=0, wind=0, earthquake=0):
+        """Vrai si les rapports sont dans la région (bornes incluses)."""
+
+        point = _point(live, snow, wind, earthquake)
+        if not self.term.applies(point):
+            return False
+
+        return all(sum(a * x for a, x in zip(row, point)) <= 0 for row in self.inequalities)
+
+
+class Profile:
+    """Cas déterminant selon un seul rapport, les autres étant fixés.
+
+    Args:
+        points: Bornes des intervalles (exactes, croissantes, la première est 0).
+        point_cases: Cas déterminant à chaque borne.
+        segment_cases: Cas déterminant entre deux bornes (le dernier: au-delà de la dernière).
+    """
+
+    __slots__ = ("points", "point_cases", "segment_cases")
+
+    def __init__(self, points, point_cases, segment_cases):
+        self.points = points
+        self.point_cases = point_cases
+        self.segment_cases = segment_cases
+
+    def case(self, value):
+        """Cas déterminant pour une valeur du rapport, par recherche dichotomique."""
+
+        if value < 0:
+            raise ValueError("Les rapports de charges doivent être positifs.")
+
+        index = bisect_left(self.points, value)
+        if index < len(self.points) and self.points[index] == value:
+            return self.point_cases[index]
+
+        return self.segment_cases[index - 1]
+
+    def ranges(self):
+        """Intervalles [début, fin) du rapport et cas déterminant de chacun."""
+
+        ends = [float(point) for point in self.points[1:]] + [float("inf")]
+
+        return [
+            (float(start), end, case)
+            for start, end, case in zip(self.points, ends, self.segment_cases)
+        ]
+
+
+def _point(live=0, snow=0, wind=0, earthquake=0):
+    """Point (1, L/D, S/D, W/D, E/D) en valeurs exactes."""
+
+    return (Fraction(1), *(_exact(value) for value in (live, snow, wind, earthquake)))
+
+
+class Envelope:
+    """Enveloppe des cas de charges d'un élément.
+
+    Args:
+        terms: Termes linéaires des cas (voir uls_envelope et sls_envelope).
+    """
+
+    def __init__(self, terms):
+        unique = []
+        for term in terms:
+            if not any(_same(term, other) for other in unique):
+                unique.append(term)
+
+        self.terms = [
+            term
+            for term in unique
+            if not any(other is not term and other.dominates(term) for other in unique)
+        ]
+
+    def _governing(self, point):
+        best = None
+        for term in self.terms:
+            if not term.applies(point):
+                continue
+            key = term.value(point), -term.case
+            if best is None or key > best:
+                best = key
+
+        return -best[1]
+
+    def case(self, live=0, snow=0, wind=0, earthquake=0):
+        """Cas déterminant pour des rapports L/D, S/D, W/D et E/D."""
+
+        return self._governing(_point(live, snow, wind, earthquake))
+
+    def regions(self):
+        """Régions de l'enveloppe, une par terme pouvant gouverner.
+
+        Returns:
+            Liste de Region; les inégalités expriment que le terme dépasse (ou égale) chacun des
+            autres termes qui s'appliquent dans la même zone.
+        """
+
+        regions = []
+        for term in self.terms:
+            inequalities = []
+            for other in self.terms:
+                if other is term or not _compatible(term, other):
+                    continue
+                inequalities.append(
+                    tuple(b - a for a, b in zip(term.coefficients, other.coefficients))
+                )
+            regions.append(Region(term, inequalities))
+
+        return regions
+
+    def along(self, ratio, **fixed):
+        """Cas déterminant selon un rapport, les autres étant fixés.
+
+        Args:
+            ratio: Rapport variable ("live", "snow", "wind" ou "earthquake").
+            **fixed: Valeurs des autres rapports (0 par défaut).
+        Returns:
+            Profile.
+        """
+
+        if ratio not in RATIOS or ratio in fixed or set(fixed) - set(RATIOS):
+            raise KeyError(f"Rapports attendus: {RATIOS}")
+
+        base = _point(**fixed)
+        direction = tuple(Fraction(name == ratio) for name in ("", *RATIOS))
+
+        def at(t):
+            return tuple(b + t * d for b, d in zip(base, direction))
+
+        candidates = {Fraction(0)}
+        lines = [(term.value(base), term.value(direction)) for term in self.terms]
+        for i, (p_i, q_i) in enumerate(lines):
+            for p_j, q_j in lines[i + 1 :]:
+                if q_i != q_j:
+                    candidates.add((p_j - p_i) / (q_i - q_j))
+        for term in self.terms:
+            if term.guard is not None:
+                slope = sum(g * d for g, d in zip(term.guard, direction))
+                if slope:
+                    candidates.add(-sum(g * b for g, b in zip(term.guard, base)) / slope)
+        candidates = sorted(t for t in candidates if t >= 0)
+
+        ends = candidates[1:] + [candidates[-1] + 2]
+        point_cases = [self._governing(at(t)) for t in candidates]
+        segment_cases = [
+            self._governing(at((start + end) / 2)) for start, end in zip(candidates, ends)
+        ]
+
+        points, kept_points, kept_segments = candidates[:1], point_cases[:1], segment_cases[:1]
+        for t, point_case, segment_case in zip(candidates[1:], point_cases[1:], segment_cases[1:]):
+            if point_case == segment_case == kept_segments[-1]:
+                continue
+            points.append(t)
+            kept_points.append(point_case)
+            kept_segments.append(segment_case)
+
+        return Profile(points, kept_points, kept_segments)
+
+
+def _same(term, other):
+    """Vrai si les deux termes sont identiques."""
+
+    return (term.case, term.coefficients, term.guard, term.negated) == (
+        other.case,
+        other.coefficients,
+        other.guard,
+        other.negated,
+    )
+
+
+def _compatible(term, other):
+    """Vrai si les deux termes peuvent s'appliquer au même point."""
+
+    if term.guard is None or other.guard is None or term.guard != other.guard:
+        return True
+
+    return term.negated == other.negated
+
+
+def uls_envelope(design):
+    """Enveloppe des cas 1 à 5 de l'ÉLU pour les conditions d'application d'un élément.
+
+    Args:
+        design: LimitStatesDesign (seuls h_s et les conditions d'application sont utilisés).
+    """
+
+    return Envelope(_uls_terms(design))
+
+
+def sls_envelope(design):
+    """Enveloppe des cas 1 à 3 de l'ÉLTS pour les conditions d'application d'un élément.
+
+    Args:
+        design: LimitStatesDesign (seules les conditions d'application sont utilisées).
+    """
+
+    return Envelope(_sls_terms(design))
+
+
+# TESTS
+def tests():
+    """Tests pour les enveloppes ÉLU et ÉLTS."""
+
+    import random
+
+    print("------START_TESTS------")
+
+    test_along = uls_envelope(LimitStatesDesign()).along("live").ranges()
+    expected_result = [(0.0, 0.1, 1), (0.1, float("inf"), 2)]
+    if test_along != expected_result:
+        print("test_along -> FAILED")
+        print("result = ", test_along)
+        print("expected = ", expected_result)
+    else:
+        print("test_along -> PASSED")
+
+    rng = random.Random(1)
+    flag_sets = [
+        {},
+        {"storage_area": True},
+        {"exterior_area": True},
+        {"exterior_area": True, "car_access": True},
+        {"exterior_area": True, "storage_area": True, "h_s": 2},
+        {"counter_d": True, "liquid_l": True, "h_s": 0.5},
+    ]
+    mismatches = 0
+    for flags in flag_sets:
+        design = LimitStatesDesign(**flags)
+        uls, sls = uls_envelope(design), sls_envelope(design)
+        uls_regions, sls_regions = uls.regions(), sls.regions()
+        for _ in range(500):
+            ratios = [rng.choice((0, rng.uniform(0, 3))) for _ in RATIOS]
+            loads = replace(design, dead=1, **dict(zip(RATIOS, ratios)))
+            case = uls.case(*ratios), sls.case(*ratios)
+            expected = loads.uls_result().case, loads.sls_result().case
+            profile = uls.along("snow", live=ratios[0], wind=ratios[2], earthquake=ratios[3])
+            in_region = any(
+                region.case == case[0] and region.contains(*ratios) for region in uls_regions
+            ) and any(region.case == case[1] and region.contains(*ratios) for region in sls_regions)
+            if case != expected or profile.case(ratios[1]) != case[0] or not in_region:
+                mismatches += 1
+    test_cases = mismatches
+    expected_result = 0
+    if test_cases != expected_result:
+        print("test_cases -> FAILED")
+        print("result = ", test_cases)
+        print("expected = ", expected_result)
+    else:
+        print("test_cases -> PASSED")
+
+    roof = uls_envelope(LimitStatesDesign(exterior_area=True))
+    profile = roof.along("snow", live=1, earthquake=2)
+    test_roof = profile.ranges(), profile.case(1.5)
+    expected_result = [(0.0, 1.5, 5), (1.5, float("inf"), 3)], 3
+    if test_roof != expected_result:
+        print("test_roof -> FAILED")
+        print("result = ", test_roof)
+        print("expected = ", expected_result)
+    else:
+        print("test_roof -> PASSED")
+
+    print("-------END_TESTS-------")
+
+
+# RUN FILE
+if __name__ == "__main__":
+    tests()
+
+# END
@@ -24,7 +24,9 @@ ________________________________________________________________________________
 """
 
 # IMPORTS
+from __future__ import annotations
 from dataclasses import dataclass
+from results import LimitStateResult
 
 
 # CODE
@@ -110,12 +112,12 @@ class LimitStatesDesign:
 
         return sls_l
 
-    def uls(self):
+    def uls_cases(self):
         """4.1.3.2. Résistance et stabilité.
             Tableau 4.1.3.2.-A
 
         Returns:
-            État limite ultime
+            Combinaisons de charges 1 à 5.
         """
         (
             d1_factor,
@@ -150,16 +152,35 @@ class LimitStatesDesign:
             self.snow,
         )
 
-        ultimate_limit_state = max(case_1, case_2, case_3, case_4, case_5)
+        return case_1, case_2, case_3, case_4, case_5
+
+    def uls(self):
+        """4.1.3.2. Résistance et stabilité.
+            Tableau 4.1.3.2.-A
+
+        Returns:
+            État limite ultime
+        """
+
+        ultimate_limit_state = max(self.uls_cases())
 
         return ultimate_limit_state
 
-    def sls(self):
+    def uls_result(self):
+        """4.1.3.2. État limite ultime, avec le cas déterminant.
+
+        Returns:
+            LimitStateResult.
+        """
+
+        return _governing_result(self.uls_cases(), "ÉLU")
+
+    def sls_cases(self):
         """4.1.3.4. Tenue en service.
             Tableau 4.1.3.4.
 
         Returns:
-            État limite de tenue en service
+            Combinaisons de charges 1 à 3.
         """
 
         case_1 = self.dead + self.live + max(0.3 * self.wind, 0.35 * self.snow)
@@ -174,15 +195,224 @@ class LimitStatesDesign:
             + max(0.3 * self.wind, self._sls_factors() * self.live)
         )
 
-        serviceability_limit_state = max(case_1, case_2, case_3)
+        return case_1, case_2, case_3
+
+    def sls(self):
+        """4.1.3.4. Tenue en service.
+            Tableau 4.1.3.4.
+
+        Returns:
+            État limite de tenue en service
+        """
+
+        serviceability_limit_state = max(self.sls_cases())
 
         return serviceability_limit_state
 
+    def sls_result(self):
+        """4.1.3.4. État limite de tenue en service, avec le cas déterminant.
+
+        Returns:
+            LimitStateResult.
+        """
+
+        return _governing_result(self.sls_cases(), "ÉLTS")
+
+
+@dataclass
+class LimitStatesDesignBatch:
+    """4.1.3. Calcul aux états limites, évalué en lot.
+        Même calcul que LimitStatesDesign, mais chaque argument accepte un tableau (une valeur par
+        élément structural) et tous les cas des tableaux 4.1.3.2.-A et 4.1.3.4. sont évalués en
+        une seule passe NumPy. Les scalaires sont diffusés sur la taille des tableaux.
+
+    Args:
+        dead: Charges permanentes (D).
+        live: Surcharges dues à l'usage (L).
+        snow: Charges dues à la neige (S).
+        wind: Charges dues au vent (W).
+        earthquake: Charges et effets dus aux séismes (E).
+        counter_d: Charges permanentes pondérées contraires.
+        liquid_l: Liquides contenus dans des réservoirs.
+        storage_area: Aires de stockage, aires réservées à l'équipement ou locaux techniques.
+        exterior_area: Toits ou aires extérieures.
+        car_access: Aires accessibles aux véhicules.
+        h_s: Profondeurs du sol, en m, supporté par la structure.
+    """
+
+    dead: np.ndarray = 0
+    live: np.ndarray = 0
+    snow: np.ndarray = 0
+    wind: np.ndarray = 0
+    earthquake: np.ndarray = 0
+    h_s: np.ndarray = 0
+    counter_d: np.ndarray = False
+    liquid_l: np.ndarray = False
+    storage_area: np.ndarray = False
+    exterior_area: np.ndarray = False
+    car_access: np.ndarray = False
+
+    def __post_init__(self):
+        import numpy as np
+
+        loads = ("dead", "live", "snow", "wind", "earthquake", "h_s")
+        flags = ("counter_d", "liquid_l", "storage_area", "exterior_area", "car_access")
+        columns = np.broadcast_arrays(*(getattr(self, name) for name in loads + flags))
+        for name, column in zip(loads, columns[: len(loads)]):
+            setattr(self, name, np.asarray(column, dtype=float))
+        for name, column in zip(flags, columns[len(loads) :]):
+            setattr(self, name, np.asarray(column, dtype=bool))
+
+    def _uls_factors(self):
+        """Coefficients de LimitStatesDesign._uls_factors() pour chaque élément."""
+
+        import numpy as np
+
+        h_s = self.h_s
+        with np.errstate(divide="ignore"):
+            deep_soil = np.maximum(1 + 0.6 / h_s, 1.25)
+
+        d1 = np.where(h_s > 0, 1.5, 1.4)  # 4.1.3.2. 9)
+        d234 = np.where(h_s > 0, 1.5, 1.25)  # 4.1.3.2. 8)
+        d234 = np.where(h_s > 1.2, deep_soil, d234)
+        d234 = np.where(self.counter_d, 0.9, d234)  # 4.1.3.2. 5)
+
+        l2 = np.where(self.liquid_l, 1.25, 1.5)  # 4.1.3.2. 6)
+        l3 = np.where(self.storage_area, 1.5, 1.0)  # 4.1.3.2. 7)
+        l4 = np.where(self.storage_area, 1.0, 0.5)
+        l5 = np.where(self.storage_area, 1.0, 0.5)
+
+        roof = self.exterior_area & ~self.car_access  # 4.1.5.5. 2)
+        parking = self.exterior_area & self.car_access  # 4.1.5.5. 4)
+        snow_governs = l5 * self.live < 0.25 * self.snow  # 4.1.5.5. 3)
+
+        s2 = np.where(roof, 0.0, np.where(parking, 0.2, 1.0))
+        l3 = np.where(roof, 0.0, l3)
+        l5 = np.where(roof & snow_governs, 0.0, l5)
+        s4 = np.where(parking, 0.2, 0.5)
+        s5 = np.where(parking, 0.2, 0.25)
+        s5 = np.where(roof & ~snow_governs, 0.0, s5)
+
+        return d1, d234, l2, l3, l4, l5, s2, s4, s5
+
+    def _sls_factors(self):
+        """Coefficient de LimitStatesDesign._sls_factors() pour chaque élément."""
+
+        import numpy as np
+
+        return np.where(self.storage_area, 0.5, 0.35)
+
+    def uls_cases(self):
+        """4.1.3.2. Résistance et stabilité.
+            Tableau 4.1.3.2.-A
+
+        Returns:
+            Matrice (éléments x 5) des combinaisons de charges 1 à 5.
+        """
+
+        import numpy as np
+        (
+            d1_factor,
+            d234_factor,
+            l2_factor,
+            l3_factor,
+            l4_factor,
+            l5_factor,
+            s2_factor,
+            s4_factor,
+            s5_factor,
+        ) = self._uls_factors()
+
+        case_1 = d1_factor * self.dead
+        case_2 = (
+            d234_factor * self.dead
+            + l2_factor * self.live
+            + np.maximum(s2_factor * self.snow, 0.4 * self.wind)
+        )
+        case_3 = (
+            d234_factor * self.dead
+            + 1.5 * self.snow
+            + np.maximum(l3_factor * self.live, 0.4 * self.wind)
+        )
+        case_4 = (
+            d234_factor * self.dead
+            + 1.4 * self.wind
+            + np.maximum(l4_factor * self.live, s4_factor * self.snow)
+        )
+        case_5 = np.maximum(
+            self.dead + self.earthquake + l5_factor * self.live + s5_factor * self.snow,
+            self.snow,
+        )
+
+        return np.stack((case_1, case_2, case_3, case_4, case_5), axis=-1)
+
+    def sls_cases(self):
+        """4.1.3.4. Tenue en service.
+            Tableau 4.1.3.4.
+
+        Returns:
+            Matrice (éléments x 3) des combinaisons de charges 1 à 3.
+        """
+
+        import numpy as np
+
+        sls_l = self._sls_factors()
+
+        case_1 = self.dead + self.live + np.maximum(0.3 * self.wind, 0.35 * self.snow)
+        case_2 = self.dead + self.wind + np.maximum(sls_l * self.live, 0.35 * self.snow)
+        case_3 = self.dead + self.snow + np.maximum(0.3 * self.wind, sls_l * self.live)
+
+        return np.stack((case_1, case_2, case_3), axis=-1)
+
+    def uls(self):
+        """4.1.3.2. Résistance et stabilité.
+
+        Returns:
+            États limites ultimes, numéros des cas déterminants (1 à 5) et matrice des cas.
+        """
+
+        cases = self.uls_cases()
+
+        return _governing(cases)
+
+    def sls(self):
+        """4.1.3.4. Tenue en service.
+
+        Returns:
+            États limites de tenue en service, numéros des cas déterminants (1 à 3) et matrice
+            des cas.
+        """
+
+        cases = self.sls_cases()
+
+        return _governing(cases)
+
+
+def _governing(cases):
+    """Retourne la valeur maximale, le cas déterminant (premier maximum, comme max()) et les cas."""
+
+    import numpy as np
+
+    index = np.argmax(cases, axis=-1)
+    governing = np.take_along_axis(cases, index[..., np.newaxis], axis=-1)[..., 0]
+
+    return governing, index + 1, cases
+
+
+def _governing_result(cases, limit_state):
+    """Combinaison maximale et numéro (1 à n) du premier cas qui l'atteint."""
+
+    value = max(cases)
+
+    return LimitStateResult(value, cases.index(value) + 1, cases, limit_state)
+
 
 # TESTS
 def tests():
     """tests pour la classe LimitStateDesing"""
 
+    import numpy as np
+
     print("------START_TESTS------")
 
     uls_default_test = LimitStatesDesign().uls()
@@ -240,6 +470,44 @@ def tests():
     else:
         print("sls_storage_test -> PASSED")
 
+    rng = np.random.default_rng(2020)
+    size = 2000
+    columns = {
+        "dead": rng.uniform(0, 5, size).round(2),
+        "live": rng.uniform(0, 5, size).round(2),
+        "snow": rng.uniform(0, 5, size).round(2),
+        "wind": rng.uniform(0, 2, size).round(2),
+        "earthquake": rng.uniform(0, 2, size).round(2),
+        "h_s": rng.choice([0, 0.5, 1.2, 2, 3.5], size),
+        "counter_d": rng.random(size) < 0.3,
+        "liquid_l": rng.random(size) < 0.3,
+        "storage_area": rng.random(size) < 0.3,
+        "exterior_area": rng.random(size) < 0.5,
+        "car_access": rng.random(size) < 0.5,
+    }
+    batch = LimitStatesDesignBatch(**columns)
+    uls, uls_case, _ = batch.uls()
+    sls, sls_case, _ = batch.sls()
+    batch_mismatches = 0
+    for i in range(size):
+        member = LimitStatesDesign(**{k: v[i].item() for k, v in columns.items()})
+        if member.uls() != uls[i] or member.sls() != sls[i]:
+            batch_mismatches += 1
+    if batch_mismatches:
+        print("batch_test -> FAILED")
+        print(f"mismatches = {batch_mismatches}")
+    else:
+        print("batch_test -> PASSED")
+
+    batch_case_test = LimitStatesDesignBatch(dead=[1, 1], live=[0, 5]).uls()[1].tolist()
+    expected_result = [1, 2]
+    if batch_case_test != expected_result:
+        print("batch_case_test -> FAILED")
+        print(f"result = {batch_case_test}")
+        print(f"expected = {expected_result}")
+    else:
+        print("batch_case_test -> PASSED")
+
     print("-------END_TESTS-------")
 
 
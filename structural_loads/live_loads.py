@@ -9,6 +9,7 @@ Section 4.1. Charges et méthodes de calcul.
     Détermine la surcharge spécifiée selon l'usage prévu.
         1- Méthode des surcharges uniformément réparties 4.1.5.3.
         2- Méthode des surcharges concentrées 4.1.5.9.
+        3- LiveLoadsBatch: surcharges uniformes de toutes les travées d'un plancher en lot.
 ____________________________________________________________________________________________________
     
 
@@ -19,29 +20,42 @@ ________________________________________________________________________________
 """
 
 # IMPORTS
+from __future__ import annotations
 from dataclasses import dataclass
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy import create_engine, Column, TEXT, REAL, INTEGER
+from array_math import exact_power, exact_round
+from reference_data import get_reference_data
+from results import ConcentratedLoadResult, UniformLoadResult, reduction_message
 
 
-# DB CONNECTION
-@dataclass
-class LiveLoadsTable(declarative_base()):
-    """Se connecte à la table live_loads de loads.db."""
-
-    __tablename__ = "live_loads"
-    use: str = Column("use", TEXT, primary_key=True)
-    uniform: float = Column("uniform", REAL)
-    concentrated: float = Column("concentrated", REAL)
-    area_x: int = Column("area (x)", INTEGER)
-    area_y: int = Column("area (y)", INTEGER)
-    engine = create_engine("sqlite:///loads.db")
-    Session = sessionmaker(engine)
-    session = Session()
+# CODE
+# 4.1.5.8. Usages sans réduction de surface tributaire et usages de la formule 1).
+ASSEMBLY_OCCUPANCY = frozenset(
+    (
+        "Salle de classe et d'audience",
+        "Lieu de réunion (c)",
+        "Lieu de réunion (d)",
+        "Toit",
+    )
+)
+USE_A = frozenset(
+    (
+        "Stockage",
+        "Équipement et local technique",
+        "Bibliothèque (rayonnage)",
+        "Entrepôt",
+        "Commerce de gros détail",
+        "Garage (véhicules <= 4000 kg)",
+        "Garage (4000 kg < véhicules <= 9000 kg)",
+        "Garage (véhicules > 9000 kg)",
+        "Lieu de réunion (a)",
+        "Vomitoire, issue, hall et corridor",
+        "Mezzanine et passerelle",
+        "Usine",
+        "Salle à manger",
+    )
+)
 
 
-# CODE
 @dataclass
 class LiveLoads:
     """4.1.5. Surcharges dues à l'usage.
@@ -57,19 +71,20 @@ class LiveLoads:
     def _get_live_info(self):
         """Récupère les surcharges de loads.db pour l'usage prévu."""
 
-        return (
-            LiveLoadsTable.session.query(LiveLoadsTable)
-            .filter(LiveLoadsTable.use == self.use)
-            .first()
-        )
+        return get_reference_data().live_load(self.use)
 
-    def _low_importance_factor(self, load):
-        """Dans le cas des bâtiments de la catégorie risque faible, applique un coefficient de 0.8."""
+    def _importance_factor(self):
+        """Coefficient de 0.8 pour les bâtiments de la catégorie de risque faible."""
 
         if self.importance == "Faible":
-            load *= 0.8
+            return 0.8
+
+        return 1
+
+    def _low_importance_factor(self, load):
+        """Dans le cas des bâtiments de la catégorie risque faible, applique un coefficient de 0.8."""
 
-        return round(load, 1)
+        return round(load * self._importance_factor(), 1)
 
     def uniform_load(self, width: float, length: float, reinforced_slab=False):
         """4.1.5.3. Surcharge totale et surcharge partielle.
@@ -82,20 +97,36 @@ class LiveLoads:
             Charge uniforme et facteur de réduction (si applicable).
         """
 
+        result = self.uniform_load_result(width, length, reinforced_slab)
+
+        return result.value, result.message
+
+    def uniform_load_result(self, width: float, length: float, reinforced_slab=False):
+        """4.1.5.3. Surcharge totale et surcharge partielle, avec ses coefficients.
+
+        Args:
+            width: Largeur de surface (m).
+            length: Longueur de surface (m).
+            reinforced_slab: Spécifier "True" si la surface est une dalle armée.
+        Returns:
+            UniformLoadResult.
+        """
+
         load = self._get_live_info().uniform
         area = width * length
 
         if self.use == "Salle à manger":
             load = self._dining_area(load, area)
 
-        reduction_factor, reduction_message = self._tributary_area(
-            reinforced_slab,
+        reduction_factor, _ = self._tributary_area(reinforced_slab, load, area)
+
+        return UniformLoadResult(
+            self._low_importance_factor(load * reduction_factor),
             load,
             area,
+            reduction_factor,
+            self._importance_factor(),
         )
-        load *= reduction_factor
-
-        return self._low_importance_factor(load), reduction_message
 
     def _dining_area(self, load, area):
         """4.1.5.6. Salles à Manger."""
@@ -108,31 +139,9 @@ class LiveLoads:
     def _tributary_area(self, reinforced_slab, load, area):
         """4.1.5.8. Surface Trubutaire."""
 
-        assembly_occupancy = (
-            "Salle de classe et d'audience",
-            "Lieu de réunion (c)",
-            "Lieu de réunion (d)",
-            "Toit",
-        )
-        use_A = (
-            "Stockage",
-            "Équipement et local technique",
-            "Bibliothèque (rayonnage)",
-            "Entrepôt",
-            "Commerce de gros détail",
-            "Garage (véhicules <= 4000 kg)",
-            "Garage (4000 kg < véhicules <= 9000 kg)",
-            "Garage (véhicules > 9000 kg)",
-            "Lieu de réunion (a)",
-            "Vomitoire, issue, hall et corridor",
-            "Mezzanine et passerelle",
-            "Usine",
-            "Salle à manger",
-        )
-
         reduction = False
         if not reinforced_slab:
-            if self.use not in assembly_occupancy:
+            if self.use not in ASSEMBLY_OCCUPANCY:
                 if self.use == "Salle à manger":
                     if load >= 4.8:
                         reduction = True
@@ -143,18 +152,14 @@ class LiveLoads:
         A = area
         B = area
         if reduction:
-            if self.use in use_A:
+            if self.use in USE_A:
                 if area > 80:
                     factor = 0.5 + (20 / A) ** 0.5
             else:
                 if area > 20:
                     factor = 0.3 + (9.8 / B) ** 0.5
 
-        message = "Aucun coefficient de réduction de surface tributaire n'est appliqué."
-        if factor != 1:
-            message = f"Un coefficient de {round(factor,2)} est appliqué à la surface tributaire."
-
-        return factor, message
+        return factor, reduction_message(factor)
 
     def concentrated_load(self):
         """4.1.5.9. Surcharges concentrées
@@ -163,21 +168,130 @@ class LiveLoads:
             Charge concentrée et la surface sur laquelle la charge est appliquée.
         """
 
-        load = 0
-        message = "Aucune charge concentrée requise."
-        if self._get_live_info().concentrated:
-            load = self._get_live_info().concentrated
-            area_x = self._get_live_info().area_x
-            area_y = self._get_live_info().area_y
-            message = f"Surface de {area_x}mm x {area_y}mm soumise à la charge."
+        result = self.concentrated_load_result()
+
+        return result.value, result.message
+
+    def concentrated_load_result(self):
+        """4.1.5.9. Surcharges concentrées, avec la surface chargée.
 
-        return self._low_importance_factor(load), message
+        Returns:
+            ConcentratedLoadResult.
+        """
+
+        info = self._get_live_info()
+        load = info.concentrated or 0
+
+        return ConcentratedLoadResult(
+            self._low_importance_factor(load),
+            info.area_x if load else None,
+            info.area_y if load else None,
+            self._importance_factor(),
+        )
+
+
+@dataclass
+class LiveLoadsBatch:
+    """4.1.5.3. Surcharges uniformes, évaluées en lot.
+        Même calcul que LiveLoads.uniform_load(), pour un usage et un tableau de travées: l'usage
+        est classé une seule fois, puis 4.1.5.6. et 4.1.5.8. sont appliqués à toutes les travées en
+        une passe NumPy. Les scalaires sont diffusés sur la taille des tableaux.
+
+    Args:
+        use: Usage prévu.
+        width: Largeurs des travées (m).
+        length: Longueurs des travées (m).
+
+    Optional:
+        importance: Catégorie de risque ("Faible", "Normal", "Élevé", "Protection civile").
+        reinforced_slab: Travées en dalle armée.
+    """
+
+    use: str
+    width: np.ndarray
+    length: np.ndarray
+
+    importance: str = "Normal"
+    reinforced_slab: np.ndarray = False
+
+    def __post_init__(self):
+        import numpy as np
+
+        width, length, reinforced_slab = np.broadcast_arrays(
+            self.width, self.length, self.reinforced_slab
+        )
+        self.width = np.asarray(width, dtype=float)
+        self.length = np.asarray(length, dtype=float)
+        self.reinforced_slab = np.asarray(reinforced_slab, dtype=bool)
+
+    @classmethod
+    def from_grid(cls, use, x_lines, y_lines, **options):
+        """Travées d'un plancher découpé par des lignes de grille.
+
+        Args:
+            use: Usage prévu.
+            x_lines: Positions des lignes de grille en x (m), croissantes.
+            y_lines: Positions des lignes de grille en y (m), croissantes.
+            **options: importance, reinforced_slab.
+        Returns:
+            LiveLoadsBatch de forme (travées en y, travées en x).
+        """
+
+        import numpy as np
+
+        widths = np.diff(np.asarray(x_lines, dtype=float))
+        lengths = np.diff(np.asarray(y_lines, dtype=float))
+
+        return cls(use, widths[np.newaxis, :], lengths[:, np.newaxis], **options)
+
+    def reduction_factors(self, load, area):
+        """4.1.5.8. Coefficients de réduction de surface tributaire de chaque travée."""
+
+        import numpy as np
+
+        reducible = ~self.reinforced_slab & (self.use not in ASSEMBLY_OCCUPANCY)
+        if self.use == "Salle à manger":
+            reducible &= load >= 4.8
+
+        if self.use in USE_A:
+            limit, constant, numerator = 80, 0.5, 20
+        else:
+            limit, constant, numerator = 20, 0.3, 9.8
+
+        reduced = reducible & (area > limit)
+        factors = np.ones(area.shape)
+        factors[reduced] = constant + exact_power(numerator / area[reduced], 0.5)
+
+        return factors
+
+    def uniform_load(self):
+        """4.1.5.3. Surcharge totale et surcharge partielle de chaque travée.
+
+        Returns:
+            Charges uniformes (kPa) et coefficients de réduction de surface tributaire.
+        """
+
+        import numpy as np
+
+        live_loads = LiveLoads(self.use, self.importance)
+        area = self.width * self.length
+        load = np.full(area.shape, float(live_loads._get_live_info().uniform))
+
+        if self.use == "Salle à manger":
+            load[area <= 100] = 2.4  # 4.1.5.6.
+
+        factors = self.reduction_factors(load, area)
+        loads = exact_round(load * factors * live_loads._importance_factor(), 1)
+
+        return loads, factors
 
 
 # TESTS
 def tests():
     """tests pour la classe LiveLoads."""
 
+    import numpy as np
+
     print("------START_TESTS------")
 
     garage = "Garage (véhicules > 9000 kg)"
@@ -226,6 +340,42 @@ def tests():
     else:
         print("test4_concentrated_load -> PASSED")
 
+    rng = np.random.default_rng(1)
+    widths = rng.uniform(1, 15, 2000).round(2)
+    lengths = rng.uniform(1, 15, 2000).round(2)
+    slabs = rng.random(2000) < 0.2
+    mismatches = 0
+    for use in (garage, salle_a_manger, "Résidentiel", "Toit", "Stockage"):
+        for importance in ("Normal", faible):
+            loads, _ = LiveLoadsBatch(use, widths, lengths, importance, slabs).uniform_load()
+            expected = [
+                LiveLoads(use, importance).uniform_load(w, l, r)[0]
+                for w, l, r in zip(widths.tolist(), lengths.tolist(), slabs.tolist())
+            ]
+            mismatches += sum(a != b for a, b in zip(loads.tolist(), expected))
+    test5_batch = mismatches
+    expected_result = 0
+    if test5_batch != expected_result:
+        print("test5_batch -> FAILED")
+        print("result = ", test5_batch)
+        print("expected = ", expected_result)
+    else:
+        print("test5_batch -> PASSED")
+
+    loads, factors = LiveLoadsBatch.from_grid(garage, [0, 6, 12, 21], [0, 8, 20]).uniform_load()
+    test6_grid = loads.shape, factors[1, 2], loads[0, 0]
+    expected_result = (
+        (2, 3),
+        LiveLoads(garage)._tributary_area(False, 12, 9 * 12)[0],
+        LiveLoads(garage).uniform_load(6, 8)[0],
+    )
+    if test6_grid != expected_result:
+        print("test6_grid -> FAILED")
+        print("result = ", test6_grid)
+        print("expected = ", expected_result)
+    else:
+        print("test6_grid -> PASSED")
+
     print("-------END_TESTS-------")
 
 
@@ -0,0 +1,300 @@
+"""
+
+CNB 2020: Partie 4. Règles de calcul.
+Section 4.1. Charges et méthodes de calcul.
+-----------------------------------------------
+
+Index des emplacements de climatic_data.
+
+    Index construit une seule fois en mémoire pour retrouver un emplacement:
+        1- Recherche exacte.
+        2- Recherche sans accents ni majuscules ("Gaspe" -> "Gaspé").
+        3- Recherche approximative par préfixe et trigrammes, avec candidats classés. Les listes
+           de trigrammes sont parcourues de la plus rare à la plus commune, les trigrammes très
+           communs ("ain", "  s") sont ignorés ou tronqués, et seuls SEARCH_BUDGET candidats
+           sont évalués: la latence ne dépend presque plus du nombre d'emplacements.
+____________________________________________________________________________________________________
+
+
+    auteur: GabPoulin
+    email: poulin33@me.com
+
+====================================================================================================
+"""
+
+# IMPORTS
+import heapq
+import unicodedata
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from time import perf_counter
+from reference_data import get_reference_data
+
+
+# CODE
+SEARCH_BUDGET = 32
+SEARCH_VISITS = 2000
+
+
+def normalize(name):
+    """Retire les accents, la casse, les traits d'union et les espaces superflus."""
+
+    decomposed = unicodedata.normalize("NFKD", name)
+    stripped = "".join(char for char in decomposed if not unicodedata.combining(char))
+    for separator in ("-", "'", "’", "."):
+        stripped = stripped.replace(separator, " ")
+
+    return " ".join(stripped.casefold().split())
+
+
+def _trigrams(text):
+    """Trigrammes du texte normalisé, bordé d'espaces pour favoriser le début des mots."""
+
+    padded = f"  {text} "
+
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+class LocationIndex:
+    """Index des emplacements (location, province) de climatic_data.
+
+    Args:
+        climatic_data: Dictionnaire location -> ligne de climatic_data.
+    """
+
+    def __init__(self, climatic_data):
+        self.source = climatic_data
+        self.provinces = {location: row.province for location, row in climatic_data.items()}
+        self.normalized = defaultdict(list)
+        self.location_trigrams = {}
+        postings = defaultdict(list)
+        for location in climatic_data:
+            key = normalize(location)
+            self.normalized[key].append(location)
+            self.location_trigrams[location] = frozenset(_trigrams(key))
+            for trigram in self.location_trigrams[location]:
+                postings[trigram].append(location)
+        self.sorted_keys = sorted(self.normalized)
+        self.common = max(SEARCH_BUDGET, len(climatic_data) // 20)
+
+        # Les noms courts d'abord: ce sont les plus proches d'une requête courte, et les seuls
+        # parcourus lorsque la liste d'un trigramme commun est tronquée.
+        self.trigrams = {
+            trigram: tuple(sorted(locations, key=lambda c: (len(self.location_trigrams[c]), c)))
+            for trigram, locations in postings.items()
+        }
+
+    def lookup(self, name, province=None):
+        """Emplacement exact ou, à défaut, sans accents ni majuscules.
+
+        Args:
+            name: Nom de l'emplacement.
+            province: Province, pour départager des emplacements homonymes.
+        Returns:
+            Nom de l'emplacement dans climatic_data (None si introuvable ou ambigu).
+        """
+
+        if name in self.provinces:
+            return name
+
+        candidates = self.normalized.get(normalize(name), [])
+        if province is not None:
+            key = normalize(province)
+            candidates = [c for c in candidates if normalize(self.provinces[c]) == key]
+        if len(candidates) == 1:
+            return candidates[0]
+
+        return None
+
+    def prefix(self, text, limit=None):
+        """Emplacements dont le nom normalisé commence par le texte (au plus limit)."""
+
+        key = normalize(text)
+        matches = []
+        for i in range(bisect_left(self.sorted_keys, key), len(self.sorted_keys)):
+            if not self.sorted_keys[i].startswith(key):
+                break
+            matches.extend(self.normalized[self.sorted_keys[i]])
+            if limit is not None and len(matches) >= limit:
+                return matches[:limit]
+
+        return matches
+
+    def search(self, text, limit=5):
+        """Recherche approximative des emplacements les plus proches.
+
+        Args:
+            text: Nom recherché (avec ou sans fautes, accents ou majuscules).
+            limit: Nombre maximal de candidats.
+        Returns:
+            Liste de (location, province, score), du plus proche au moins proche.
+        """
+
+        key = normalize(text)
+        query = _trigrams(key)
+
+        # Un emplacement qui commence par le texte a un score d'au moins 1, supérieur à celui de
+        # tout autre: s'il y en a assez, les trigrammes ne servent qu'à les classer.
+        prefixed = set(self.prefix(key, SEARCH_BUDGET))
+        candidates = set()
+        if len(prefixed) < limit:
+            # Listes les plus rares d'abord. Une liste très commune ("ain", "  s") est ignorée dès
+            # qu'une liste rare a fourni des candidats; sinon, au plus SEARCH_VISITS entrées sont
+            # parcourues. Seuls les SEARCH_BUDGET emplacements qui partagent le plus de trigrammes
+            # sont évalués.
+            shared = Counter()
+            rare = False
+            visits = SEARCH_VISITS
+            for posting in sorted((self.trigrams.get(trigram, ()) for trigram in query), key=len):
+                common = len(posting) > self.common
+                if visits <= 0 or (common and rare):
+                    break
+                rare = rare or (bool(posting) and not common)
+                shared.update(posting[:visits])
+                visits -= len(posting)
+            candidates = set(shared)
+            if len(shared) > SEARCH_BUDGET:
+                candidates = {location for location, _ in shared.most_common(SEARCH_BUDGET)}
+
+        scores = []
+        for location in candidates | prefixed:
+            trigrams = self.location_trigrams[location]
+            count = len(query & trigrams)
+            score = count / (len(query) + len(trigrams) - count)
+            if location in prefixed:
+                score = max(score, 0.5) + 0.5
+            scores.append((-score, location))
+
+        ranked = heapq.nsmallest(limit, scores)
+
+        return [(location, self.provinces[location], -score) for score, location in ranked]
+
+
+_index = None
+
+
+def get_location_index():
+    """Retourne l'index partagé, reconstruit si climatic_data a été rechargée."""
+
+    global _index
+
+    climatic_data = get_reference_data().refresh().climatic_data
+    if _index is None or _index.source is not climatic_data:
+        _index = LocationIndex(climatic_data)
+
+    return _index
+
+
+def resolve_location(name, province=None):
+    """Raccourci pour get_location_index().lookup()."""
+
+    return get_location_index().lookup(name, province)
+
+
+# TESTS
+def tests():
+    """Tests pour la classe LocationIndex."""
+
+    from itertools import product
+    from reference_data import ClimateRow
+
+    print("------START_TESTS------")
+
+    index = get_location_index()
+
+    test_exact = index.lookup("Gaspé")
+    expected_result = "Gaspé"
+    if test_exact != expected_result:
+        print("test_exact -> FAILED")
+        print("result = ", test_exact)
+        print("expected = ", expected_result)
+    else:
+        print("test_exact -> PASSED")
+
+    test_accents = index.lookup("  GASPE "), index.lookup("gaspe", "Quebec")
+    expected_result = "Gaspé", "Gaspé"
+    if test_accents != expected_result:
+        print("test_accents -> FAILED")
+        print("result = ", test_accents)
+        print("expected = ", expected_result)
+    else:
+        print("test_accents -> PASSED")
+
+    test_missing = index.lookup("Atlantide")
+    expected_result = None
+    if test_missing != expected_result:
+        print("test_missing -> FAILED")
+        print("result = ", test_missing)
+        print("expected = ", expected_result)
+    else:
+        print("test_missing -> PASSED")
+
+    test_search = index.search("Gapse")[0][0], index.search("Gas")[0][0]
+    expected_result = "Gaspé", "Gaspé"
+    if test_search != expected_result:
+        print("test_search -> FAILED")
+        print("result = ", test_search)
+        print("expected = ", expected_result)
+    else:
+        print("test_search -> PASSED")
+
+    # Index synthétique de 20 000 noms aux préfixes très communs (Saint-, Sainte-, Lac-, Mont-).
+    saints = "Anne Jean Joseph Marie Pierre Louis Paul Michel Luc Jacques Georges Henri Charles"
+    saints += " François Claude André Étienne Denis Gabriel Simon"
+    places = "des-Monts de-la-Rivière du-Lac des-Plaines de-Beauce des-Bois du-Nord de-l'Île"
+    places += " des-Pins du-Cap de-Sorel des-Érables du-Sud de-Matane des-Champs de-la-Baie"
+    places += " du-Mont des-Prés de-Lévis des-Saules Centre Est Ouest Village"
+    names = ["Gaspé"]
+    for prefix, saint, place, number in product(
+        ("Saint-", "Sainte-", "Lac-", "Mont-"), saints.split(), ["", *places.split()], range(10)
+    ):
+        name = f"{prefix}{saint}-{place}" if place else f"{prefix}{saint}"
+        names.append(f"{name} {number}" if number else name)
+    row = ClimateRow("", "Québec", 0, 0, 0, 0)
+    large = LocationIndex(dict.fromkeys(names, row))
+
+    queries = ["Saint-Jean", "Sainte-Anne-des-Monts", "Gaspe", "Sainte-Ane-des-Mont"]
+    test_large = [large.search(query)[0][0] for query in queries]
+    expected_result = ["Saint-Jean", "Sainte-Anne-des-Monts", "Gaspé", "Sainte-Anne-des-Monts"]
+    if test_large != expected_result:
+        print("test_large -> FAILED")
+        print("result = ", test_large)
+        print("expected = ", expected_result)
+    else:
+        print("test_large -> PASSED")
+
+    # Avant le plafonnement des trigrammes communs: 13 ms à 20 ms par recherche.
+    repeat = 100
+    start = perf_counter()
+    for _ in range(repeat):
+        for query in queries[:3]:
+            large.search(query)
+    elapsed = (perf_counter() - start) / (3 * repeat)
+    test_latency = elapsed < 1e-3
+    expected_result = True
+    if test_latency != expected_result:
+        print("test_latency -> FAILED")
+        print("result = ", f"{elapsed * 1e6:.2f} µs")
+        print("expected = ", "< 1000 µs")
+    else:
+        print("test_latency -> PASSED")
+    print(f"search (20 000 noms) = {elapsed * 1e6:.2f} µs")
+
+    repeat = 10000
+    start = perf_counter()
+    for _ in range(repeat):
+        index.lookup("Gaspe")
+    print(f"lookup = {(perf_counter() - start) / repeat * 1e6:.2f} µs")
+    start = perf_counter()
+    for _ in range(repeat // 10):
+        index.search("Gaspe")
+    print(f"search = {(perf_counter() - start) / (repeat // 10) * 1e6:.2f} µs")
+
+    print("-------END_TESTS-------")
+
+
+# RUN FILE
+if __name__ == "__main__":
+    tests()
+
+# END
@@ -0,0 +1,378 @@
+"""
+
+CNB 2020: Partie 4. Règles de calcul.
+Section 4.1. Charges et méthodes de calcul.
+-----------------------------------------------
+
+Vérification d'un portefeuille de projets.
+
+    Recalcule un grand nombre de projets (voir cli.evaluate) dans un pool de processus:
+        1- Les projets sont répartis en lots; chaque processus charge les données de référence
+           une seule fois à son démarrage (depuis un instantané binaire si disponible).
+           L'instantané est vérifié (et recompilé au besoin) avant le démarrage du pool.
+        2- L'échec d'un projet est consigné avec son message d'erreur sans arrêter les autres.
+        3- Les résultats sont ajoutés au fichier de sortie (JSON Lines) dès qu'un lot est terminé;
+           une vérification interrompue reprend là où elle s'était arrêtée.
+____________________________________________________________________________________________________
+
+
+    auteur: GabPoulin
+    email: poulin33@me.com
+
+====================================================================================================
+"""
+
+# IMPORTS
+import argparse
+import json
+import os
+import sys
+import tempfile
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from itertools import islice
+from cli import evaluate, read_projects
+from database import DB_PATH, configure, configured
+from reference_data import get_reference_data
+from snapshot import ensure_snapshot, install_snapshot
+
+
+# CODE
+def _project_id(project, index):
+    """Identifiant d'un projet: sa clé "id", sinon sa position dans le portefeuille."""
+
+    return str(project.get("id", index))
+
+
+def _project_ids(projects):
+    """Paires (identifiant, projet) du portefeuille.
+
+    Raises:
+        ValueError: Plusieurs projets ont le même identifiant.
+    """
+
+    pairs = [(_project_id(project, index), project) for index, project in enumerate(projects)]
+    counts = Counter(project_id for project_id, _ in pairs)
+    duplicates = [project_id for project_id, count in counts.items() if count > 1]
+    if duplicates:
+        raise ValueError(f"Identifiants de projets en double: {sorted(duplicates)}")
+
+    return pairs
+
+
+def init_worker(db_path, snapshot_path):
+    """Charge les données de référence une seule fois par processus."""
+
+    configure(db_path)
+    if snapshot_path:
+        install_snapshot(snapshot_path, db_path)
+    else:
+        get_reference_data(db_path).refresh()
+
+
+def _evaluate_shard(shard):
+    """Évalue un lot de projets.
+
+    Args:
+        shard: Paires (identifiant, projet).
+    Returns:
+        Enregistrements {"id", "results"} ou {"id", "error"}, un par projet.
+    """
+
+    records = []
+    for project_id, project in shard:
+        try:
+            records.append({"id": project_id, "results": evaluate(project)})
+        except Exception as error:  # pylint: disable=broad-except
+            records.append({"id": project_id, "error": f"{type(error).__name__}: {error}"})
+
+    return records
+
+
+def read_output(path):
+    """Enregistrements déjà écrits dans un fichier de sortie.
+    Une dernière ligne incomplète (vérification interrompue pendant l'écriture) est retirée du
+    fichier. Pour un projet écrit plusieurs fois, le dernier enregistrement l'emporte.
+
+    Returns:
+        Dictionnaire {identifiant: enregistrement}.
+    """
+
+    records = {}
+    if not os.path.exists(path):
+        return records
+
+    with open(path, "r+b") as file:
+        valid = 0
+        for line in file:
+            if not line.endswith(b"\n"):
+                break
+            try:
+                record = json.loads(line)
+            except ValueError:
+                break
+            records[record["id"]] = record
+            valid += len(line)
+        file.truncate(valid)
+
+    return records
+
+
+def run_portfolio(
+    projects,
+    output,
+    workers=None,
+    shard_size=50,
+    db_path=DB_PATH,
+    snapshot_path=None,
+    retry_failed=True,
+    progress=None,
+):
+    """Vérifie tous les projets d'un portefeuille.
+
+    Args:
+        projects: Projets (voir cli.evaluate), avec une clé "id" facultative.
+        output: Fichier JSON Lines des résultats, complété s'il existe déjà.
+
+    Optional:
+        workers: Nombre de processus (os.cpu_count() par défaut, 0 = sans pool).
+        shard_size: Nombre de projets par lot.
+        db_path: Base de données loads.db.
+        snapshot_path: Instantané de loads.db à utiliser dans les processus (voir snapshot.py),
+            recompilé avant le démarrage s'il est absent ou périmé.
+        retry_failed: Recalcule les projets dont l'échec est déjà consigné.
+        progress: Fonction appelée après chaque lot: progress(terminés, total, échecs).
+    Returns:
+        Nombre de projets calculés et nombre d'échecs pendant cet appel.
+    Raises:
+        ValueError: Plusieurs projets ont le même identifiant.
+    """
+
+    pairs = _project_ids(projects)
+    done = read_output(output)
+    todo = [
+        (project_id, project)
+        for project_id, project in pairs
+        if project_id not in done or (retry_failed and "error" in done[project_id])
+    ]
+    total = len(done) + sum(project_id not in done for project_id, _ in todo)
+    finished = total - len(todo)
+    failures = sum("error" in record for record in done.values())
+    computed = failed = 0
+
+    shards = iter(todo)
+    with open(output, "a", encoding="utf-8") as file:
+
+        def write(records):
+            nonlocal finished, failures, computed, failed
+            for record in records:
+                file.write(json.dumps(record, ensure_ascii=False) + "\n")
+                previous = done.get(record["id"])
+                if previous is not None and "error" in previous:
+                    failures -= 1
+                else:
+                    finished += 1
+                done[record["id"]] = record
+                if "error" in record:
+                    failures += 1
+                    failed += 1
+            file.flush()
+            computed += len(records)
+            if progress is not None:
+                progress(finished, total, failures)
+
+        if workers == 0:
+            # Sans pool, la base n'est configurée que le temps du calcul: la configuration du
+            # processus appelant est rétablie ensuite. L'instantané ne sert qu'aux processus.
+            with configured(db_path):
+                get_reference_data(db_path).refresh()
+                while shard := list(islice(shards, shard_size)):
+                    write(_evaluate_shard(shard))
+            return computed, failed
+
+        if snapshot_path:
+            ensure_snapshot(snapshot_path, db_path)
+        workers = workers or os.cpu_count()
+        with ProcessPoolExecutor(
+            workers,
+            initializer=init_worker,
+            initargs=(db_path, snapshot_path),
+        ) as executor:
+            pending = set()
+            while True:
+                while len(pending) < 2 * workers and (shard := list(islice(shards, shard_size))):
+                    pending.add(executor.submit(_evaluate_shard, shard))
+                if not pending:
+                    break
+                completed, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in completed:
+                    write(future.result())
+
+    return computed, failed
+
+
+def _print_progress(finished, total, failures):
+    print(f"\r{finished}/{total} projets, {failures} échec(s)", end="", file=sys.stderr)
+
+
+def main(argv=None):
+    """Point d'entrée: python portfolio.py projets.json resultats.jsonl [options]"""
+
+    parser = argparse.ArgumentParser(description="Vérification d'un portefeuille de projets.")
+    parser.add_argument("input", help="Fichier JSON ou CSV des projets.")
+    parser.add_argument("output", help="Fichier JSON Lines des résultats (repris s'il existe).")
+    parser.add_argument("--format", choices=("json", "csv"), help="Format d'entrée.")
+    parser.add_argument("--workers", type=int, help="Nombre de processus.")
+    parser.add_argument("--shard-size", type=int, default=50, help="Nombre de projets par lot.")
+    parser.add_argument("--db", default=DB_PATH, help="Base de données loads.db.")
+    parser.add_argument("--snapshot", help="Instantané binaire de loads.db (voir snapshot.py).")
+    parser.add_argument(
+        "--skip-failed",
+        action="store_true",
+        help="Ne recalcule pas les projets dont l'échec est déjà consigné.",
+    )
+    args = parser.parse_args(argv)
+
+    input_format = args.format or ("csv" if args.input.endswith(".csv") else "json")
+    with open(args.input, newline="", encoding="utf-8") as file:
+        projects = read_projects(file, input_format)
+
+    computed, failed = run_portfolio(
+        projects,
+        args.output,
+        args.workers,
+        args.shard_size,
+        args.db,
+        args.snapshot,
+        not args.skip_failed,
+        _print_progress,
+    )
+    print(f"\n{computed} projet(s) calculé(s), {failed} échec(s)", file=sys.stderr)
+
+
+# TESTS
+def tests():
+    """Tests pour run_portfolio."""
+
+    import shutil
+    import sqlite3
+    from database import db_path
+    from snapshot import build_snapshot
+
+    print("------START_TESTS------")
+
+    projects = [
+        {
+            "id": f"P{i}",
+            "materials": ["2x10 à 16po", ["Eau douce", i % 50]],
+            "use": "Résidentiel",
+            "width": 4 + i % 5,
+            "length": 5,
+            "location": "Gaspé",
+            "roof_height": 5,
+            "roof_larger_dimension": 20,
+            "roof_smaller_dimension": 10,
+            "slope": i % 60,
+        }
+        for i in range(200)
+    ]
+    projects[17]["materials"] = ["Matériau inconnu"]
+    expected = {project["id"]: evaluate(project) for project in projects if project["id"] != "P17"}
+
+    with tempfile.TemporaryDirectory() as folder:
+        output = os.path.join(folder, "resultats.jsonl")
+        calls = []
+        test_run = run_portfolio(
+            projects[:120],
+            output,
+            workers=2,
+            shard_size=16,
+            progress=lambda *args: calls.append(args),
+        )
+        expected_result = 120, 1
+        if test_run != expected_result or calls[-1] != (120, 120, 1):
+            print("test_run -> FAILED")
+            print("result = ", test_run, calls[-1])
+            print("expected = ", expected_result)
+        else:
+            print("test_run -> PASSED")
+
+        with open(output, "a", encoding="utf-8") as file:
+            file.write('{"id": "P120", "resu')
+        snapshot_path = os.path.join(folder, "loads.snapshot")
+        build_snapshot(DB_PATH, snapshot_path)
+        test_resume = run_portfolio(
+            projects,
+            output,
+            workers=2,
+            shard_size=16,
+            snapshot_path=snapshot_path,
+            retry_failed=False,
+        )
+        expected_result = 80, 0
+        if test_resume != expected_result:
+            print("test_resume -> FAILED")
+            print("result = ", test_resume)
+            print("expected = ", expected_result)
+        else:
+            print("test_resume -> PASSED")
+
+        records = read_output(output)
+        test_results = {
+            project_id: record["results"]
+            for project_id, record in records.items()
+            if "results" in record
+        }
+        if test_results != expected or "error" not in records["P17"]:
+            print("test_results -> FAILED")
+        else:
+            print("test_results -> PASSED")
+
+        try:
+            run_portfolio(projects[:3] + projects[1:2], output)
+            duplicates = None
+        except ValueError as error:
+            duplicates = str(error)
+        test_duplicates = duplicates
+        expected_result = "Identifiants de projets en double: ['P1']"
+        if test_duplicates != expected_result:
+            print("test_duplicates -> FAILED")
+            print("result = ", test_duplicates)
+            print("expected = ", expected_result)
+        else:
+            print("test_duplicates -> PASSED")
+
+        copy = os.path.join(folder, "copie.db")
+        shutil.copy(DB_PATH, copy)
+        with sqlite3.connect(copy) as connection:
+            connection.execute("UPDATE climatic_data SET snow = snow + 1 WHERE location = 'Gaspé'")
+        test_stale = ensure_snapshot(snapshot_path, copy), ensure_snapshot(snapshot_path, copy)
+        expected_result = True, False
+        if test_stale != expected_result:
+            print("test_stale -> FAILED")
+            print("result = ", test_stale)
+            print("expected = ", expected_result)
+        else:
+            print("test_stale -> PASSED")
+
+        output = os.path.join(folder, "sans_pool.jsonl")
+        test_in_process = run_portfolio(projects[:5], output, workers=0, db_path=copy), db_path()
+        expected_result = (5, 0), DB_PATH
+        if test_in_process != expected_result:
+            print("test_in_process -> FAILED")
+            print("result = ", test_in_process)
+            print("expected = ", expected_result)
+        else:
+            print("test_in_process -> PASSED")
+
+    print("-------END_TESTS-------")
+
+
+# RUN FILE
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        main()
+    else:
+        tests()
+
+# END
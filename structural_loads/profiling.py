@@ -0,0 +1,335 @@
+"""
+
+CNB 2020: Partie 4. Règles de calcul.
+Section 4.1. Charges et méthodes de calcul.
+-----------------------------------------------
+
+Profilage des calculateurs.
+
+    Instrumentation facultative de SnowLoads, LiveLoads, DeadLoads et LimitStatesDesign:
+        1- Nombre d'appels, temps cumulé et temps propre de chaque méthode, par pile d'appels.
+        2- Nombre et durée des requêtes SQL (événements SQLAlchemy) de chaque calcul de premier
+           niveau, c'est-à-dire d'un appel qui n'est pas fait par une autre méthode instrumentée.
+        3- Export en piles repliées (flamegraph.pl, speedscope) et tableau sommaire.
+    Les méthodes ne sont remplacées que pendant le profilage: désactivé, le coût est nul.
+
+        with profile() as profiler:
+            SnowLoads("Gaspé", 5, 20, 10, 25).specified_load()
+        print(profiler.table())
+____________________________________________________________________________________________________
+
+
+    auteur: GabPoulin
+    email: poulin33@me.com
+
+====================================================================================================
+"""
+
+# IMPORTS
+import threading
+from contextlib import contextmanager
+from functools import wraps
+from time import perf_counter
+from dead_loads import DeadLoads
+from limit_state_design import LimitStatesDesign
+from live_loads import LiveLoads
+from snow_loads import SnowLoads
+
+
+# CODE
+CLASSES = (SnowLoads, LiveLoads, DeadLoads, LimitStatesDesign)
+SQL = "SQL"
+
+_active = None
+
+
+class Profiler:
+    """Profileur des méthodes des calculateurs.
+
+    Optional:
+        classes: Classes à instrumenter (CLASSES par défaut).
+    """
+
+    def __init__(self, classes=CLASSES):
+        self.classes = classes
+        self.stacks = {}
+        self.calculations = []
+        self._originals = []
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    # Instrumentation
+    def enable(self):
+        """Remplace les méthodes des classes par leurs versions instrumentées."""
+
+        global _active
+
+        from sqlalchemy import event
+        from sqlalchemy.engine import Engine
+
+        if _active is not None:
+            raise RuntimeError("Un profileur est déjà actif.")
+        _active = self
+
+        for cls in self.classes:
+            for attribute, value in list(vars(cls).items()):
+                if attribute.startswith("__"):
+                    continue
+                name = f"{cls.__name__}.{attribute}"
+                if isinstance(value, property):
+                    wrapped = property(self._wrap(name, value.fget), value.fset, value.fdel)
+                elif isinstance(value, (staticmethod, classmethod)):
+                    wrapped = type(value)(self._wrap(name, value.__func__))
+                elif callable(value):
+                    wrapped = self._wrap(name, value)
+                else:
+                    continue
+                self._originals.append((cls, attribute, value))
+                setattr(cls, attribute, wrapped)
+
+        event.listen(Engine, "before_cursor_execute", self._before_sql)
+        event.listen(Engine, "after_cursor_execute", self._after_sql)
+
+        return self
+
+    def disable(self):
+        """Rétablit les méthodes d'origine."""
+
+        global _active
+
+        from sqlalchemy import event
+        from sqlalchemy.engine import Engine
+
+        event.remove(Engine, "before_cursor_execute", self._before_sql)
+        event.remove(Engine, "after_cursor_execute", self._after_sql)
+
+        for cls, attribute, value in reversed(self._originals):
+            setattr(cls, attribute, value)
+        self._originals = []
+        _active = None
+
+    def _stack(self):
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+
+        return stack
+
+    def _wrap(self, name, function):
+        profiler = self
+
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            return profiler._call(name, function, args, kwargs)
+
+        return wrapper
+
+    def _call(self, name, function, args, kwargs):
+        """Appelle une méthode en mesurant son temps cumulé et son temps propre.
+        Chaque cadre de la pile: [pile, temps des enfants, requêtes SQL, temps SQL].
+        """
+
+        stack = self._stack()
+        path = (stack[-1][0] if stack else ()) + (name,)
+        frame = [path, 0.0, 0, 0.0]
+        stack.append(frame)
+        start = perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            elapsed = perf_counter() - start
+            stack.pop()
+            self._record(path, elapsed, elapsed - frame[1])
+            if stack:
+                stack[-1][1] += elapsed
+            else:
+                with self._lock:
+                    self.calculations.append((name, elapsed, frame[2], frame[3]))
+
+    def _record(self, path, elapsed, own):
+        with self._lock:
+            stats = self.stacks.get(path)
+            if stats is None:
+                stats = self.stacks[path] = [0, 0.0, 0.0]
+            stats[0] += 1
+            stats[1] += elapsed
+            stats[2] += own
+
+    def _before_sql(self, conn, cursor, statement, parameters, context, executemany):
+        self._local.sql_start = perf_counter()
+
+    def _after_sql(self, conn, cursor, statement, parameters, context, executemany):
+        elapsed = perf_counter() - getattr(self._local, "sql_start", perf_counter())
+        stack = self._stack()
+        if not stack:
+            self._record((SQL,), elapsed, elapsed)
+            return
+
+        self._record(stack[-1][0] + (SQL,), elapsed, elapsed)
+        stack[-1][1] += elapsed
+        stack[0][2] += 1
+        stack[0][3] += elapsed
+
+    # Rapports
+    def methods(self):
+        """Statistiques par méthode, de la plus coûteuse (temps propre) à la moins coûteuse.
+        Le temps cumulé d'une méthode n'est compté qu'une fois quand elle s'appelle elle-même.
+
+        Returns:
+            Liste de (méthode, appels, temps cumulé, temps propre), en secondes.
+        """
+
+        totals = {}
+        for path, (calls, elapsed, own) in self.stacks.items():
+            name = path[-1]
+            row = totals.setdefault(name, [0, 0.0, 0.0])
+            row[0] += calls
+            if name not in path[:-1]:
+                row[1] += elapsed
+            row[2] += own
+
+        rows = [(name, *row) for name, row in totals.items()]
+
+        return sorted(rows, key=lambda row: row[3], reverse=True)
+
+    def sql(self):
+        """Requêtes SQL de chaque calcul de premier niveau qui en a émis.
+
+        Returns:
+            Liste de (méthode, durée, nombre de requêtes, durée SQL), en secondes.
+        """
+
+        return [calculation for calculation in self.calculations if calculation[2]]
+
+    def collapsed(self):
+        """Piles repliées pour flamegraph.pl ou speedscope: "a;b;c poids" par ligne, le poids
+        étant le temps propre en microsecondes.
+        """
+
+        lines = []
+        for path, (_, _, own) in sorted(self.stacks.items()):
+            weight = round(own * 1e6)
+            if weight > 0:
+                lines.append(f"{';'.join(path)} {weight}")
+
+        return "\n".join(lines)
+
+    def write_collapsed(self, path):
+        """Écrit les piles repliées dans un fichier."""
+
+        with open(path, "w", encoding="utf-8") as file:
+            file.write(self.collapsed() + "\n")
+
+    def table(self, limit=None):
+        """Tableau sommaire des méthodes et des requêtes SQL."""
+
+        lines = [f"{'Méthode':<45}{'Appels':>10}{'Cumulé (ms)':>14}{'Propre (ms)':>14}"]
+        for name, calls, elapsed, own in self.methods()[:limit]:
+            lines.append(f"{name:<45}{calls:>10}{elapsed * 1e3:>14.3f}{own * 1e3:>14.3f}")
+
+        calculations = len(self.calculations)
+        queries = sum(calculation[2] for calculation in self.calculations)
+        sql_time = sum(calculation[3] for calculation in self.calculations)
+        lines.append(
+            f"{calculations} calcul(s) de premier niveau, {queries} requête(s) SQL "
+            f"({sql_time * 1e3:.3f} ms)"
+        )
+
+        return "\n".join(lines)
+
+
+@contextmanager
+def profile(classes=CLASSES):
+    """Profile les calculateurs le temps d'un bloc with.
+
+    Yields:
+        Profiler actif, dont les rapports restent disponibles après le bloc.
+    """
+
+    profiler = Profiler(classes).enable()
+    try:
+        yield profiler
+    finally:
+        profiler.disable()
+
+
+# TESTS
+def tests():
+    """Tests pour la classe Profiler."""
+
+    import os
+    import tempfile
+    from reference_data import clear_reference_data
+
+    print("------START_TESTS------")
+
+    original = SnowLoads.specified_load
+    clear_reference_data()
+    with profile() as profiler:
+        roof = SnowLoads("Gaspé", 5, 20, 10, 25)
+        load = roof.specified_load()
+        roof.specified_load()
+        LiveLoads("Entrepôt").uniform_load(15, 8)
+        design = LimitStatesDesign(DeadLoads(["2x10 à 16po"]).sum_dead_loads(), 4.4, load)
+        design.uls()
+
+    methods = {row[0]: row[1:] for row in profiler.methods()}
+    test_calls = (
+        methods["SnowLoads.specified_load"][0],
+        methods["SnowLoads._get_climate_info"][0] >= 1,
+        methods["LimitStatesDesign.uls_cases"][0],
+        SnowLoads.specified_load is original,
+    )
+    expected_result = 2, True, 1, True
+    if test_calls != expected_result:
+        print("test_calls -> FAILED")
+        print("result = ", test_calls)
+        print("expected = ", expected_result)
+    else:
+        print("test_calls -> PASSED")
+
+    _, elapsed, own = methods["SnowLoads.specified_load"]
+    test_times = elapsed >= own >= 0, elapsed >= methods["SnowLoads._specified_snow_load"][1]
+    expected_result = True, True
+    if test_times != expected_result:
+        print("test_times -> FAILED")
+        print("result = ", test_times)
+        print("expected = ", expected_result)
+    else:
+        print("test_times -> PASSED")
+
+    test_sql = [(calculation[0], calculation[2]) for calculation in profiler.sql()]
+    expected_result = [("SnowLoads.specified_load", 3)]
+    if test_sql != expected_result:
+        print("test_sql -> FAILED")
+        print("result = ", test_sql)
+        print("expected = ", expected_result)
+    else:
+        print("test_sql -> PASSED")
+
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, "profil.folded")
+        profiler.write_collapsed(path)
+        with open(path, encoding="utf-8") as file:
+            lines = file.read().splitlines()
+    test_collapsed = all(line.rsplit(" ", 1)[1].isdigit() for line in lines), any(
+        line.startswith("SnowLoads.specified_load;") and f";{SQL} " in line for line in lines
+    )
+    expected_result = True, True
+    if test_collapsed != expected_result:
+        print("test_collapsed -> FAILED")
+        print("result = ", test_collapsed)
+        print("expected = ", expected_result)
+    else:
+        print("test_collapsed -> PASSED")
+
+    print(profiler.table(limit=8))
+
+    print("-------END_TESTS-------")
+
+
+# RUN FILE
+if __name__ == "__main__":
+    tests()
+
+# END
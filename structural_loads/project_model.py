@@ -0,0 +1,375 @@
+"""
+
+CNB 2020: Partie 4. Règles de calcul.
+Section 4.1. Charges et méthodes de calcul.
+-----------------------------------------------
+
+Modèle de projet à recalcul incrémental.
+
+    Relie les données d'un projet (matériaux, usage, emplacement, géométrie du toit) aux
+    résultats (D, L, S, ÉLU, ÉLTS) par un graphe de dépendances:
+        1- Une modification ne recalcule que les résultats qui en dépendent.
+        2- Un résultat inchangé n'entraîne pas le recalcul des résultats suivants.
+        3- BackgroundEngine regroupe les modifications rapprochées (frappes au clavier) et fait
+           les calculs dans un fil d'exécution séparé pour ne jamais bloquer l'interface.
+____________________________________________________________________________________________________
+
+
+    auteur: GabPoulin
+    email: poulin33@me.com
+
+====================================================================================================
+"""
+
+# IMPORTS
+import queue
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from dead_loads import DeadLoads
+from limit_state_design import LimitStatesDesign
+from live_loads import LiveLoads
+from snow_loads import SnowLoads
+
+
+# CODE
+INPUTS = {
+    "materials": (),
+    "add_partitions": False,
+    "additional_loads": 0,
+    "use": None,
+    "width": 0,
+    "length": 0,
+    "reinforced_slab": False,
+    "importance": "Normal",
+    "location": None,
+    "roof": {},
+    "wind": 0,
+    "earthquake": 0,
+    "design": {},
+}
+
+
+def _dead(v):
+    return DeadLoads(v["materials"]).sum_dead_loads(v["add_partitions"], v["additional_loads"])
+
+
+def _live(v):
+    if v["use"] is None:
+        return 0
+
+    load, _ = LiveLoads(v["use"], v["importance"]).uniform_load(
+        v["width"],
+        v["length"],
+        v["reinforced_slab"],
+    )
+
+    return load
+
+
+def _snow(v):
+    if v["location"] is None:
+        return 0
+
+    return SnowLoads(v["location"], importance=v["importance"], **v["roof"]).specified_load()
+
+
+def _limit_states(v):
+    return LimitStatesDesign(
+        v["dead"],
+        v["live"],
+        v["snow"],
+        v["wind"],
+        v["earthquake"],
+        **v["design"],
+    )
+
+
+# Résultats dans l'ordre de calcul: dépendances et fonction de calcul.
+OUTPUTS = {
+    "dead": (("materials", "add_partitions", "additional_loads"), _dead),
+    "live": (("use", "importance", "width", "length", "reinforced_slab"), _live),
+    "snow": (("location", "importance", "roof"), _snow),
+    "uls": (
+        ("dead", "live", "snow", "wind", "earthquake", "design"),
+        lambda v: _limit_states(v).uls(),
+    ),
+    "sls": (
+        ("dead", "live", "snow", "wind", "earthquake", "design"),
+        lambda v: _limit_states(v).sls(),
+    ),
+}
+DEPENDENTS = {
+    name: [output for output, (depends, _) in OUTPUTS.items() if name in depends]
+    for name in [*INPUTS, *OUTPUTS]
+}
+
+
+class ProjectModel:
+    """Données et résultats d'un projet, recalculés au besoin.
+
+    Args:
+        **inputs: Valeurs initiales des données (voir INPUTS).
+    """
+
+    def __init__(self, **inputs):
+        unknown = set(inputs) - set(INPUTS)
+        if unknown:
+            raise KeyError(f"Données inconnues: {sorted(unknown)}")
+
+        self.values = {**INPUTS, **inputs, **dict.fromkeys(OUTPUTS)}
+        self.errors = {}
+        self.evaluations = Counter()
+        self._dirty = set(OUTPUTS)
+
+    def set(self, name, value):
+        """Modifie une donnée et marque les résultats qui en dépendent."""
+
+        if name not in INPUTS:
+            raise KeyError(f"Donnée inconnue: {name}")
+        if self.values[name] == value:
+            return
+
+        self.values[name] = value
+        self._dirty.update(DEPENDENTS[name])
+
+    def evaluate(self):
+        """Recalcule les résultats marqués.
+
+        Returns:
+            Résultats dont la valeur a changé.
+        """
+
+        changed = {}
+        for name, (_, compute) in OUTPUTS.items():
+            if name not in self._dirty:
+                continue
+            self._dirty.discard(name)
+            self.evaluations[name] += 1
+
+            try:
+                value = compute(self.values)
+                self.errors.pop(name, None)
+            except Exception as error:
+                value = None
+                self.errors[name] = error
+
+            if value != self.values[name]:
+                self.values[name] = value
+                changed[name] = value
+                self._dirty.update(DEPENDENTS[name])
+
+        return changed
+
+    def results(self):
+        """Valeurs courantes des résultats."""
+
+        return {name: self.values[name] for name in OUTPUTS}
+
+
+class BackgroundEngine:
+    """Calcule un ProjectModel dans un fil d'exécution séparé.
+        Les modifications sont regroupées pendant `delay` secondes, puis appliquées et calculées
+        par le fil de calcul. L'interface récupère les résultats avec poll(), par exemple depuis
+        un appel périodique de Tk.after().
+
+    Args:
+        model: Modèle du projet (un nouveau ProjectModel par défaut).
+        delay: Délai de regroupement des modifications (s).
+    """
+
+    def __init__(self, model=None, delay=0.25):
+        self.model = model or ProjectModel()
+        self.delay = delay
+        self._results = queue.Queue()
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._timer = None
+        self._executor = ThreadPoolExecutor(1)
+
+    def set(self, name, value):
+        """Enregistre une modification; le calcul est lancé `delay` secondes après la dernière."""
+
+        if name not in INPUTS:
+            raise KeyError(f"Donnée inconnue: {name}")
+
+        with self._lock:
+            self._pending[name] = value
+            if self._timer is not None:
+                self._timer.cancel()
+            self._timer = threading.Timer(self.delay, self._submit)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _submit(self):
+        return self._executor.submit(self._run)
+
+    def _run(self):
+        """Applique les modifications en attente et calcule le modèle.
+        Les résultats et les erreurs sont toujours publiés, même si le calcul échoue: une
+        modification refusée est enregistrée dans les erreurs sous le nom de la donnée.
+        """
+
+        with self._lock:
+            pending, self._pending = self._pending, {}
+
+        changed = {}
+        try:
+            for name, value in pending.items():
+                try:
+                    self.model.set(name, value)
+                    self.model.errors.pop(name, None)
+                except Exception as error:
+                    self.model.errors[name] = error
+            changed = self.model.evaluate()
+        finally:
+            self._results.put((changed, dict(self.model.errors)))
+
+    def poll(self):
+        """Résultats calculés depuis le dernier appel, sans attendre.
+
+        Returns:
+            Résultats modifiés et erreurs courantes.
+        """
+
+        changed = {}
+        errors = None
+        while True:
+            try:
+                update, errors = self._results.get_nowait()
+            except queue.Empty:
+                break
+            changed.update(update)
+
+        return changed, errors or {}
+
+    def flush(self):
+        """Lance immédiatement les modifications en attente et attend la fin du calcul."""
+
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+        self._submit().result()
+
+    def close(self):
+        """Arrête le fil de calcul."""
+
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+# TESTS
+def tests():
+    """Tests pour ProjectModel et BackgroundEngine."""
+
+    print("------START_TESTS------")
+
+    roof = {
+        "roof_height": 5,
+        "roof_larger_dimension": 20,
+        "roof_smaller_dimension": 10,
+        "slope": 25,
+    }
+    model = ProjectModel(
+        materials=["2x10 à 16po", "Panneau de gypse 12mm"],
+        use="Résidentiel",
+        width=4,
+        length=5,
+        location="Gaspé",
+        roof=roof,
+    )
+    model.evaluate()
+
+    model.set("materials", ["2x10 à 16po"])
+    changed = model.evaluate()
+    test_downstream = sorted(changed), dict(model.evaluations)
+    expected_result = ["dead", "sls", "uls"], {
+        "dead": 2,
+        "live": 1,
+        "snow": 1,
+        "uls": 2,
+        "sls": 2,
+    }
+    if test_downstream != expected_result:
+        print("test_downstream -> FAILED")
+        print("result = ", test_downstream)
+        print("expected = ", expected_result)
+    else:
+        print("test_downstream -> PASSED")
+
+    model.set("roof", {**roof, "slope": 26})
+    test_unchanged = model.evaluate(), model.evaluations["uls"]
+    expected_result = {}, 2
+    if test_unchanged != expected_result:
+        print("test_unchanged -> FAILED")
+        print("result = ", test_unchanged)
+        print("expected = ", expected_result)
+    else:
+        print("test_unchanged -> PASSED")
+
+    model.set("materials", ["Eau douce"])
+    model.evaluate()
+    test_error = type(model.errors.get("dead")), model.values["uls"]
+    expected_result = ValueError, None
+    if test_error != expected_result:
+        print("test_error -> FAILED")
+        print("result = ", test_error)
+        print("expected = ", expected_result)
+    else:
+        print("test_error -> PASSED")
+
+    engine = BackgroundEngine(delay=0.05)
+    for width in range(1, 21):
+        engine.set("use", "Stockage")
+        engine.set("width", width)
+        engine.set("length", 10)
+    time.sleep(0.3)
+    changed, _ = engine.poll()
+    test_debounce = engine.model.evaluations["live"], changed["live"]
+    expected_result = 1, LiveLoads("Stockage").uniform_load(20, 10)[0]
+    if test_debounce != expected_result:
+        print("test_debounce -> FAILED")
+        print("result = ", test_debounce)
+        print("expected = ", expected_result)
+    else:
+        print("test_debounce -> PASSED")
+    engine.close()
+
+    model.set("roof", {**roof, "roof_larger_dimension": 0})
+    model.set("materials", ["2x10 à 16po"])
+    changed = model.evaluate()
+    test_any_error = type(model.errors.get("snow")), "dead" in changed, model.values["uls"]
+    expected_result = ZeroDivisionError, True, None
+    if test_any_error != expected_result:
+        print("test_any_error -> FAILED")
+        print("result = ", test_any_error)
+        print("expected = ", expected_result)
+    else:
+        print("test_any_error -> PASSED")
+
+    inputs = {name: model.values[name] for name in INPUTS}
+    engine = BackgroundEngine(ProjectModel(**inputs), delay=0)
+    engine.set("width", 6)
+    engine.flush()
+    changed, errors = engine.poll()
+    test_published = "live" in changed, type(errors.get("snow"))
+    expected_result = True, ZeroDivisionError
+    if test_published != expected_result:
+        print("test_published -> FAILED")
+        print("result = ", test_published)
+        print("expected = ", expected_result)
+    else:
+        print("test_published -> PASSED")
+    engine.close()
+
+    print("-------END_TESTS-------")
+
+
+# RUN FILE
+if __name__ == "__main__":
+    tests()
+
+# END
@@ -0,0 +1,317 @@
+"""
+
+CNB 2020: Partie 4. Règles de calcul.
+Section 4.1. Charges et méthodes de calcul.
+-----------------------------------------------
+
+Données de référence.
+
+    Charge une seule fois les tables dead_loads, live_loads et climatic_data de loads.db en
+    mémoire et les sert aux calculateurs par simple lecture de dictionnaire. Les données sont
+    rechargées automatiquement lorsque le fichier loads.db est modifié; la date du fichier n'est
+    vérifiée qu'une fois par check_interval secondes (ou sur demande avec refresh(force=True)).
+    generation() change à chaque chargement ou remplacement des tables (ou changement de base),
+    pour que les valeurs mémorisées par les calculateurs (SnowLoads) suivent les rechargements.
+____________________________________________________________________________________________________
+
+
+    auteur: GabPoulin
+    email: poulin33@me.com
+
+====================================================================================================
+"""
+
+# IMPORTS
+import os
+import threading
+from collections import namedtuple
+from time import monotonic, perf_counter
+from database import DB_PATH, db_path, get_engine
+
+
+# DB CONNECTION
+DeadLoadRow = namedtuple("DeadLoadRow", "material category load unit")
+LiveLoadRow = namedtuple("LiveLoadRow", "use uniform concentrated area_x area_y")
+ClimateRow = namedtuple("ClimateRow", "location province rain snow snow_rain wind")
+Tables = namedtuple("Tables", "dead_loads categories live_loads climatic_data")
+
+
+# CODE
+class ReferenceData:
+    """Copie en mémoire des tables de référence de loads.db.
+
+    Args:
+        path: Chemin du fichier loads.db.
+
+    Optional:
+        check_interval: Délai minimal entre deux vérifications de la date de loads.db (s).
+    """
+
+    def __init__(self, path=DB_PATH, check_interval=1.0):
+        self.path = path
+        self.check_interval = check_interval
+        self._stamp = None
+        self._checked = None
+        self._lock = threading.Lock()
+        self._tables = Tables({}, {}, {}, {})
+
+    @property
+    def dead_loads(self):
+        """Table dead_loads: {matériau: DeadLoadRow}."""
+
+        return self._tables.dead_loads
+
+    @property
+    def categories(self):
+        """Matériaux de dead_loads par catégorie."""
+
+        return self._tables.categories
+
+    @property
+    def live_loads(self):
+        """Table live_loads: {usage: LiveLoadRow}."""
+
+        return self._tables.live_loads
+
+    @property
+    def climatic_data(self):
+        """Table climatic_data: {emplacement: ClimateRow}."""
+
+        return self._tables.climatic_data
+
+    def _file_stamp(self):
+        """Date de modification et taille du fichier; change dès que loads.db est modifié."""
+
+        stat = os.stat(self.path)
+
+        return stat.st_mtime_ns, stat.st_size
+
+    def _load(self):
+        """Lit les trois tables en une seule connexion, puis les remplace d'un seul coup: une
+        recherche concurrente voit toutes les anciennes tables ou toutes les nouvelles.
+        SQLAlchemy n'est importé qu'ici, au premier chargement, pour garder l'importation des
+        calculateurs rapide.
+        """
+
+        from sqlalchemy import text
+
+        with get_engine(self.path).connect() as connection:
+            dead_loads = connection.execute(
+                text("SELECT material, category, load, unit FROM dead_loads")
+            )
+            live_loads = connection.execute(
+                text(
+                    'SELECT use, uniform, concentrated, "area (x)", "area (y)" FROM live_loads'
+                )
+            )
+            climatic_data = connection.execute(
+                text(
+                    "SELECT location, province, rain, snow, snow_rain, wind FROM climatic_data"
+                )
+            )
+            dead_loads = {row[0]: DeadLoadRow(*row) for row in dead_loads}
+            live_loads = {row[0]: LiveLoadRow(*row) for row in live_loads}
+            climatic_data = {row[0]: ClimateRow(*row) for row in climatic_data}
+        categories = {}
+        for row in dead_loads.values():
+            categories.setdefault(row.category, []).append(row.material)
+
+        self._tables = Tables(dead_loads, categories, live_loads, climatic_data)
+
+    def refresh(self, force=False):
+        """Recharge les tables si loads.db a été modifié depuis le dernier chargement.
+        La date du fichier n'est vérifiée qu'une fois par check_interval secondes, sauf si force.
+        """
+
+        now = monotonic()
+        if not force and self._stamp is not None and now - self._checked < self.check_interval:
+            return self
+
+        stamp = self._file_stamp()
+        self._checked = now
+        if stamp != self._stamp:
+            with self._lock:
+                if stamp != self._stamp:
+                    self._load()
+                    self._stamp = stamp
+                    _reloaded()
+
+        return self
+
+    def dead_load(self, material):
+        """Ligne de dead_loads pour le matériau (None si absent)."""
+
+        return self.refresh()._tables.dead_loads.get(material)
+
+    def materials(self, category):
+        """Matériaux de dead_loads d'une catégorie, dans l'ordre de la table."""
+
+        return self.refresh()._tables.categories.get(category, [])
+
+    def live_load(self, use):
+        """Ligne de live_loads pour l'usage (None si absent)."""
+
+        return self.refresh()._tables.live_loads.get(use)
+
+    def climate(self, location):
+        """Ligne de climatic_data pour l'emplacement (None si absent)."""
+
+        return self.refresh()._tables.climatic_data.get(location)
+
+
+_instances = {}
+_generation = 0
+
+
+def _reloaded():
+    """Change le numéro des tables de référence (voir generation())."""
+
+    global _generation
+    _generation += 1
+
+
+def generation():
+    """Identifie les tables servies par get_reference_data(): change à chaque chargement ou
+    remplacement des tables, et lorsque la base configurée dans database change.
+    """
+
+    return _generation, db_path()
+
+
+def get_reference_data(path=None):
+    """Retourne l'instance partagée de ReferenceData pour le fichier demandé (la base configurée
+    dans database par défaut).
+    """
+
+    path = path or db_path()
+    key = os.path.abspath(path)
+    instance = _instances.get(key)
+    if instance is None:
+        instance = _instances.setdefault(key, ReferenceData(path))
+
+    return instance
+
+
+def set_reference_data(data, path=None):
+    """Remplace l'instance partagée pour le fichier demandé (par exemple par un instantané)."""
+
+    _instances[os.path.abspath(path or db_path())] = data
+    _reloaded()
+
+
+def clear_reference_data():
+    """Oublie les tables chargées; la prochaine recherche relira loads.db."""
+
+    _instances.clear()
+    _reloaded()
+
+
+def lookup_latency(location="Gaspé", repeat=10000, path=DB_PATH):
+    """Mesure le temps d'une recherche à froid (chargement des tables) et à chaud (en mémoire).
+
+    Args:
+        location: Emplacement recherché dans climatic_data.
+        repeat: Nombre de recherches à chaud à moyenner.
+        path: Chemin du fichier loads.db.
+    Returns:
+        Temps en secondes {"cold": ..., "warm": ...}.
+    """
+
+    data = ReferenceData(path)
+
+    start = perf_counter()
+    data.climate(location)
+    cold = perf_counter() - start
+
+    start = perf_counter()
+    for _ in range(repeat):
+        data.climate(location)
+    warm = (perf_counter() - start) / repeat
+
+    return {"cold": cold, "warm": warm}
+
+
+# TESTS
+def tests():
+    """Tests pour la classe ReferenceData."""
+
+    import shutil
+    import sqlite3
+    import tempfile
+
+    print("------START_TESTS------")
+
+    data = ReferenceData()
+    test_climate = data.climate("Gaspé")
+    expected_result = ClimateRow("Gaspé", "Québec", 118, 4.3, 0.6, 0.48)
+    if test_climate != expected_result:
+        print("test_climate -> FAILED")
+        print("result = ", test_climate)
+        print("expected = ", expected_result)
+    else:
+        print("test_climate -> PASSED")
+
+    test_live_load = data.live_load("Garage (véhicules > 9000 kg)")[1:]
+    expected_result = 12.0, 54.0, 250, 600
+    if test_live_load != expected_result:
+        print("test_live_load -> FAILED")
+        print("result = ", test_live_load)
+        print("expected = ", expected_result)
+    else:
+        print("test_live_load -> PASSED")
+
+    test_missing = data.dead_load("Matériau inexistant")
+    expected_result = None
+    if test_missing != expected_result:
+        print("test_missing -> FAILED")
+        print("result = ", test_missing)
+        print("expected = ", expected_result)
+    else:
+        print("test_missing -> PASSED")
+
+    test_materials = data.materials("Bois de sciage")[:2]
+    expected_result = ["Douglas-mélèze 12%", "Douglas-mélèze 15%"]
+    if test_materials != expected_result:
+        print("test_materials -> FAILED")
+        print("result = ", test_materials)
+        print("expected = ", expected_result)
+    else:
+        print("test_materials -> PASSED")
+
+    test_shared = get_reference_data() is get_reference_data(DB_PATH)
+    expected_result = True
+    if test_shared != expected_result:
+        print("test_shared -> FAILED")
+        print("result = ", test_shared)
+        print("expected = ", expected_result)
+    else:
+        print("test_shared -> PASSED")
+
+    with tempfile.TemporaryDirectory() as folder:
+        copy = os.path.join(folder, DB_PATH)
+        shutil.copy(DB_PATH, copy)
+        data = ReferenceData(copy, check_interval=3600)
+        before = data.climate("Gaspé").snow
+        with sqlite3.connect(copy) as connection:
+            connection.execute("UPDATE climatic_data SET snow = snow + 1 WHERE location = 'Gaspé'")
+        test_throttle = data.climate("Gaspé").snow, data.refresh(force=True).climate("Gaspé").snow
+        expected_result = before, before + 1
+        if test_throttle != expected_result:
+            print("test_throttle -> FAILED")
+            print("result = ", test_throttle)
+            print("expected = ", expected_result)
+        else:
+            print("test_throttle -> PASSED")
+
+    latency = lookup_latency()
+    print(f"cold = {latency['cold'] * 1e3:.3f} ms")
+    print(f"warm = {latency['warm'] * 1e6:.3f} µs")
+
+    print("-------END_TESTS-------")
+
+
+# RUN FILE
+if __name__ == "__main__":
+    tests()
+
+# END
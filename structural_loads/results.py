@@ -0,0 +1,304 @@
+"""
+
+CNB 2020: Partie 4. Règles de calcul.
+Section 4.1. Charges et méthodes de calcul.
+-----------------------------------------------
+
+Résultats détaillés.
+
+    Enregistrements légers (__slots__) retournés par les méthodes *_result() des calculateurs:
+        1- La valeur retenue et chacun des coefficients intermédiaires (Is, Cb, Cw, Cs, Ca,
+           coefficient de réduction, cas de charge déterminant, etc.).
+        2- Le message explicatif n'est formaté qu'à la lecture de l'attribut message.
+        3- Conversion en lot vers des dictionnaires (JSON) ou des colonnes NumPy.
+____________________________________________________________________________________________________
+
+
+    auteur: GabPoulin
+    email: poulin33@me.com
+
+====================================================================================================
+"""
+
+# IMPORTS
+import json
+
+
+# CODE
+def reduction_message(factor):
+    """Message du coefficient de réduction de surface tributaire (4.1.5.8.)."""
+
+    if factor == 1:
+        return "Aucun coefficient de réduction de surface tributaire n'est appliqué."
+
+    return f"Un coefficient de {round(factor,2)} est appliqué à la surface tributaire."
+
+
+class Result:
+    """Enregistrement de résultat; les champs sont ceux de __slots__."""
+
+    __slots__ = ()
+
+    def __init__(self, *args, **kwargs):
+        repeated = sorted(set(self.__slots__[: len(args)]) & set(kwargs))
+        if repeated:
+            raise TypeError(f"{type(self).__name__}: plusieurs valeurs pour {repeated}")
+
+        values = dict(zip(self.__slots__, args), **kwargs)
+        missing = [name for name in self.__slots__ if name not in values]
+        if missing or len(args) > len(self.__slots__) or len(values) != len(self.__slots__):
+            raise TypeError(f"{type(self).__name__}: champs attendus {self.__slots__}")
+
+        for name in self.__slots__:
+            setattr(self, name, values[name])
+
+    def __repr__(self):
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+
+        return f"{type(self).__name__}({fields})"
+
+    def __eq__(self, other):
+        if type(other) is not type(self):
+            return NotImplemented
+
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    @property
+    def message(self):
+        """Message explicatif, formaté à la demande."""
+
+        return self._message()
+
+    def _message(self):
+        return ""
+
+    def as_dict(self, message=False):
+        """Champs du résultat (et son message au besoin)."""
+
+        values = {name: getattr(self, name) for name in self.__slots__}
+        if message:
+            values["message"] = self.message
+
+        return values
+
+
+class UniformLoadResult(Result):
+    """4.1.5.3. Surcharge uniforme.
+
+    Attributes:
+        value: Surcharge retenue (kPa).
+        load: Surcharge de base de l'usage (kPa), après 4.1.5.6.
+        area: Surface tributaire (m²).
+        reduction_factor: Coefficient de réduction de surface tributaire (4.1.5.8.).
+        importance_factor: Coefficient de la catégorie de risque (0.8 si faible).
+    """
+
+    __slots__ = ("value", "load", "area", "reduction_factor", "importance_factor")
+
+    def _message(self):
+        return reduction_message(self.reduction_factor)
+
+
+class ConcentratedLoadResult(Result):
+    """4.1.5.9. Surcharge concentrée.
+
+    Attributes:
+        value: Charge concentrée retenue (kN).
+        area_x: Dimension de la surface chargée (mm).
+        area_y: Dimension de la surface chargée (mm).
+        importance_factor: Coefficient de la catégorie de risque (0.8 si faible).
+    """
+
+    __slots__ = ("value", "area_x", "area_y", "importance_factor")
+
+    def _message(self):
+        if self.area_x is None:
+            return "Aucune charge concentrée requise."
+
+        return f"Surface de {self.area_x}mm x {self.area_y}mm soumise à la charge."
+
+
+class SnowLoadResult(Result):
+    """4.1.6. Charge due à la neige et à la pluie.
+
+    Attributes:
+        value: Charge spécifiée retenue (kPa).
+        snow_load: Charge due à la neige (kPa), 4.1.6.2.
+        rain_load: Charge due à la pluie (kPa), 4.1.6.4.
+        i_s: Coefficient de risque.
+        ss: Charge de neige au sol (kPa).
+        sr: Charge de pluie associée (kPa).
+        gamma: Poids spécifique de la neige (kN/m³).
+        cb: Coefficient de base.
+        cw: Coefficient d'exposition au vent.
+        cs: Coefficient de pente.
+        ca: Coefficient d'accumulation.
+    """
+
+    __slots__ = (
+        "value",
+        "snow_load",
+        "rain_load",
+        "i_s",
+        "ss",
+        "sr",
+        "gamma",
+        "cb",
+        "cw",
+        "cs",
+        "ca",
+    )
+
+    def _message(self):
+        governing = "neige" if self.snow_load >= self.rain_load else "pluie"
+
+        return (
+            f"S = {self.value} kPa ({governing}): Is = {self.i_s}, Ss = {self.ss}, "
+            f"Sr = {self.sr}, Cb = {self.cb:.2f}, Cw = {self.cw}, Cs = {self.cs:.2f}, "
+            f"Ca = {self.ca:.2f}."
+        )
+
+
+class LimitStateResult(Result):
+    """4.1.3. Combinaison de charges déterminante.
+
+    Attributes:
+        value: Combinaison de charges maximale.
+        case: Numéro du cas déterminant (1 à 5 pour l'ÉLU, 1 à 3 pour l'ÉLTS).
+        cases: Valeur de chaque cas.
+        limit_state: "ÉLU" ou "ÉLTS".
+    """
+
+    __slots__ = ("value", "case", "cases", "limit_state")
+
+    def _message(self):
+        return f"{self.limit_state}: le cas {self.case} gouverne ({self.value:.2f})."
+
+
+def to_dicts(results, message=False):
+    """Convertit des résultats en dictionnaires (prêts pour json.dump)."""
+
+    return [result.as_dict(message) for result in results]
+
+
+def to_columns(results, message=False):
+    """Convertit des résultats d'un même type en colonnes NumPy.
+
+    Returns:
+        Dictionnaire {champ: tableau}; les cas de LimitStateResult forment une matrice.
+    """
+
+    import numpy as np
+
+    results = list(results)
+    if not results:
+        return {}
+
+    fields = type(results[0]).__slots__
+    columns = {
+        name: np.array([getattr(result, name) for result in results]) for name in fields
+    }
+    if message:
+        columns["message"] = [result.message for result in results]
+
+    return columns
+
+
+def write_json_lines(results, file, message=False):
+    """Écrit un résultat par ligne (JSON Lines).
+
+    Returns:
+        Nombre de lignes écrites.
+    """
+
+    count = 0
+    for result in results:
+        file.write(json.dumps(result.as_dict(message), ensure_ascii=False))
+        file.write("\n")
+        count += 1
+
+    return count
+
+
+# TESTS
+def tests():
+    """Tests pour les résultats détaillés."""
+
+    import io
+    from limit_state_design import LimitStatesDesign
+    from live_loads import LiveLoads
+    from snow_loads import SnowLoads
+
+    print("------START_TESTS------")
+
+    result = LiveLoads("Salle à manger").uniform_load_result(10, 20)
+    test_uniform = result.value, result.message
+    expected_result = LiveLoads("Salle à manger").uniform_load(10, 20)
+    if test_uniform != expected_result:
+        print("test_uniform -> FAILED")
+        print("result = ", test_uniform)
+        print("expected = ", expected_result)
+    else:
+        print("test_uniform -> PASSED")
+
+    test_arguments = []
+    for args, kwargs in (((0, 1, 2, 3, 4), {"value": 99}), ((0, 1, 2, 3, 4, 5), {})):
+        try:
+            UniformLoadResult(*args, **kwargs)
+            test_arguments.append(None)
+        except TypeError as error:
+            test_arguments.append(str(error))
+    expected_result = [
+        "UniformLoadResult: plusieurs valeurs pour ['value']",
+        f"UniformLoadResult: champs attendus {UniformLoadResult.__slots__}",
+    ]
+    if test_arguments != expected_result:
+        print("test_arguments -> FAILED")
+        print("result = ", test_arguments)
+        print("expected = ", expected_result)
+    else:
+        print("test_arguments -> PASSED")
+
+    roof = SnowLoads("Gaspé", 5, 20, 10, 25)
+    result = roof.specified_load_result()
+    test_snow = result.value, result.ca, result.as_dict()["cs"]
+    expected_result = roof.specified_load(), roof.breakdown["ca"], roof.breakdown["cs"]
+    if test_snow != expected_result:
+        print("test_snow -> FAILED")
+        print("result = ", test_snow)
+        print("expected = ", expected_result)
+    else:
+        print("test_snow -> PASSED")
+
+    design = LimitStatesDesign(1.2, 1.9, 3.5, 0.8)
+    results = [design.uls_result(), LimitStatesDesign(2, 0.5).uls_result()]
+    columns = to_columns(results)
+    test_columns = columns["value"].tolist(), columns["case"].tolist(), columns["cases"].shape
+    expected_result = [design.uls(), LimitStatesDesign(2, 0.5).uls()], [3, 2], (2, 5)
+    if test_columns != expected_result:
+        print("test_columns -> FAILED")
+        print("result = ", test_columns)
+        print("expected = ", expected_result)
+    else:
+        print("test_columns -> PASSED")
+
+    output = io.StringIO()
+    write_json_lines(results, output, message=True)
+    line = json.loads(output.getvalue().splitlines()[0])
+    test_json = line["case"], line["message"], hasattr(results[0], "__dict__")
+    expected_result = 3, results[0].message, False
+    if test_json != expected_result:
+        print("test_json -> FAILED")
+        print("result = ", test_json)
+        print("expected = ", expected_result)
+    else:
+        print("test_json -> PASSED")
+
+    print("-------END_TESTS-------")
+
+
+# RUN FILE
+if __name__ == "__main__":
+    tests()
+
+# END
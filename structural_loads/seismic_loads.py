@@ -0,0 +1,284 @@
+"""
+
+CNB 2020: Partie 4. Règles de calcul.
+Section 4.1. Charges et méthodes de calcul.
+-----------------------------------------------
+
+4.1.8. Charge due aux séismes.
+
+    Méthode de la force statique équivalente (4.1.8.11.):
+        1- Poids sismique de chaque étage: charge permanente (DeadLoads) et 25 % de la charge de
+           neige du toit (SnowLoads), 4.1.8.2.
+        2- Effort tranchant à la base V = S(Ta)·Mv·IE·W / (Rd·Ro), borné par les minimum et
+           maximum de 4.1.8.11. 2).
+        3- Distribution sur la hauteur: Fx = (V - Ft)·Wx·hx / Σ(Wi·hi), Ft étant appliquée au
+           sommet (4.1.8.11. 7)).
+    Ta, Rd et Ro acceptent des tableaux: toutes les combinaisons sont distribuées sur tous les
+    étages en une passe NumPy et les efforts tranchants d'étage se combinent directement avec
+    LimitStatesDesignBatch.
+____________________________________________________________________________________________________
+
+
+    auteur: GabPoulin
+    email: poulin33@me.com
+
+====================================================================================================
+"""
+
+# IMPORTS
+from dataclasses import dataclass
+import numpy as np
+from array_math import exact_power
+from dead_loads import DeadLoads
+
+
+# CODE
+SPECTRUM_PERIODS = (0.2, 0.5, 1.0, 2.0, 5.0, 10.0)
+
+# 4.1.8.11. 3) Périodes empiriques: coefficient et exposant de hn selon le système.
+PERIODS = {
+    "steel_frame": (0.085, 0.75),
+    "concrete_frame": (0.075, 0.75),
+    "braced_frame": (0.025, 1),
+    "wall": (0.05, 0.75),
+}
+
+
+def storey_weight(area, materials=(), roof=None, add_partitions=False, additional_loads=0):
+    """4.1.8.2. Poids sismique d'un étage (kN).
+
+    Args:
+        area: Surface de l'étage (m²).
+        materials: Matériaux du plancher ou du toit (voir DeadLoads).
+        roof: SnowLoads du toit (25 % de la charge de neige), None si l'étage n'est pas un toit.
+        add_partitions: Ajoute 1 kPa pour le poids des cloisons.
+        additional_loads: Poids additionnel (kPa).
+    """
+
+    load = DeadLoads(materials).sum_dead_loads(add_partitions, additional_loads)
+    if roof is not None:
+        load += 0.25 * roof.specified_load()
+
+    return load * area
+
+
+def fundamental_period(system, building_height, storeys=None):
+    """4.1.8.11. 3) Période fondamentale empirique Ta (s).
+
+    Args:
+        system: "steel_frame", "concrete_frame", "other_frame", "braced_frame" ou "wall".
+        building_height: Hauteur hn du bâtiment au-dessus de la base (m).
+        storeys: Nombre d'étages (requis pour "other_frame": Ta = 0.1 N).
+    """
+
+    if system == "other_frame":
+        return 0.1 * storeys
+
+    coefficient, exponent = PERIODS[system]
+
+    return coefficient * exact_power(building_height, exponent)
+
+
+@dataclass
+class SeismicLoads:
+    """4.1.8.11. Méthode de la force statique équivalente.
+
+    Args:
+        weights: Poids sismiques des étages (kN), voir storey_weight().
+        heights: Hauteurs des étages au-dessus de la base (m), dans le même ordre.
+        spectrum: Accélérations spectrales de calcul S(0.2), S(0.5), S(1.0), S(2.0), S(5.0) et
+            S(10.0) de l'emplacement.
+        period: Période fondamentale Ta (s).
+
+    Optional:
+        rd: Coefficient de modification de force lié à la ductilité.
+        ro: Coefficient de modification de force lié à la sur-résistance.
+        importance: Catégorie de risque ("Faible", "Normal", "Élevé", "Protection civile").
+        mv: Coefficient de mode supérieur.
+        wall_system: Murs, murs couplés et systèmes mur-ossature (minimum S(4.0) au lieu de
+            S(2.0)).
+
+    period, rd, ro et mv acceptent des tableaux de même forme (ou diffusables): chaque élément est
+    une combinaison évaluée pour tous les étages.
+    """
+
+    weights: np.ndarray
+    heights: np.ndarray
+    spectrum: tuple
+    period: np.ndarray
+
+    rd: np.ndarray = 1
+    ro: np.ndarray = 1
+    importance: str = "Normal"
+    mv: np.ndarray = 1
+    wall_system: bool = False
+
+    def __post_init__(self):
+        self.weights = np.asarray(self.weights, dtype=float)
+        self.heights = np.asarray(self.heights, dtype=float)
+        if self.weights.shape != self.heights.shape or self.weights.ndim != 1:
+            raise ValueError("weights et heights doivent être des listes de même longueur.")
+
+        names = ("period", "rd", "ro", "mv")
+        columns = np.broadcast_arrays(*(np.asarray(getattr(self, name), float) for name in names))
+        self.period, self.rd, self.ro, self.mv = columns
+
+    def _importance_factor(self):
+        """Tableau 4.1.8.5. - IE: coefficient de risque parasismique."""
+
+        factors = {"Faible": 0.8, "Normal": 1.0, "Élevé": 1.3, "Protection civile": 1.5}
+
+        return factors[self.importance]
+
+    def design_spectrum(self, period):
+        """4.1.8.4. 7) S(T): accélération spectrale de calcul, interpolée linéairement.
+        S(T) = max(S(0.2), S(0.5)) pour T <= 0.2 s et S(10.0) pour T >= 10 s.
+        """
+
+        s = np.interp(period, SPECTRUM_PERIODS, self.spectrum)
+        short = max(self.spectrum[0], self.spectrum[1])
+
+        return np.where(np.asarray(period) <= 0.2, short, s)
+
+    def base_shear(self):
+        """4.1.8.11. 2) Effort tranchant à la base V (kN) de chaque combinaison."""
+
+        total = self.weights.sum()
+        ie = self._importance_factor()
+        reduction = self.rd * self.ro
+
+        shear = self.design_spectrum(self.period) * self.mv * ie * total / reduction
+        minimum_period = 4.0 if self.wall_system else 2.0
+        minimum = self.design_spectrum(minimum_period) * self.mv * ie * total / reduction
+        shear = np.maximum(shear, minimum)
+
+        s_02, s_05 = self.spectrum[:2]
+        maximum = max(2 / 3 * s_02, s_05) * ie * total / reduction
+        shear = np.where(self.rd >= 1.5, np.minimum(shear, maximum), shear)
+
+        return shear
+
+    def top_force(self, shear=None):
+        """4.1.8.11. 7) Force concentrée au sommet Ft (kN): 0.07·Ta·V <= 0.25·V, nulle si
+        Ta <= 0.7 s.
+        """
+
+        shear = self.base_shear() if shear is None else shear
+
+        ft = np.minimum(0.07 * self.period * shear, 0.25 * shear)
+
+        return np.where(self.period > 0.7, ft, 0)
+
+    def storey_forces(self):
+        """4.1.8.11. 7) Forces latérales Fx (kN) de chaque étage.
+
+        Returns:
+            Tableau (combinaisons..., étages); Ft est ajoutée à l'étage le plus haut.
+        """
+
+        shear = self.base_shear()
+        ft = self.top_force(shear)
+        moments = self.weights * self.heights
+        forces = (shear - ft)[..., np.newaxis] * (moments / moments.sum())
+        forces[..., np.argmax(self.heights)] += ft
+
+        return forces
+
+    def storey_shears(self):
+        """Efforts tranchants d'étage (kN): somme des forces des étages situés au-dessus et de
+        l'étage lui-même, pour la charge E de LimitStatesDesignBatch.
+
+        Returns:
+            Tableau (combinaisons..., étages), dans l'ordre des étages donnés.
+        """
+
+        forces = self.storey_forces()
+        order = np.argsort(-self.heights, kind="stable")
+        shears = np.empty_like(forces)
+        shears[..., order] = np.cumsum(forces[..., order], axis=-1)
+
+        return shears
+
+
+# TESTS
+def tests():
+    """Tests pour la classe SeismicLoads."""
+
+    from limit_state_design import LimitStatesDesign, LimitStatesDesignBatch
+    from snow_loads import SnowLoads
+
+    print("------START_TESTS------")
+
+    floor = ["Bois de feuillus 20mm", "2x10 à 16po", "Panneau de gypse 12mm"]
+    roof = SnowLoads("Gaspé", 9, 20, 15, 0)
+    test1_weight = storey_weight(300, ["2x6 à 24po"], roof)
+    dead = DeadLoads(["2x6 à 24po"]).sum_dead_loads()
+    expected_result = (dead + 0.25 * roof.specified_load()) * 300
+    if test1_weight != expected_result:
+        print("test1_weight -> FAILED")
+        print("result = ", test1_weight)
+        print("expected = ", expected_result)
+    else:
+        print("test1_weight -> PASSED")
+
+    spectrum = (0.6, 0.35, 0.18, 0.08, 0.03, 0.01)
+    weights = [test1_weight] + [storey_weight(300, floor, add_partitions=True)] * 2
+    heights = [9, 6, 3]
+    single = SeismicLoads(weights, heights, spectrum, 0.3, rd=3, ro=1.7)
+    shear = min(0.6, max(2 / 3 * 0.6, 0.35)) * sum(weights) / (3 * 1.7)
+    forces = single.storey_forces()
+    test2_single = (
+        abs(float(single.base_shear()) - shear) < 1e-9,
+        float(single.top_force()),
+        abs(forces.sum() - float(single.base_shear())) < 1e-9,
+        bool(forces[0] > forces[1] > forces[2]),
+    )
+    expected_result = True, 0.0, True, True
+    if test2_single != expected_result:
+        print("test2_single -> FAILED")
+        print("result = ", test2_single)
+        print("expected = ", expected_result)
+    else:
+        print("test2_single -> PASSED")
+
+    storeys = 300
+    heights = np.arange(storeys, 0, -1) * 3.5
+    weights = np.full(storeys, 5000.0)
+    periods = np.linspace(0.2, 8, 40)[:, np.newaxis]
+    rd = np.array([1.5, 2, 3, 4, 5])
+    batch = SeismicLoads(weights, heights, spectrum, periods, rd, 1.5, wall_system=True)
+    shears = batch.storey_shears()
+    k = (7, 3)
+    loop = SeismicLoads(weights, heights, spectrum, periods[k[0]], rd[k[1]], 1.5, wall_system=True)
+    test3_batch = (
+        shears.shape,
+        np.allclose(shears[k], loop.storey_shears(), rtol=1e-12),
+        np.allclose(shears[..., -1], batch.base_shear(), rtol=1e-12),
+    )
+    expected_result = (40, 5, storeys), True, True
+    if test3_batch != expected_result:
+        print("test3_batch -> FAILED")
+        print("result = ", test3_batch)
+        print("expected = ", expected_result)
+    else:
+        print("test3_batch -> PASSED")
+
+    uls, _, _ = LimitStatesDesignBatch(dead=weights.cumsum(), earthquake=shears).uls()
+    test4_chain = uls.shape, uls[k][-1]
+    design = LimitStatesDesign(weights.sum(), earthquake=shears[k][-1])
+    expected_result = (40, 5, storeys), design.uls()
+    if test4_chain != expected_result:
+        print("test4_chain -> FAILED")
+        print("result = ", test4_chain)
+        print("expected = ", expected_result)
+    else:
+        print("test4_chain -> PASSED")
+
+    print("-------END_TESTS-------")
+
+
+# RUN FILE
+if __name__ == "__main__":
+    tests()
+
+# END
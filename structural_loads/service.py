@@ -0,0 +1,729 @@
+"""
+
+CNB 2020: Partie 4. Règles de calcul.
+Section 4.1. Charges et méthodes de calcul.
+-----------------------------------------------
+
+Service local JSON.
+
+    Serveur HTTP asyncio qui expose les calculateurs aux autres outils:
+        POST /dead           {"materials", "add_partitions", "additional_loads"} -> D
+        POST /live           {"use", "width", "length", "importance", "reinforced_slab"} -> L
+        POST /snow           arguments de SnowLoads -> S
+        POST /limit_states   {"dead", "live", "snow", "wind", "earthquake", options} -> ÉLU/ÉLTS
+        GET  /metrics        latences p50/p99 et débit de chaque point d'accès
+    Le corps est un objet (un calcul) ou une liste d'objets (un lot). Les petites requêtes
+    simultanées d'un même point d'accès sont regroupées pendant une courte fenêtre et évaluées
+    ensemble par les calculateurs en lot (member_loads, LiveLoadsBatch, SnowLoadsBatch,
+    LimitStatesDesignBatch). Les données de référence sont chargées au démarrage et restent en
+    mémoire.
+
+        python service.py --port 8765
+____________________________________________________________________________________________________
+
+
+    auteur: GabPoulin
+    email: poulin33@me.com
+
+====================================================================================================
+"""
+
+# IMPORTS
+import argparse
+import asyncio
+import json
+import logging
+import sys
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import MISSING, fields
+from time import perf_counter
+import numpy as np
+from database import DB_PATH, configure
+from dead_loads import DeadLoads, member_loads, total_dead_load
+from limit_state_design import LimitStatesDesign, LimitStatesDesignBatch
+from live_loads import LiveLoads, LiveLoadsBatch
+from locations import get_location_index
+from reference_data import get_reference_data
+from snapshot import ensure_snapshot, install_snapshot
+from snow_loads import SnowLoads, SnowLoadsBatch
+
+
+# CODE
+SNOW_DEFAULTS = {
+    field.name: None if field.default is MISSING else field.default for field in fields(SnowLoads)
+}
+SNOW_BATCH_FIELDS = {field.name for field in fields(SnowLoadsBatch)}
+DESIGN_FIELDS = {field.name for field in fields(LimitStatesDesign)}
+logger = logging.getLogger(__name__)
+MAX_BODY = 1 << 20
+STATUS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Content Too Large",
+    422: "Unprocessable Entity",
+}
+
+
+def _dead_load(item):
+    load = DeadLoads(item.get("materials", ())).sum_dead_loads(
+        item.get("add_partitions", False),
+        item.get("additional_loads", 0),
+    )
+
+    return {"dead": load}
+
+
+def _dead_loads(items):
+    """D de plusieurs éléments (même calcul que DeadLoads.sum_dead_loads())."""
+
+    loads = member_loads([item.get("materials", ()) for item in items]).tolist()
+
+    return [
+        {
+            "dead": total_dead_load(
+                load,
+                item.get("add_partitions", False),
+                item.get("additional_loads", 0),
+            )
+        }
+        for item, load in zip(items, loads)
+    ]
+
+
+def _live_load(item):
+    result = LiveLoads(item["use"], item.get("importance", "Normal")).uniform_load_result(
+        item["width"],
+        item["length"],
+        item.get("reinforced_slab", False),
+    )
+
+    return {"live": result.value, "reduction_factor": result.reduction_factor}
+
+
+def _live_loads(items):
+    """L de plusieurs travées, un LiveLoadsBatch par (usage, catégorie de risque)."""
+
+    groups = {}
+    for index, item in enumerate(items):
+        groups.setdefault((item["use"], item.get("importance", "Normal")), []).append(index)
+
+    results = [None] * len(items)
+    for (use, importance), indices in groups.items():
+        loads, factors = LiveLoadsBatch(
+            use,
+            [items[i]["width"] for i in indices],
+            [items[i]["length"] for i in indices],
+            importance,
+            [items[i].get("reinforced_slab", False) for i in indices],
+        ).uniform_load()
+        for i, load, factor in zip(indices, loads.tolist(), factors.tolist()):
+            results[i] = {"live": load, "reduction_factor": factor}
+
+    return results
+
+
+def _snow_load(item):
+    return {"snow": SnowLoads(**item).specified_load()}
+
+
+def _snow_loads(items):
+    """S de plusieurs toits en un seul SnowLoadsBatch (rain_accumulation n'a pas d'effet)."""
+
+    for item in items:
+        unknown = set(item) - set(SNOW_DEFAULTS)
+        if unknown:
+            raise TypeError(f"Arguments inconnus: {sorted(unknown)}")
+
+    columns = {
+        name: [item[name] if default is None else item.get(name, default) for item in items]
+        for name, default in SNOW_DEFAULTS.items()
+        if name in SNOW_BATCH_FIELDS
+    }
+    loads = SnowLoadsBatch(**columns).specified_load().tolist()
+
+    return [{"snow": load} for load in loads]
+
+
+def _limit_states(item):
+    design = LimitStatesDesign(**item)
+    uls = design.uls_result()
+    sls = design.sls_result()
+
+    return {"uls": uls.value, "uls_case": uls.case, "sls": sls.value, "sls_case": sls.case}
+
+
+def _limit_states_batch(items):
+    """ÉLU et ÉLTS de plusieurs éléments en un seul LimitStatesDesignBatch."""
+
+    names = set().union(*items)
+    if names - DESIGN_FIELDS:
+        raise TypeError(f"Arguments inconnus: {sorted(names - DESIGN_FIELDS)}")
+
+    defaults = {field.name: field.default for field in fields(LimitStatesDesign)}
+    columns = {name: [item.get(name, defaults[name]) for item in items] for name in names}
+    design = LimitStatesDesignBatch(**columns)
+    uls, uls_case, _ = design.uls()
+    sls, sls_case, _ = design.sls()
+
+    return [
+        {"uls": values[0], "uls_case": values[1], "sls": values[2], "sls_case": values[3]}
+        for values in zip(uls.tolist(), uls_case.tolist(), sls.tolist(), sls_case.tolist())
+    ]
+
+
+ENDPOINTS = {
+    "/dead": (_dead_loads, _dead_load),
+    "/live": (_live_loads, _live_load),
+    "/snow": (_snow_loads, _snow_load),
+    "/limit_states": (_limit_states_batch, _limit_states),
+}
+
+
+def _evaluate(batch, single, items, metrics=None):
+    """Évalue un lot; si le lot échoue, l'échec est consigné et compté dans metrics, puis chaque
+    élément est repris seul pour isoler l'erreur.
+    """
+
+    try:
+        return batch(items)
+    except Exception as error:  # pylint: disable=broad-except
+        logger.warning(
+            "Lot de %d élément(s) en échec (%s: %s), repris élément par élément.",
+            len(items),
+            type(error).__name__,
+            error,
+        )
+        if metrics is not None:
+            metrics.batch_failures += 1
+
+    results = []
+    for item in items:
+        try:
+            results.append(single(item))
+        except Exception as error:  # pylint: disable=broad-except
+            results.append({"error": f"{type(error).__name__}: {error}"})
+
+    return results
+
+
+class Metrics:
+    """Compteurs et latences d'un point d'accès.
+
+    Args:
+        size: Nombre de latences récentes conservées pour les percentiles.
+    """
+
+    def __init__(self, size=10000):
+        self.requests = 0
+        self.items = 0
+        self.errors = 0
+        self.batches = 0
+        self.batched_items = 0
+        self.batch_failures = 0
+        self.latencies = deque(maxlen=size)
+
+    def record(self, seconds, items, error=False):
+        """Consigne une requête terminée."""
+
+        self.requests += 1
+        self.items += items
+        self.errors += error
+        self.latencies.append(seconds)
+
+    def summary(self, uptime):
+        """Percentiles (ms), débits (par seconde) et taille moyenne des lots."""
+
+        p50 = p99 = 0.0
+        if self.latencies:
+            p50, p99 = np.percentile(np.fromiter(self.latencies, float), (50, 99)).tolist()
+
+        return {
+            "requests": self.requests,
+            "items": self.items,
+            "errors": self.errors,
+            "batches": self.batches,
+            "batch_failures": self.batch_failures,
+            "mean_batch_size": self.batched_items / self.batches if self.batches else 0,
+            "p50_ms": p50 * 1e3,
+            "p99_ms": p99 * 1e3,
+            "requests_per_second": self.requests / uptime,
+            "items_per_second": self.items / uptime,
+        }
+
+
+class Coalescer:
+    """Regroupe les requêtes d'un point d'accès en lots.
+    Un lot part après window secondes, ou dès qu'il atteint max_batch éléments.
+
+    Args:
+        batch: Calcul d'une liste d'éléments.
+        single: Calcul d'un élément (reprise des lots en erreur).
+        executor: Exécuteur des calculs (hors de la boucle asyncio).
+        metrics: Metrics du point d'accès.
+        window: Fenêtre de regroupement (s).
+        max_batch: Nombre maximal d'éléments par lot.
+    """
+
+    def __init__(self, batch, single, executor, metrics, window=0.002, max_batch=4096):
+        self.batch = batch
+        self.single = single
+        self.executor = executor
+        self.metrics = metrics
+        self.window = window
+        self.max_batch = max_batch
+        self._pending = []
+        self._size = 0
+        self._timer = None
+        self._tasks = set()
+
+    async def submit(self, items):
+        """Ajoute des éléments au prochain lot et attend leurs résultats."""
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((items, future))
+        self._size += len(items)
+        if self._size >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        pending, self._pending, self._size = self._pending, [], 0
+        if pending:
+            task = asyncio.ensure_future(self._run(pending))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, pending):
+        items = [item for chunk, _ in pending for item in chunk]
+        loop = asyncio.get_running_loop()
+        try:
+            results = await loop.run_in_executor(
+                self.executor, _evaluate, self.batch, self.single, items, self.metrics
+            )
+        except Exception as error:  # pylint: disable=broad-except
+            for _, future in pending:
+                if not future.done():
+                    future.set_exception(error)
+            return
+
+        self.metrics.batches += 1
+        self.metrics.batched_items += len(items)
+        start = 0
+        for chunk, future in pending:
+            if not future.done():
+                future.set_result(results[start : start + len(chunk)])
+            start += len(chunk)
+
+
+class LoadService:
+    """Service HTTP local des calculateurs.
+
+    Optional:
+        window: Fenêtre de regroupement des requêtes (s).
+        max_batch: Nombre maximal d'éléments par lot.
+        db_path: Base de données loads.db.
+        snapshot_path: Instantané de loads.db à charger au démarrage (voir snapshot.py).
+    """
+
+    def __init__(self, window=0.002, max_batch=4096, db_path=DB_PATH, snapshot_path=None):
+        self.db_path = db_path
+        self.snapshot_path = snapshot_path
+        self.executor = ThreadPoolExecutor(1, thread_name_prefix="service")
+        self.metrics = {path: Metrics() for path in ENDPOINTS}
+        self.coalescers = {
+            path: Coalescer(batch, single, self.executor, self.metrics[path], window, max_batch)
+            for path, (batch, single) in ENDPOINTS.items()
+        }
+        self.server = None
+        self.port = None
+        self.started = perf_counter()
+
+    def warm(self):
+        """Charge les données de référence et l'index des emplacements en mémoire.
+        L'instantané est recompilé au besoin pour correspondre à loads.db.
+        """
+
+        configure(self.db_path)
+        if self.snapshot_path:
+            ensure_snapshot(self.snapshot_path, self.db_path)
+            install_snapshot(self.snapshot_path, self.db_path)
+        else:
+            get_reference_data(self.db_path).refresh()
+        get_location_index()
+
+    async def start(self, host="127.0.0.1", port=0):
+        """Démarre le serveur (port 0 = port libre, voir self.port)."""
+
+        await asyncio.get_running_loop().run_in_executor(self.executor, self.warm)
+        self.server = await asyncio.start_server(self._handle, host, port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        self.started = perf_counter()
+
+        return self
+
+    async def close(self):
+        """Arrête le serveur et l'exécuteur des calculs."""
+
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        self.executor.shutdown()
+
+    def summary(self):
+        """Contenu de GET /metrics."""
+
+        uptime = perf_counter() - self.started
+
+        return {
+            "uptime": uptime,
+            "endpoints": {path: metrics.summary(uptime) for path, metrics in self.metrics.items()},
+        }
+
+    async def dispatch(self, method, path, body):
+        """Traite une requête.
+
+        Returns:
+            Code HTTP et contenu JSON de la réponse.
+        """
+
+        if path == "/metrics":
+            if method != "GET":
+                return 405, {"error": "GET attendu."}
+            return 200, self.summary()
+
+        if path not in ENDPOINTS:
+            return 404, {"error": f"Point d'accès inconnu: {path}"}
+        if method != "POST":
+            return 405, {"error": "POST attendu."}
+
+        start = perf_counter()
+        try:
+            payload = json.loads(body or b"null")
+        except ValueError as error:
+            return 400, {"error": f"JSON invalide: {error}"}
+        single = isinstance(payload, dict)
+        items = [payload] if single else payload
+        if not isinstance(items, list) or not all(isinstance(item, dict) for item in items):
+            return 400, {"error": "Un objet ou une liste d'objets est attendu."}
+
+        results = await self.coalescers[path].submit(items) if items else []
+        error = any("error" in result for result in results)
+        self.metrics[path].record(perf_counter() - start, len(items), error)
+        if single:
+            return (422 if error else 200), results[0]
+
+        return 200, results
+
+    async def _handle(self, reader, writer):
+        """Connexion HTTP/1.1 (keep-alive par défaut).
+        Une requête mal formée reçoit une réponse 400 (413 si le corps dépasse MAX_BODY), puis
+        la connexion est fermée.
+        """
+
+        try:
+            while True:
+                try:
+                    head = await _read_head(reader)
+                except ValueError as error:
+                    await _respond(writer, 400, {"error": str(error)}, False)
+                    break
+                if head is None:
+                    break
+                method, path, version, headers, length = head
+                if length > MAX_BODY:
+                    error = f"Corps de requête limité à {MAX_BODY} octets."
+                    await _respond(writer, 413, {"error": error}, False)
+                    break
+                body = await reader.readexactly(length)
+
+                status, payload = await self.dispatch(method, path.split("?")[0], body)
+
+                keep_alive = (
+                    version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+                )
+                await _respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+
+async def _read_head(reader):
+    """Ligne de requête et en-têtes HTTP.
+
+    Returns:
+        Méthode, chemin, version, en-têtes et longueur du corps (None en fin de connexion).
+    Raises:
+        ValueError: Ligne de requête, en-tête ou Content-Length invalide.
+    """
+
+    request_line = await reader.readline()
+    if not request_line:
+        return None
+    parts = request_line.decode("latin-1").split()
+    if len(parts) != 3:
+        raise ValueError(f"Ligne de requête invalide: {request_line[:100]!r}")
+    method, path, version = parts
+
+    headers = {}
+    while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    length = headers.get("content-length", "0")
+    if not (length.isascii() and length.isdigit()):
+        raise ValueError(f"Content-Length invalide: {length[:100]!r}")
+
+    return method, path, version, headers, int(length)
+
+
+async def _respond(writer, status, payload, keep_alive):
+    """Écrit une réponse JSON."""
+
+    data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    head = (
+        f"HTTP/1.1 {status} {STATUS[status]}\r\n"
+        "Content-Type: application/json; charset=utf-8\r\n"
+        f"Content-Length: {len(data)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+    )
+    writer.write(head.encode("latin-1") + data)
+    await writer.drain()
+
+
+async def request(host, port, method, path, payload=None):
+    """Client minimal: envoie une requête au service et lit la réponse.
+
+    Returns:
+        Code HTTP et contenu JSON décodé.
+    """
+
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        body = b"" if payload is None else json.dumps(payload).encode("utf-8")
+        writer.write(
+            (
+                f"{method} {path} HTTP/1.1\r\nHost: {host}\r\n"
+                f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n"
+                "Connection: close\r\n\r\n"
+            ).encode("latin-1")
+            + body
+        )
+        await writer.drain()
+        status = int((await reader.readline()).split()[1])
+        length = 0
+        while (line := await reader.readline()) not in (b"\r\n", b""):
+            name, _, value = line.decode("latin-1").partition(":")
+            if name.strip().lower() == "content-length":
+                length = int(value)
+        data = await reader.readexactly(length)
+    finally:
+        writer.close()
+
+    return status, json.loads(data)
+
+
+async def serve(host="127.0.0.1", port=8765, **options):
+    """Démarre le service et répond aux requêtes jusqu'à l'interruption."""
+
+    service = await LoadService(**options).start(host, port)
+    print(f"Service sur http://{host}:{service.port}", file=sys.stderr)
+    try:
+        await service.server.serve_forever()
+    finally:
+        await service.close()
+
+
+def main(argv=None):
+    """Point d'entrée: python service.py [--host 127.0.0.1] [--port 8765] [options]"""
+
+    parser = argparse.ArgumentParser(description="Service local JSON des calculateurs.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--db", default=DB_PATH, help="Base de données loads.db.")
+    parser.add_argument("--snapshot", help="Instantané binaire de loads.db (voir snapshot.py).")
+    parser.add_argument("--window", type=float, default=2, help="Fenêtre de regroupement (ms).")
+    parser.add_argument("--max-batch", type=int, default=4096, help="Éléments par lot.")
+    args = parser.parse_args(argv)
+
+    try:
+        asyncio.run(
+            serve(
+                args.host,
+                args.port,
+                window=args.window / 1000,
+                max_batch=args.max_batch,
+                db_path=args.db,
+                snapshot_path=args.snapshot,
+            )
+        )
+    except KeyboardInterrupt:
+        pass
+
+
+# TESTS
+def tests():
+    """Tests pour la classe LoadService."""
+
+    import os
+    import shutil
+    import sqlite3
+    import tempfile
+    from reference_data import clear_reference_data
+    from snapshot import build_snapshot
+
+    print("------START_TESTS------")
+
+    async def run():
+        service = await LoadService().start()
+        port = service.port
+        try:
+            roof = {"location": "Gaspé", "roof_height": 5, "roof_larger_dimension": 20}
+            roof.update(roof_smaller_dimension=10, slope=25, exposed_to_wind=True)
+            test_single = await request("127.0.0.1", port, "POST", "/snow", roof)
+            expected_result = 200, {"snow": SnowLoads(**roof).specified_load()}
+            if test_single != expected_result:
+                print("test_single -> FAILED")
+                print("result = ", test_single)
+                print("expected = ", expected_result)
+            else:
+                print("test_single -> PASSED")
+
+            roofs = [dict(roof, slope=slope, roof_height=slope % 9) for slope in range(0, 90, 3)]
+            responses = await asyncio.gather(
+                *(request("127.0.0.1", port, "POST", "/snow", item) for item in roofs)
+            )
+            test_coalesce = [body["snow"] for _, body in responses]
+            expected_result = [SnowLoads(**item).specified_load() for item in roofs]
+            batches = service.metrics["/snow"].batches
+            if test_coalesce != expected_result or batches >= len(roofs):
+                print("test_coalesce -> FAILED")
+                print("result = ", test_coalesce, batches)
+                print("expected = ", expected_result)
+            else:
+                print("test_coalesce -> PASSED")
+
+            bays = [
+                {"use": "Entrepôt", "width": width, "length": 8, "importance": importance}
+                for width in (2, 6, 15)
+                for importance in ("Faible", "Normal")
+            ] + [{"use": "Usage inconnu", "width": 5, "length": 5}]
+            _, test_batch = await request("127.0.0.1", port, "POST", "/live", bays)
+            expected_result = [_live_load(bay) for bay in bays[:-1]]
+            failures = service.metrics["/live"].batch_failures
+            if test_batch[:-1] != expected_result or "error" not in test_batch[-1] or failures != 1:
+                print("test_batch -> FAILED")
+                print("result = ", test_batch)
+                print("expected = ", expected_result)
+            else:
+                print("test_batch -> PASSED")
+
+            floor = {"materials": ["2x10 à 16po", ["Eau douce", 20]], "add_partitions": True}
+            _, dead = await request("127.0.0.1", port, "POST", "/dead", [floor, {}])
+            design = {"dead": dead[0]["dead"], "live": 2.4, "snow": 3.1, "exterior_area": True}
+            _, test_chain = await request("127.0.0.1", port, "POST", "/limit_states", design)
+            dead_load = DeadLoads(floor["materials"]).sum_dead_loads(True)
+            reference = LimitStatesDesign(dead_load, 2.4, 3.1, exterior_area=True)
+            expected_result = {
+                "uls": reference.uls(),
+                "uls_case": reference.uls_result().case,
+                "sls": reference.sls(),
+                "sls_case": reference.sls_result().case,
+            }
+            if test_chain != expected_result or dead[1] != {"dead": 0}:
+                print("test_chain -> FAILED")
+                print("result = ", test_chain, dead)
+                print("expected = ", expected_result)
+            else:
+                print("test_chain -> PASSED")
+
+            status, metrics = await request("127.0.0.1", port, "GET", "/metrics")
+            snow = metrics["endpoints"]["/snow"]
+            test_metrics = status, snow["requests"], snow["items"], snow["p99_ms"] >= snow["p50_ms"]
+            expected_result = 200, len(roofs) + 1, len(roofs) + 1, True
+            if test_metrics != expected_result:
+                print("test_metrics -> FAILED")
+                print("result = ", test_metrics)
+                print("expected = ", expected_result)
+            else:
+                print("test_metrics -> PASSED")
+
+            test_errors = (
+                (await request("127.0.0.1", port, "POST", "/wind", {}))[0],
+                (await request("127.0.0.1", port, "POST", "/snow", [1, 2]))[0],
+                (await request("127.0.0.1", port, "POST", "/snow", {"location": "Gaspé"}))[0],
+            )
+            expected_result = 404, 400, 422
+            if test_errors != expected_result:
+                print("test_errors -> FAILED")
+                print("result = ", test_errors)
+                print("expected = ", expected_result)
+            else:
+                print("test_errors -> PASSED")
+
+            test_malformed = []
+            for data in (
+                b"GARBAGE\r\n\r\n",
+                b"POST /dead HTTP/1.1\r\nContent-Length: abc\r\n\r\n",
+                f"POST /dead HTTP/1.1\r\nContent-Length: {MAX_BODY + 1}\r\n\r\n".encode(),
+            ):
+                reader, writer = await asyncio.open_connection("127.0.0.1", port)
+                writer.write(data)
+                await writer.drain()
+                test_malformed.append(int((await reader.readline()).split()[1]))
+                writer.close()
+            expected_result = [400, 400, 413]
+            if test_malformed != expected_result:
+                print("test_malformed -> FAILED")
+                print("result = ", test_malformed)
+                print("expected = ", expected_result)
+            else:
+                print("test_malformed -> PASSED")
+        finally:
+            await service.close()
+
+    asyncio.run(run())
+
+    with tempfile.TemporaryDirectory() as folder:
+        copy = os.path.join(folder, DB_PATH)
+        shutil.copy(DB_PATH, copy)
+        snapshot_path = os.path.join(folder, "loads.snapshot")
+        build_snapshot(copy, snapshot_path)
+        with sqlite3.connect(copy) as connection:
+            connection.execute("UPDATE climatic_data SET snow = snow + 1 WHERE location = 'Gaspé'")
+        service = LoadService(db_path=copy, snapshot_path=snapshot_path)
+        service.warm()
+        test_warm = get_reference_data(copy).climate("Gaspé").snow
+        service.executor.shutdown()
+        configure(DB_PATH)
+        clear_reference_data()
+    expected_result = get_reference_data().climate("Gaspé").snow + 1
+    if test_warm != expected_result:
+        print("test_warm -> FAILED")
+        print("result = ", test_warm)
+        print("expected = ", expected_result)
+    else:
+        print("test_warm -> PASSED")
+
+    print("-------END_TESTS-------")
+
+
+# RUN FILE
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        main()
+    else:
+        tests()
+
+# END
@@ -0,0 +1,491 @@
+"""
+
+CNB 2020: Partie 4. Règles de calcul.
+Section 4.1. Charges et méthodes de calcul.
+-----------------------------------------------
+
+Instantané binaire des tables de référence.
+
+    Compile dead_loads, live_loads et climatic_data de loads.db dans un seul fichier binaire
+    versionné, lu par projection en mémoire (mmap) sans SQLite ni SQLAlchemy:
+        1- Colonnes numériques en tableaux NumPy de taille fixe (avec masque des valeurs nulles).
+        2- Colonnes de texte en indices vers une table de chaînes UTF-8 unique (chaînes internées).
+    Tous les processus qui ouvrent le même fichier partagent les mêmes pages en lecture seule:
+    chaque processus ne garde qu'un index clé -> rang par table, et chaque recherche lit sa ligne
+    directement dans les tableaux projetés, par memoryview (NumPy n'est importé que pour
+    column() et la compilation).
+    loads.db demeure la source modifiable; l'empreinte SHA-256 de la base est conservée dans
+    l'instantané pour détecter qu'il doit être recompilé.
+
+    Format (petit-boutiste):
+        MAGIC (8 octets) | longueur de l'en-tête (uint64) | en-tête JSON | tableaux alignés sur 64
+____________________________________________________________________________________________________
+
+
+    auteur: GabPoulin
+    email: poulin33@me.com
+
+====================================================================================================
+"""
+
+# IMPORTS
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+from collections.abc import Mapping
+from datetime import datetime, timezone
+from math import prod
+from database import DB_PATH, db_path as configured_db_path
+from reference_data import (
+    ClimateRow,
+    DeadLoadRow,
+    LiveLoadRow,
+    ReferenceData,
+    Tables,
+    clear_reference_data,
+    get_reference_data,
+    set_reference_data,
+)
+
+
+# CODE
+MAGIC = b"CNBSNAP\0"
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+SNAPSHOT_PATH = "loads.snapshot"
+# Types NumPy de l'instantané -> formats de memoryview.cast (ordre natif, petit-boutiste).
+VIEW_FORMATS = {"<i4": "i", "<i8": "q", "<f8": "d", "|b1": "?", "|u1": "B"}
+TABLES = {
+    "dead_loads": DeadLoadRow,
+    "live_loads": LiveLoadRow,
+    "climatic_data": ClimateRow,
+}
+
+
+def db_fingerprint(db_path=DB_PATH):
+    """Empreinte SHA-256 du contenu de loads.db."""
+
+    with open(db_path, "rb") as file:
+        return hashlib.sha256(file.read()).hexdigest()
+
+
+def _column_kind(values):
+    """Type d'une colonne: "str", "int" ou "float"."""
+
+    present = [value for value in values if value is not None]
+    if present and all(isinstance(value, str) for value in present):
+        return "str"
+    if all(isinstance(value, int) for value in present):
+        return "int"
+
+    return "float"
+
+
+def _align(offset):
+    """Arrondit une position au multiple de ALIGNMENT suivant."""
+
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def build_snapshot(db_path=None, path=SNAPSHOT_PATH):
+    """Compile les tables de référence de loads.db dans un instantané.
+
+    Args:
+        db_path: Fichier loads.db source (la base configurée dans database par défaut).
+        path: Fichier de l'instantané à écrire.
+    Returns:
+        En-tête de l'instantané.
+    """
+
+    import numpy as np
+
+    db_path = db_path or configured_db_path()
+    data = ReferenceData(db_path).refresh()
+    strings = {}
+    arrays = {}
+    tables = {}
+    for table, row_type in TABLES.items():
+        rows = list(getattr(data, table).values())
+        columns = {}
+        values_by_field = list(zip(*rows)) or [()] * len(row_type._fields)
+        for field, values in zip(row_type._fields, values_by_field):
+            kind = _column_kind(values)
+            name = f"{table}.{field}"
+            if kind == "str":
+                arrays[name] = np.array(
+                    [strings.setdefault(value, len(strings)) for value in values],
+                    dtype="<i4",
+                )
+            else:
+                nulls = np.array([value is None for value in values], dtype=bool)
+                arrays[name] = np.array(
+                    [np.nan if value is None else value for value in values],
+                    dtype="<i8" if kind == "int" and not nulls.any() else "<f8",
+                )
+                if nulls.any():
+                    arrays[f"{name}.null"] = nulls
+            columns[field] = kind
+        tables[table] = {"rows": len(rows), "columns": columns}
+
+    encoded = [value.encode("utf-8") for value in strings]
+    arrays["strings.offsets"] = np.cumsum([0] + [len(value) for value in encoded], dtype="<i8")
+    arrays["strings.data"] = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+
+    header = {
+        "version": FORMAT_VERSION,
+        "source_sha256": db_fingerprint(db_path),
+        "created": datetime.now(timezone.utc).isoformat(),
+        "tables": tables,
+        "arrays": {},
+    }
+
+    offset = 0
+    for name, array in arrays.items():
+        offset = _align(offset)
+        header["arrays"][name] = {
+            "dtype": array.dtype.str,
+            "shape": list(array.shape),
+            "offset": offset,
+        }
+        offset += array.nbytes
+    encoded_header = json.dumps(header, ensure_ascii=False).encode("utf-8")
+    start = _align(len(MAGIC) + 8 + len(encoded_header))
+
+    temporary = f"{path}.tmp"
+    with open(temporary, "wb") as file:
+        file.write(MAGIC + struct.pack("<Q", len(encoded_header)) + encoded_header)
+        for name, array in arrays.items():
+            file.seek(start + header["arrays"][name]["offset"])
+            file.write(array.tobytes())
+    os.replace(temporary, path)
+
+    return header
+
+
+class Snapshot:
+    """Instantané ouvert en lecture seule par projection en mémoire.
+
+    Args:
+        path: Fichier de l'instantané.
+    """
+
+    def __init__(self, path=SNAPSHOT_PATH):
+        self.path = path
+        with open(path, "rb") as file:
+            self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._map[: len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} n'est pas un instantané de loads.db.")
+        (length,) = struct.unpack_from("<Q", self._map, len(MAGIC))
+        start = len(MAGIC) + 8
+        self.header = json.loads(self._map[start : start + length].decode("utf-8"))
+        data_start = _align(start + length)
+        if self.header["version"] != FORMAT_VERSION:
+            raise ValueError(f"Version d'instantané non supportée: {self.header['version']}")
+
+        self._start = data_start
+        self._arrays = None
+        if sys.byteorder == "little":
+            buffer = memoryview(self._map)
+            self._views = {}
+            for name, spec in self.header["arrays"].items():
+                view_format = VIEW_FORMATS[spec["dtype"]]
+                start = data_start + spec["offset"]
+                end = start + struct.calcsize(view_format) * prod(spec["shape"])
+                self._views[name] = buffer[start:end].cast(view_format)
+        else:
+            self._views = self.arrays
+
+        self._offsets = self._views["strings.offsets"]
+        self._data = self._views["strings.data"]
+
+    @property
+    def arrays(self):
+        """Tableaux NumPy projetés sur le fichier (NumPy n'est importé qu'au premier accès).
+        Les recherches lisent les mêmes pages par memoryview, sans NumPy.
+        """
+
+        if self._arrays is None:
+            import numpy as np
+
+            self._arrays = {
+                name: np.frombuffer(
+                    self._map,
+                    np.dtype(spec["dtype"]),
+                    prod(spec["shape"]),
+                    self._start + spec["offset"],
+                ).reshape(spec["shape"])
+                for name, spec in self.header["arrays"].items()
+            }
+
+        return self._arrays
+
+    def is_current(self, db_path=None):
+        """Vrai si l'instantané correspond au contenu actuel de loads.db (la base configurée
+        dans database par défaut).
+        """
+
+        return self.header["source_sha256"] == db_fingerprint(db_path or configured_db_path())
+
+    def string(self, index):
+        """Chaîne de la table des chaînes, décodée à la demande."""
+
+        start, end = self._offsets[index : index + 2].tolist()
+
+        return self._data[start:end].tobytes().decode("utf-8")
+
+    def column(self, table, field):
+        """Colonne d'une table: tableau NumPy (projection en mémoire) ou liste de chaînes."""
+
+        if self.header["tables"][table]["columns"][field] == "str":
+            return [self.string(i) for i in self._views[f"{table}.{field}"].tolist()]
+
+        return self.arrays[f"{table}.{field}"]
+
+    def value(self, table, field, index):
+        """Valeur Python d'une cellule, lue dans le tableau projeté (None si nulle)."""
+
+        kind = self.header["tables"][table]["columns"][field]
+        value = self._views[f"{table}.{field}"][index]
+        if kind == "str":
+            return self.string(value)
+        nulls = self._views.get(f"{table}.{field}.null")
+        if nulls is not None and nulls[index]:
+            return None
+
+        return int(value) if kind == "int" else float(value)
+
+    def row(self, table, index):
+        """Ligne d'une table, par son rang."""
+
+        row_type = TABLES[table]
+
+        return row_type(*(self.value(table, field, index) for field in row_type._fields))
+
+    def _values(self, table, field):
+        """Valeurs Python d'une colonne (None pour les valeurs nulles)."""
+
+        kind = self.header["tables"][table]["columns"][field]
+        if kind == "str":
+            return self.column(table, field)
+
+        values = self._views[f"{table}.{field}"]
+        convert = int if kind == "int" else float
+        nulls = self._views.get(f"{table}.{field}.null")
+        if nulls is None:
+            return [convert(value) for value in values.tolist()]
+
+        return [
+            None if null else convert(value)
+            for value, null in zip(values.tolist(), nulls.tolist())
+        ]
+
+    def rows(self, table):
+        """Lignes d'une table, indexées par leur clé (première colonne)."""
+
+        row_type = TABLES[table]
+        columns = [self._values(table, field) for field in row_type._fields]
+
+        return {values[0]: row_type(*values) for values in zip(*columns)}
+
+
+class SnapshotTable(Mapping):
+    """Table d'un instantané vue comme un dictionnaire clé -> ligne.
+    Seul l'index clé -> rang est gardé en mémoire; chaque ligne est lue dans les tableaux
+    projetés au moment de la recherche.
+
+    Args:
+        snapshot: Instantané ouvert.
+        table: Nom de la table (voir TABLES).
+    """
+
+    def __init__(self, snapshot, table):
+        self.snapshot = snapshot
+        self.table = table
+        key = TABLES[table]._fields[0]
+        self.index = {value: row for row, value in enumerate(snapshot.column(table, key))}
+
+    def __getitem__(self, key):
+        return self.snapshot.row(self.table, self.index[key])
+
+    def __iter__(self):
+        return iter(self.index)
+
+    def __len__(self):
+        return len(self.index)
+
+    def __contains__(self, key):
+        return key in self.index
+
+
+class SnapshotReferenceData(ReferenceData):
+    """ReferenceData lue depuis un instantané plutôt que depuis loads.db.
+
+    Args:
+        path: Fichier de l'instantané.
+    """
+
+    def _load(self):
+        snapshot = Snapshot(self.path)
+        categories = {}
+        materials = snapshot.column("dead_loads", "material")
+        for material, category in zip(materials, snapshot.column("dead_loads", "category")):
+            categories.setdefault(category, []).append(material)
+
+        self.snapshot = snapshot
+        self._tables = Tables(
+            SnapshotTable(snapshot, "dead_loads"),
+            categories,
+            SnapshotTable(snapshot, "live_loads"),
+            SnapshotTable(snapshot, "climatic_data"),
+        )
+
+
+def install_snapshot(path=SNAPSHOT_PATH, db_path=None):
+    """Utilise l'instantané comme données de référence des calculateurs de ce processus.
+
+    Args:
+        path: Fichier de l'instantané.
+        db_path: Base remplacée (la base configurée dans database par défaut).
+    Returns:
+        Données de référence installées.
+    Raises:
+        ValueError: L'instantané ne correspond plus au contenu de la base.
+    """
+
+    db_path = db_path or configured_db_path()
+    data = SnapshotReferenceData(path).refresh()
+    if not data.snapshot.is_current(db_path):
+        raise ValueError(f"{path} est périmé: recompiler l'instantané de {db_path}.")
+    set_reference_data(data, db_path)
+
+    return data
+
+
+def ensure_snapshot(path=SNAPSHOT_PATH, db_path=None):
+    """Recompile l'instantané s'il est absent ou ne correspond plus à loads.db.
+
+    Args:
+        path: Fichier de l'instantané.
+        db_path: Base source (la base configurée dans database par défaut).
+    Returns:
+        Vrai si l'instantané a été recompilé.
+    """
+
+    db_path = db_path or configured_db_path()
+    if os.path.exists(path) and Snapshot(path).is_current(db_path):
+        return False
+    build_snapshot(db_path, path)
+
+    return True
+
+
+def main(argv=None):
+    """Point d'entrée: python snapshot.py [loads.db] [loads.snapshot]"""
+
+    parser = argparse.ArgumentParser(description="Compile loads.db en instantané binaire.")
+    parser.add_argument("db", nargs="?", default=DB_PATH)
+    parser.add_argument("output", nargs="?", default=SNAPSHOT_PATH)
+    args = parser.parse_args(argv)
+
+    header = build_snapshot(args.db, args.output)
+    rows = {table: spec["rows"] for table, spec in header["tables"].items()}
+    print(f"{args.output}: {rows} (sha256 {header['source_sha256'][:12]})")
+
+
+# TESTS
+def tests():
+    """Tests pour build_snapshot et Snapshot."""
+
+    import shutil
+    import sqlite3
+    import tempfile
+    from database import configured
+    from live_loads import LiveLoads
+
+    print("------START_TESTS------")
+
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, SNAPSHOT_PATH)
+        build_snapshot(DB_PATH, path)
+        snapshot = Snapshot(path)
+        source = ReferenceData(DB_PATH).refresh()
+
+        test_rows = all(snapshot.rows(table) == getattr(source, table) for table in TABLES)
+        expected_result = True
+        if test_rows != expected_result:
+            print("test_rows -> FAILED")
+            print("result = ", test_rows)
+            print("expected = ", expected_result)
+        else:
+            print("test_rows -> PASSED")
+
+        snow = snapshot.column("climatic_data", "snow")
+        test_mapped = snow.dtype.str, snow.flags.writeable, snapshot.is_current(DB_PATH)
+        expected_result = "<f8", False, True
+        if test_mapped != expected_result:
+            print("test_mapped -> FAILED")
+            print("result = ", test_mapped)
+            print("expected = ", expected_result)
+        else:
+            print("test_mapped -> PASSED")
+
+        copy = os.path.join(folder, DB_PATH)
+        shutil.copy(DB_PATH, copy)
+        with sqlite3.connect(copy) as connection:
+            connection.execute("UPDATE climatic_data SET snow = snow + 1 WHERE location = 'Gaspé'")
+        try:
+            install_snapshot(path, copy)
+            refused = False
+        except ValueError:
+            refused = True
+        test_stale = snapshot.is_current(copy), refused
+        expected_result = False, True
+        if test_stale != expected_result:
+            print("test_stale -> FAILED")
+            print("result = ", test_stale)
+            print("expected = ", expected_result)
+        else:
+            print("test_stale -> PASSED")
+
+        copy_path = os.path.join(folder, "copy.snapshot")
+        with configured(copy):
+            test_configured = ensure_snapshot(copy_path), ensure_snapshot(copy_path)
+            test_configured += (Snapshot(copy_path).is_current(),)
+        test_configured += (Snapshot(copy_path).is_current(copy),)
+        expected_result = True, False, True, True
+        if test_configured != expected_result:
+            print("test_configured -> FAILED")
+            print("result = ", test_configured)
+            print("expected = ", expected_result)
+        else:
+            print("test_configured -> PASSED")
+
+        expected_result = LiveLoads("Salle à manger").uniform_load(10, 20)
+        install_snapshot(path)
+        test_install = LiveLoads("Salle à manger").uniform_load(10, 20)
+        data = get_reference_data()
+        installed = isinstance(data, SnapshotReferenceData) and data.live_load("Inexistant") is None
+        installed = installed and isinstance(data.climatic_data, SnapshotTable)
+        clear_reference_data()
+        if test_install != expected_result or not installed:
+            print("test_install -> FAILED")
+            print("result = ", test_install)
+            print("expected = ", expected_result)
+        else:
+            print("test_install -> PASSED")
+
+    print("-------END_TESTS-------")
+
+
+# RUN FILE
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        main()
+    else:
+        tests()
+
+# END
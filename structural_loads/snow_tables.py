@@ -0,0 +1,383 @@
+"""
+
+CNB 2020: Partie 4. Règles de calcul.
+Section 4.1. Charges et méthodes de calcul.
+-----------------------------------------------
+
+Tables précompilées de la charge de neige.
+
+    Les termes de SnowLoads qui ne dépendent que de l'emplacement et de la catégorie de risque
+    (Is, Ss, Sr, γ et la charge de pluie 4.1.6.4.) sont calculés une seule fois pour chaque clé
+    (emplacement, importance, état limite), noms sans accents compris. Une requête devient la
+    lecture d'une ligne suivie des coefficients Cw, Cb et Cs, calculés par les mêmes fonctions
+    que SnowLoads (voir snow_loads.py). Les options que la table ne couvre pas (upper_roof) sont
+    confiées au calculateur complet.
+
+    La table est compilée depuis loads.db (python snow_tables.py build) et conserve l'empreinte
+    SHA-256 de la base pour détecter qu'elle doit être recompilée.
+____________________________________________________________________________________________________
+
+
+    auteur: GabPoulin
+    email: poulin33@me.com
+
+====================================================================================================
+"""
+
+# IMPORTS
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+from dataclasses import fields
+from datetime import datetime, timezone
+from itertools import product
+import numpy as np
+from database import DB_PATH, db_path as configured_db_path
+from locations import resolve_location
+from reference_data import ReferenceData
+from snapshot import db_fingerprint
+from snow_loads import (
+    SnowLoads,
+    basic_factor,
+    importance_factor,
+    slope_factor,
+    snow_specific_weight,
+    specified_rain_load,
+    specified_snow_load,
+    wind_factor,
+)
+
+
+# CODE
+FORMAT_VERSION = 2
+TABLE_PATH = "snow_tables.npz"
+IMPORTANCES = ("Faible", "Normal", "Élevé", "Protection civile")
+LIMIT_STATES = ("ÉLU", "ÉLTS")
+FLAGS = ("importance", "limit_state")
+COLUMNS = ("i_s", "ss", "sr", "gamma", "rain_load")
+
+# Arguments de SnowLoads acceptés par SnowTable.specified_load(), et ceux transmis à wind_factor.
+_OPTIONS = {field.name for field in fields(SnowLoads)}
+_WIND_OPTIONS = (
+    "importance",
+    "exposed_to_wind",
+    "north_area",
+    "rural_area",
+    "drifting_distance",
+    "sliding",
+    "wind_obstructions_height",
+    "wind_obstructions_distance",
+)
+
+
+def _row(climate, importance, limit_state):
+    """Termes d'une clé de la table, dans l'ordre de COLUMNS."""
+
+    return (
+        importance_factor(importance, limit_state),
+        climate.snow,
+        climate.snow_rain,
+        snow_specific_weight(climate.snow),
+        specified_rain_load(climate.rain),
+    )
+
+
+def build_table(db_path=None, path=TABLE_PATH):
+    """Compile la table de neige de tous les emplacements de loads.db.
+
+    Args:
+        db_path: Fichier loads.db source (la base configurée dans database par défaut).
+        path: Fichier de la table à écrire (.npz).
+    Returns:
+        En-tête de la table.
+    """
+
+    db_path = db_path or configured_db_path()
+    climatic_data = ReferenceData(db_path).refresh().climatic_data
+    combinations = list(product(IMPORTANCES, LIMIT_STATES))
+    keys = []
+    rows = []
+    for location, climate in climatic_data.items():
+        for flags in combinations:
+            keys.append((location, *flags))
+            rows.append(_row(climate, *flags))
+
+    header = {
+        "version": FORMAT_VERSION,
+        "source_sha256": db_fingerprint(db_path),
+        "created": datetime.now(timezone.utc).isoformat(),
+        "rows": len(rows),
+    }
+    key_columns = list(zip(*keys))
+    arrays = {"location": np.array(key_columns[0])}
+    for name, values in zip(FLAGS, key_columns[1:]):
+        arrays[name] = np.array(values)
+    arrays["values"] = np.array(rows, dtype=float)
+
+    temporary = f"{path}.tmp"
+    with open(temporary, "wb") as file:
+        np.savez_compressed(file, header=np.array(json.dumps(header)), **arrays)
+    os.replace(temporary, path)
+
+    return header
+
+
+class SnowTable:
+    """Table de neige ouverte en mémoire.
+
+    Args:
+        path: Fichier de la table (voir build_table()).
+    """
+
+    def __init__(self, path=TABLE_PATH):
+        self.path = path
+        with np.load(path, allow_pickle=False) as arrays:
+            self.header = json.loads(arrays["header"].item())
+            if self.header["version"] != FORMAT_VERSION:
+                raise ValueError(f"Version de table non supportée: {self.header['version']}")
+            keys = zip(*(arrays[name].tolist() for name in ("location", *FLAGS)))
+            values = arrays["values"].tolist()
+
+        self.rows = {key: tuple(row) for key, row in zip(keys, values)}
+
+    def is_current(self, db_path=None):
+        """Vrai si la table correspond au contenu actuel de loads.db (la base configurée dans
+        database par défaut).
+        """
+
+        return self.header["source_sha256"] == db_fingerprint(db_path or configured_db_path())
+
+    def row(self, location, **flags):
+        """Termes précalculés d'un emplacement et de ses options.
+
+        Args:
+            location: Emplacement (un nom sans accents ni majuscules est accepté).
+            flags: Options de FLAGS (valeurs par défaut de SnowLoads si omises).
+        Returns:
+            Dictionnaire {colonne: valeur} de COLUMNS.
+        """
+
+        return dict(zip(COLUMNS, self._lookup(location, self._flags(flags))))
+
+    @staticmethod
+    def _flags(options):
+        return options.get("importance", "Normal"), options.get("limit_state", "ÉLU")
+
+    def _lookup(self, location, flags):
+        row = self.rows.get((location, *flags))
+        if row is None:
+            row = self.rows.get((resolve_location(location), *flags))
+            if row is None:
+                raise KeyError(f"Aucune ligne pour {location!r} et {flags}.")
+
+        return row
+
+    def specified_load(
+        self,
+        location,
+        roof_height,
+        roof_larger_dimension,
+        roof_smaller_dimension,
+        slope,
+        **options,
+    ):
+        """4.1.6.1. Charge spécifiée, identique à SnowLoads(...).specified_load().
+
+        Args:
+            location, roof_height, roof_larger_dimension, roof_smaller_dimension, slope et
+            options: Mêmes arguments que SnowLoads.
+        Returns:
+            Charge spécifiée maximale retenue (S_pluie ou S_neige).
+        """
+
+        unsupported = set(options) - _OPTIONS
+        if unsupported:
+            raise TypeError(f"Options inconnues: {sorted(unsupported)}")
+        if options.get("upper_roof", 0) > 0:
+            roof = SnowLoads(
+                location,
+                roof_height,
+                roof_larger_dimension,
+                roof_smaller_dimension,
+                slope,
+                **options,
+            )
+            return roof.specified_load()
+
+        i_s, ss, sr, gamma, rain_load = self._lookup(location, self._flags(options))
+
+        wind_options = {name: options[name] for name in _WIND_OPTIONS if name in options}
+        cw = wind_factor(ss, gamma, **wind_options)
+        cb = basic_factor(roof_height, roof_larger_dimension, roof_smaller_dimension, ss, gamma, cw)
+        cs = slope_factor(slope, options.get("slippery_roof", False))
+        snow_load = specified_snow_load(i_s, ss, sr, cb, cw, cs, 1)
+
+        return round(max(snow_load, rain_load), 2)
+
+
+def check_table(table, samples=1000, seed=0):
+    """Compare la table au calculateur SnowLoads sur des toits tirés au hasard.
+
+    Args:
+        table: SnowTable à vérifier.
+        samples: Nombre de toits comparés.
+        seed: Germe du tirage.
+    Returns:
+        Liste des écarts (arguments, table, SnowLoads); vide si la table est cohérente.
+    """
+
+    generator = random.Random(seed)
+    keys = list(table.rows)
+    mismatches = []
+    for _ in range(samples):
+        location, *flags = generator.choice(keys)
+        options = dict(zip(FLAGS, flags))
+        options.update(
+            north_area=generator.random() < 0.3,
+            rural_area=generator.random() < 0.5,
+            exposed_to_wind=generator.random() < 0.5,
+            slippery_roof=generator.random() < 0.3,
+            drifting_distance=generator.choice((3, 10)),
+            sliding=generator.random() < 0.1,
+            wind_obstructions_height=generator.choice((0, 0, 2, 6)),
+            wind_obstructions_distance=generator.uniform(0, 60),
+        )
+        arguments = (
+            location,
+            generator.uniform(0, 15),
+            generator.uniform(20, 200),
+            generator.uniform(5, 20),
+            generator.uniform(0, 80),
+        )
+        expected = SnowLoads(*arguments, **options).specified_load()
+        result = table.specified_load(*arguments, **options)
+        if result != expected:
+            mismatches.append(((arguments, options), result, expected))
+
+    return mismatches
+
+
+def main(argv=None):
+    """Point d'entrée: python snow_tables.py {build,check} [loads.db] [snow_tables.npz]"""
+
+    parser = argparse.ArgumentParser(description="Tables précompilées de la charge de neige.")
+    parser.add_argument("command", choices=("build", "check"))
+    parser.add_argument("db", nargs="?", default=DB_PATH)
+    parser.add_argument("table", nargs="?", default=TABLE_PATH)
+    parser.add_argument("--samples", type=int, default=1000, help="Toits comparés (check).")
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        header = build_table(args.db, args.table)
+        print(f"{args.table}: {header['rows']} lignes (sha256 {header['source_sha256'][:12]})")
+        return
+
+    table = SnowTable(args.table)
+    if not table.is_current(args.db):
+        print(f"{args.table} ne correspond plus à {args.db}: recompiler avec build.")
+        sys.exit(1)
+    mismatches = check_table(table, args.samples)
+    for (arguments, options), result, expected in mismatches[:10]:
+        print(f"{arguments} {options}: table {result}, SnowLoads {expected}")
+    print(f"{args.samples - len(mismatches)}/{args.samples} toits identiques")
+    if mismatches:
+        sys.exit(1)
+
+
+# TESTS
+def tests():
+    """Tests pour la classe SnowTable."""
+
+    import shutil
+    import sqlite3
+    from time import perf_counter
+    from database import configured
+
+    print("------START_TESTS------")
+
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, TABLE_PATH)
+        header = build_table(DB_PATH, path)
+        table = SnowTable(path)
+
+        test_build = header["rows"] == len(table.rows), table.is_current(DB_PATH)
+        expected_result = True, True
+        if test_build != expected_result:
+            print("test_build -> FAILED")
+            print("result = ", test_build)
+            print("expected = ", expected_result)
+        else:
+            print("test_build -> PASSED")
+
+        copy = os.path.join(folder, DB_PATH)
+        shutil.copy(DB_PATH, copy)
+        with sqlite3.connect(copy) as connection:
+            connection.execute("UPDATE climatic_data SET snow = snow + 1 WHERE location = 'Gaspé'")
+        copy_path = os.path.join(folder, "copy.npz")
+        with configured(copy):
+            stale = table.is_current()
+            build_table(path=copy_path)
+        test_configured = stale, SnowTable(copy_path).is_current(copy)
+        expected_result = False, True
+        if test_configured != expected_result:
+            print("test_configured -> FAILED")
+            print("result = ", test_configured)
+            print("expected = ", expected_result)
+        else:
+            print("test_configured -> PASSED")
+
+        test_row = table.row("gaspe", exposed_to_wind=True, rural_area=True)
+        roof = SnowLoads("Gaspé", 5, 20, 10, 0, exposed_to_wind=True, rural_area=True)
+        expected_result = roof.breakdown
+        if any(test_row[name] != expected_result[name] for name in ("i_s", "ss", "gamma")):
+            print("test_row -> FAILED")
+            print("result = ", test_row)
+            print("expected = ", dict(expected_result))
+        else:
+            print("test_row -> PASSED")
+
+        test_consistency = check_table(table, 3000)
+        expected_result = []
+        if test_consistency != expected_result:
+            print("test_consistency -> FAILED")
+            print("result = ", test_consistency[:5])
+            print("expected = ", expected_result)
+        else:
+            print("test_consistency -> PASSED")
+
+        arguments = "Gaspé", 2, 60, 20, 0
+        options = {"case": 2, "upper_roof": 4, "parapet_height": 0.5}
+        test_fallback = table.specified_load(*arguments, **options)
+        expected_result = SnowLoads(*arguments, **options).specified_load()
+        if test_fallback != expected_result:
+            print("test_fallback -> FAILED")
+            print("result = ", test_fallback)
+            print("expected = ", expected_result)
+        else:
+            print("test_fallback -> PASSED")
+
+    repeat = 20000
+    start = perf_counter()
+    for _ in range(repeat):
+        table.specified_load("Gaspé", 5, 20, 10, 35, exposed_to_wind=True, north_area=True)
+    query = (perf_counter() - start) / repeat
+    start = perf_counter()
+    for _ in range(repeat):
+        SnowLoads("Gaspé", 5, 20, 10, 35, exposed_to_wind=True, north_area=True).specified_load()
+    live = (perf_counter() - start) / repeat
+    print(f"table = {query * 1e6:.2f} µs, SnowLoads = {live * 1e6:.2f} µs")
+
+    print("-------END_TESTS-------")
+
+
+# RUN FILE
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        main()
+    else:
+        tests()
+
+# END
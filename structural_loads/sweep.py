@@ -0,0 +1,273 @@
+"""
+
+CNB 2020: Partie 4. Règles de calcul.
+Section 4.1. Charges et méthodes de calcul.
+-----------------------------------------------
+
+Balayage paramétrique.
+
+    Évalue un même bâtiment pour toutes les combinaisons de paramètres demandées (emplacements,
+    catégories de risque, états limites, etc.). Le produit cartésien est construit au fur et à
+    mesure, évalué par lots avec SnowLoadsBatch et LimitStatesDesignBatch, puis écrit ligne par
+    ligne dans un fichier CSV sans garder la grille complète en mémoire.
+____________________________________________________________________________________________________
+
+
+    auteur: GabPoulin
+    email: poulin33@me.com
+
+====================================================================================================
+"""
+
+# IMPORTS
+import csv
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, fields
+from itertools import islice, product
+from math import prod
+import numpy as np
+from database import db_path
+from limit_state_design import LimitStatesDesign, LimitStatesDesignBatch
+from portfolio import init_worker
+from reference_data import get_reference_data
+from snapshot import SnapshotReferenceData
+from snow_loads import SnowLoads, SnowLoadsBatch
+
+
+# CODE
+SNOW_FIELDS = {field.name for field in fields(SnowLoadsBatch)}
+DESIGN_FIELDS = {field.name for field in fields(LimitStatesDesignBatch)} - {"snow"}
+
+
+def all_locations():
+    """Tous les emplacements de la table climatic_data."""
+
+    return list(get_reference_data().refresh().climatic_data)
+
+
+def _evaluate_chunk(base, names, rows):
+    """Évalue un lot de scénarios.
+
+    Args:
+        base: Paramètres communs à tous les scénarios.
+        names: Noms des paramètres balayés.
+        rows: Valeurs des paramètres balayés, une ligne par scénario.
+    Returns:
+        Lignes de résultats (paramètres balayés, S, combinaison de charges, cas déterminant).
+    """
+
+    columns = dict(zip(names, (np.array(column) for column in zip(*rows))))
+    params = {**base, **columns}
+
+    snow = SnowLoadsBatch(
+        **{name: value for name, value in params.items() if name in SNOW_FIELDS}
+    ).specified_load()
+    design = LimitStatesDesignBatch(
+        snow=snow,
+        **{name: value for name, value in params.items() if name in DESIGN_FIELDS},
+    )
+    uls, uls_case, _ = design.uls()
+    sls, sls_case, _ = design.sls()
+
+    service = np.broadcast_to(params.get("limit_state", "ÉLU"), snow.shape) == "ÉLTS"
+    design_load = np.where(service, sls, uls)
+    governing_case = np.where(service, sls_case, uls_case)
+
+    return [
+        (*row, snow_load, load, case)
+        for row, snow_load, load, case in zip(
+            rows, snow.tolist(), design_load.tolist(), governing_case.tolist()
+        )
+    ]
+
+
+@dataclass
+class Sweep:
+    """Balayage paramétrique d'un bâtiment.
+
+    Args:
+        base: Scénario de base (arguments de SnowLoads et de LimitStatesDesign).
+        axes: Valeurs à balayer pour chaque paramètre (produit cartésien).
+
+    Optional:
+        chunk_size: Nombre de scénarios évalués par lot.
+        parallel_threshold: Nombre de scénarios à partir duquel un pool de processus est utilisé.
+        workers: Nombre de processus (os.cpu_count() par défaut).
+    Raises:
+        TypeError: Un paramètre de base ou un axe n'est ni un argument de SnowLoadsBatch ni de
+            LimitStatesDesignBatch.
+    """
+
+    base: dict
+    axes: dict
+
+    chunk_size: int = 10000
+    parallel_threshold: int = 100000
+    workers: int = None
+
+    def __post_init__(self):
+        unknown = {*self.base, *self.axes} - SNOW_FIELDS - DESIGN_FIELDS
+        if unknown:
+            raise TypeError(f"Paramètres inconnus: {sorted(unknown)}")
+
+    def __len__(self):
+        return prod(len(values) for values in self.axes.values())
+
+    def chunks(self):
+        """Découpe le produit cartésien des axes en lots, sans le construire au complet."""
+
+        scenarios = product(*self.axes.values())
+        while chunk := list(islice(scenarios, self.chunk_size)):
+            yield chunk
+
+    def results(self):
+        """Résultats de chaque lot, dans l'ordre du produit cartésien."""
+
+        names = list(self.axes)
+        if len(self) < self.parallel_threshold:
+            for chunk in self.chunks():
+                yield _evaluate_chunk(self.base, names, chunk)
+            return
+
+        # Les processus (spawn) reprennent la base configurée et l'instantané installé.
+        data = get_reference_data()
+        snapshot_path = data.path if isinstance(data, SnapshotReferenceData) else None
+        workers = self.workers or os.cpu_count()
+        with ProcessPoolExecutor(
+            workers,
+            initializer=init_worker,
+            initargs=(db_path(), snapshot_path),
+        ) as executor:
+            pending = []
+            for chunk in self.chunks():
+                pending.append(executor.submit(_evaluate_chunk, self.base, names, chunk))
+                if len(pending) >= 2 * workers:
+                    yield pending.pop(0).result()
+            for future in pending:
+                yield future.result()
+
+    def run(self, path):
+        """Évalue le balayage et écrit les résultats au fur et à mesure.
+
+        Args:
+            path: Fichier CSV de sortie.
+        Returns:
+            Nombre de scénarios évalués.
+        """
+
+        count = 0
+        with open(path, "w", newline="", encoding="utf-8") as file:
+            writer = csv.writer(file)
+            writer.writerow([*self.axes, "snow", "design_load", "governing_case"])
+            for rows in self.results():
+                writer.writerows(rows)
+                count += len(rows)
+
+        return count
+
+
+# TESTS
+def tests():
+    """Tests pour la classe Sweep."""
+
+    import shutil
+    import sqlite3
+    from database import configured
+
+    print("------START_TESTS------")
+
+    base = {
+        "roof_height": 5,
+        "roof_larger_dimension": 30,
+        "roof_smaller_dimension": 12,
+        "slope": 20,
+        "dead": 1.2,
+        "live": 1.9,
+    }
+    axes = {
+        "location": all_locations()[:10],
+        "importance": ["Faible", "Normal", "Élevé", "Protection civile"],
+        "limit_state": ["ÉLU", "ÉLTS"],
+    }
+
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, "sweep.csv")
+        test_run = Sweep(base, axes, chunk_size=7).run(path)
+        expected_result = 80
+        if test_run != expected_result:
+            print("test_run -> FAILED")
+            print("result = ", test_run)
+            print("expected = ", expected_result)
+        else:
+            print("test_run -> PASSED")
+
+        with open(path, encoding="utf-8") as file:
+            rows = list(csv.DictReader(file))
+        row = rows[-1]
+        snow = SnowLoads(
+            row["location"],
+            5,
+            30,
+            12,
+            20,
+            importance=row["importance"],
+            limit_state=row["limit_state"],
+        ).specified_load()
+        test_row = float(row["snow"]), float(row["design_load"])
+        expected_result = snow, LimitStatesDesign(1.2, 1.9, snow).sls()
+        if test_row != expected_result:
+            print("test_row -> FAILED")
+            print("result = ", test_row)
+            print("expected = ", expected_result)
+        else:
+            print("test_row -> PASSED")
+
+        parallel_path = os.path.join(folder, "parallel.csv")
+        Sweep(base, axes, chunk_size=7, parallel_threshold=0, workers=2).run(parallel_path)
+        with open(parallel_path, encoding="utf-8") as file:
+            test_parallel = list(csv.DictReader(file))
+        if test_parallel != rows:
+            print("test_parallel -> FAILED")
+        else:
+            print("test_parallel -> PASSED")
+
+        copy = os.path.join(folder, "loads.db")
+        shutil.copy(db_path(), copy)
+        with sqlite3.connect(copy) as connection:
+            connection.execute("UPDATE climatic_data SET snow = snow + 1 WHERE location = 'Gaspé'")
+        copy_path = os.path.join(folder, "copy.csv")
+        with configured(copy):
+            Sweep(base, {"location": ["Gaspé"]}, parallel_threshold=0, workers=1).run(copy_path)
+            expected_result = SnowLoads("Gaspé", 5, 30, 12, 20).specified_load()
+        with open(copy_path, encoding="utf-8") as file:
+            test_configured = float(next(csv.DictReader(file))["snow"])
+        if test_configured != expected_result:
+            print("test_configured -> FAILED")
+            print("result = ", test_configured)
+            print("expected = ", expected_result)
+        else:
+            print("test_configured -> PASSED")
+
+    try:
+        Sweep(base, {"importanse": ["Élevé"]})
+        test_unknown = None
+    except TypeError as error:
+        test_unknown = str(error)
+    expected_result = "Paramètres inconnus: ['importanse']"
+    if test_unknown != expected_result:
+        print("test_unknown -> FAILED")
+        print("result = ", test_unknown)
+        print("expected = ", expected_result)
+    else:
+        print("test_unknown -> PASSED")
+
+    print("-------END_TESTS-------")
+
+
+# RUN FILE
+if __name__ == "__main__":
+    tests()
+
+# END
@@ -0,0 +1,263 @@
+"""
+
+CNB 2020: Partie 4. Règles de calcul.
+Section 4.1. Charges et méthodes de calcul.
+-----------------------------------------------
+
+Descente de charges.
+
+    Cumule D, L et S étage par étage, du toit vers les fondations, pour un élément porteur
+    (poteau ou mur) et calcule les états limites à chaque niveau:
+        D -> DeadLoads de chaque étage multipliée par sa surface tributaire.
+        L -> LiveLoads de chaque étage, avec la réduction de 4.1.5.8. calculée sur la surface
+             tributaire cumulée.
+        S -> SnowLoads du toit multipliée par sa surface tributaire.
+    Les résultats des étages supérieurs sont réutilisés lorsqu'un étage plus bas est modifié.
+____________________________________________________________________________________________________
+
+
+    auteur: GabPoulin
+    email: poulin33@me.com
+
+====================================================================================================
+"""
+
+# IMPORTS
+from collections import namedtuple
+from dataclasses import dataclass, replace
+from time import perf_counter
+from dead_loads import DeadLoads
+from limit_state_design import LimitStatesDesign, LimitStatesDesignBatch
+from live_loads import LiveLoads
+from snow_loads import SnowLoads
+
+
+# CODE
+LevelLoads = namedtuple(
+    "LevelLoads",
+    "name area dead live snow wind earthquake uls sls uls_case sls_case",
+)
+UnitLoads = namedtuple("UnitLoads", "dead live snow")
+
+
+@dataclass
+class Storey:
+    """Étage supporté par l'élément porteur.
+
+    Args:
+        name: Nom de l'étage.
+        tributary_area: Surface tributaire de l'élément à cet étage (m²).
+
+    Optional:
+        materials: Matériaux du plancher ou du toit (voir DeadLoads).
+        add_partitions: Ajoute 1 kPa pour le poids des cloisons.
+        additional_loads: Poids additionnel (kPa).
+        use: Usage prévu (voir LiveLoads), None si aucune surcharge.
+        importance: Catégorie de risque pour la surcharge.
+        reinforced_slab: La surface est une dalle armée.
+        roof: Charge de neige du toit (SnowLoads), None si l'étage n'est pas un toit.
+        self_weight: Poids propre de l'élément porteur à cet étage (kN).
+        wind: Charge due au vent reprise à cet étage (kN).
+        earthquake: Charge due aux séismes reprise à cet étage (kN).
+    """
+
+    name: str
+    tributary_area: float
+
+    materials: list = ()
+    add_partitions: bool = False
+    additional_loads: float = 0
+    use: str = None
+    importance: str = "Normal"
+    reinforced_slab: bool = False
+    roof: SnowLoads = None
+    self_weight: float = 0
+    wind: float = 0
+    earthquake: float = 0
+
+    def unit_loads(self):
+        """Charges par unité de surface (kPa) de l'étage, avant la réduction de 4.1.5.8."""
+
+        dead = DeadLoads(self.materials).sum_dead_loads(
+            self.add_partitions,
+            self.additional_loads,
+        )
+
+        live = 0
+        if self.use is not None:
+            live_loads = LiveLoads(self.use, self.importance)
+            live = live_loads._get_live_info().uniform
+            if self.use == "Salle à manger":
+                live = live_loads._dining_area(live, self.tributary_area)
+
+        snow = 0
+        if self.roof is not None:
+            snow = self.roof.specified_load()
+
+        return UnitLoads(dead, live, snow)
+
+    def live_load(self, unit_live, cumulative_area):
+        """4.1.5.8. Surcharge (kPa) de l'étage, réduite selon la surface tributaire cumulée."""
+
+        if self.use is None:
+            return 0
+
+        live_loads = LiveLoads(self.use, self.importance)
+        factor, _ = live_loads._tributary_area(
+            self.reinforced_slab,
+            unit_live,
+            cumulative_area,
+        )
+
+        return live_loads._low_importance_factor(unit_live * factor)
+
+
+class Building:
+    """Bâtiment décrit comme une pile d'étages, du toit vers les fondations.
+
+    Args:
+        storeys: Étages, du plus haut au plus bas.
+        **design: Conditions d'application des charges passées à LimitStatesDesign
+            (counter_d, liquid_l, storage_area, exterior_area, car_access, h_s).
+    """
+
+    def __init__(self, storeys, **design):
+        self.storeys = list(storeys)
+        self.design = design
+        self._unit = [None] * len(self.storeys)
+        self._levels = []
+
+    def replace_storey(self, index, storey):
+        """Remplace un étage; seuls cet étage et ceux en dessous seront recalculés."""
+
+        self.storeys[index] = storey
+        self._unit[index] = None
+        del self._levels[index:]
+
+    def edit_storey(self, index, **changes):
+        """Modifie les données d'un étage (voir replace_storey)."""
+
+        self.replace_storey(index, replace(self.storeys[index], **changes))
+
+    def _unit_loads(self, index):
+        if self._unit[index] is None:
+            self._unit[index] = self.storeys[index].unit_loads()
+
+        return self._unit[index]
+
+    def takedown(self):
+        """Descente de charges complète.
+
+        Returns:
+            Liste de LevelLoads (kN), une par étage, pour la charge transmise sous cet étage.
+        """
+
+        start = len(self._levels)
+        if start == len(self.storeys):
+            return list(self._levels)
+
+        if start:
+            previous = self._levels[-1]
+            dead, snow, wind, earthquake = (
+                previous.dead,
+                previous.snow,
+                previous.wind,
+                previous.earthquake,
+            )
+        else:
+            dead = snow = wind = earthquake = 0
+        live_area = sum(
+            storey.tributary_area for storey in self.storeys[:start] if storey.use is not None
+        )
+
+        rows = []
+        for index in range(start, len(self.storeys)):
+            storey = self.storeys[index]
+            unit = self._unit_loads(index)
+            area = storey.tributary_area
+            dead += unit.dead * area + storey.self_weight
+            snow += unit.snow * area
+            wind += storey.wind
+            earthquake += storey.earthquake
+            if storey.use is not None:
+                live_area += area
+
+            live = sum(
+                self.storeys[j].live_load(self._unit_loads(j).live, live_area)
+                * self.storeys[j].tributary_area
+                for j in range(index + 1)
+                if self.storeys[j].use is not None
+            )
+            rows.append((storey.name, area, dead, live, snow, wind, earthquake))
+
+        _, _, *columns = zip(*rows)
+        design = LimitStatesDesignBatch(*columns, **self.design)
+        uls, uls_case, _ = design.uls()
+        sls, sls_case, _ = design.sls()
+        for row, values in zip(
+            rows,
+            zip(uls.tolist(), sls.tolist(), uls_case.tolist(), sls_case.tolist()),
+        ):
+            self._levels.append(LevelLoads(*row, *values))
+
+        return list(self._levels)
+
+
+# TESTS
+def tests():
+    """Tests pour la classe Building."""
+
+    print("------START_TESTS------")
+
+    floor = ["Bois de feuillus 20mm", "É-P-S 19mm", "2x10 à 16po", "Panneau de gypse 12mm"]
+    roof = Storey(
+        "Toit",
+        25,
+        ["Bardeaux d'asphalte", "2x6 à 24po"],
+        roof=SnowLoads("Gaspé", 12, 30, 20, 20),
+    )
+
+    office = "Bureaux (1er étage et +)"
+    single = Building([Storey("Étage", 30, floor, True, use=office)]).takedown()[0]
+    live, _ = LiveLoads(office).uniform_load(5, 6)
+    dead = DeadLoads(floor).sum_dead_loads(True) * 30
+    test_single = single.dead, single.live, single.uls
+    expected_result = dead, live * 30, LimitStatesDesign(dead, live * 30).uls()
+    if test_single != expected_result:
+        print("test_single -> FAILED")
+        print("result = ", test_single)
+        print("expected = ", expected_result)
+    else:
+        print("test_single -> PASSED")
+
+    storeys = [roof] + [Storey(f"Étage {i}", 25, floor, True, use=office) for i in range(39)]
+    building = Building(storeys)
+    levels = building.takedown()
+    test_cumulative = levels[-1].dead > levels[0].dead and levels[-1].live < 39 * 25 * 2.4
+    expected_result = True
+    if test_cumulative != expected_result:
+        print("test_cumulative -> FAILED")
+        print("result = ", test_cumulative)
+        print("expected = ", expected_result)
+    else:
+        print("test_cumulative -> PASSED")
+
+    start = perf_counter()
+    building.edit_storey(30, use="Stockage")
+    test_incremental = building.takedown()
+    elapsed = perf_counter() - start
+    expected_result = Building(building.storeys).takedown()
+    if test_incremental != expected_result or test_incremental[:30] != levels[:30]:
+        print("test_incremental -> FAILED")
+    else:
+        print("test_incremental -> PASSED")
+    print(f"edit + takedown (40 étages) = {elapsed * 1e3:.2f} ms")
+
+    print("-------END_TESTS-------")
+
+
+# RUN FILE
+if __name__ == "__main__":
+    tests()
+
+# END
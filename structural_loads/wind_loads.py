@@ -0,0 +1,384 @@
+"""
+
+CNB 2020: Partie 4. Règles de calcul.
+Section 4.1. Charges et méthodes de calcul.
+-----------------------------------------------
+
+4.1.7. Charge due au vent.
+
+    Méthode statique (4.1.7.3.): p = Iw · q · Ce · Ct · Cg · Cp.
+        1- Faces d'un bâtiment (au vent, sous le vent, latérales, toit) pour les éléments
+           structuraux principaux.
+        2- Zones des bâtiments de faible hauteur (produits CpCg de la figure 4.1.7.6.-A, cas A).
+        3- WindLoadsBatch: toutes les faces de plusieurs bâtiments à plusieurs hauteurs en une
+           passe NumPy; les pressions se combinent directement avec LimitStatesDesignBatch.
+____________________________________________________________________________________________________
+
+
+    auteur: GabPoulin
+    email: poulin33@me.com
+
+====================================================================================================
+"""
+
+# IMPORTS
+from dataclasses import dataclass
+import numpy as np
+from array_math import exact_power
+from locations import resolve_location
+from reference_data import get_reference_data
+
+
+# CODE
+# Faces pour les éléments structuraux principaux (Cg = 2.0): Cp et hauteur où Ce est évalué.
+FACES = {
+    "windward": (0.8, "z"),
+    "leeward": (-0.5, "mid"),
+    "side": (-0.7, "top"),
+    "roof": (-1.0, "top"),
+}
+
+# Figure 4.1.7.6.-A, cas A: CpCg des zones selon la pente du toit (°), interpolés linéairement.
+LOW_BUILDING_SLOPES = (0, 5, 20, 30, 45, 90)
+LOW_BUILDING_ZONES = {
+    "1": (0.75, 0.75, 1.0, 1.05, 1.05, 1.05),
+    "1E": (1.15, 1.15, 1.5, 1.3, 1.3, 1.3),
+    "2": (-1.3, -1.3, -1.3, 0.4, 0.4, 1.05),
+    "2E": (-2.0, -2.0, -2.0, 0.5, 0.5, 1.3),
+    "3": (-0.7, -0.7, -0.9, -0.8, -0.8, -0.7),
+    "3E": (-1.0, -1.0, -1.3, -1.0, -1.0, -0.9),
+    "4": (-0.55, -0.55, -0.8, -0.7, -0.7, -0.7),
+    "4E": (-0.8, -0.8, -1.2, -0.9, -0.9, -0.9),
+}
+
+# 4.1.7.7. Coefficients de pression intérieure (Cpi minimal, Cpi maximal) par catégorie.
+INTERNAL_PRESSURE = {1: (-0.15, 0.0), 2: (-0.45, 0.3), 3: (-0.7, 0.7)}
+
+
+def _exposure(z, terrain):
+    """4.1.7.3.5). - Ce: coefficient d'exposition à la hauteur z (m).
+    Terrain dégagé: (z/10)^0.2 >= 0.9. Terrain accidenté: 0.7(z/12)^0.3 >= 0.7.
+    """
+
+    z, rough = np.broadcast_arrays(np.asarray(z, dtype=float), np.asarray(terrain) == "rough")
+    open_ce = np.maximum(exact_power(z / 10, 0.2), 0.9)
+    rough_ce = np.maximum(0.7 * exact_power(z / 12, 0.3), 0.7)
+
+    return np.where(rough, rough_ce, open_ce)
+
+
+def _importance(importance, limit_state):
+    """Tableau 4.1.7.3. - Iw: coefficient de risque de la charge due au vent."""
+
+    importance, limit_state = np.broadcast_arrays(np.asarray(importance), np.asarray(limit_state))
+    iw = np.ones(importance.shape)
+    iw[importance == "Faible"] = 0.8
+    iw[importance == "Élevé"] = 1.15
+    iw[importance == "Protection civile"] = 1.25
+    iw[limit_state == "ÉLTS"] = 0.75
+
+    return iw
+
+
+def _climate(reference_data, location):
+    """Données climatiques d'un emplacement (nom exact ou approximatif)."""
+
+    info = reference_data.climate(location)
+    if info is None:
+        info = reference_data.climate(resolve_location(location))
+    if info is None:
+        raise KeyError(f"Emplacement inconnu: {location}")
+
+    return info
+
+
+@dataclass
+class WindLoads:
+    """4.1.7. Charge due au vent, méthode statique.
+
+    Args:
+        location: Emplacement du bâtiment.
+        building_height: Hauteur de référence du bâtiment (m).
+
+    Optional:
+        importance: Catégorie de risque ("Faible", "Normal", "Élevé", "Protection civile").
+        limit_state: Spécifier ("ÉLU", "ÉLTS").
+        terrain: Rugosité du terrain ("open": dégagé, "rough": accidenté).
+        topographic_factor: Ct, coefficient topographique (4.1.7.4.).
+        internal_category: Catégorie de pression intérieure (1, 2 ou 3) de 4.1.7.7.
+    """
+
+    location: str
+    building_height: float
+
+    importance: str = "Normal"
+    limit_state: str = "ÉLU"
+    terrain: str = "open"
+    topographic_factor: float = 1
+    internal_category: int = 1
+
+    def _get_climate_info(self):
+        """Récupère les données climatiques de loads.db pour l'emplacement choisi."""
+
+        return _climate(get_reference_data(), self.location)
+
+    def _importance_factor(self):
+        """Tableau 4.1.7.3. - Iw: coefficient de risque."""
+
+        return float(_importance(self.importance, self.limit_state))
+
+    def _exposure_factor(self, z):
+        """4.1.7.3.5). - Ce: coefficient d'exposition à la hauteur z (m)."""
+
+        return float(_exposure(z, self.terrain))
+
+    def _base_pressure(self):
+        """Iw · q · Ct (kPa), commun à toutes les faces."""
+
+        q = self._get_climate_info().wind
+
+        return self._importance_factor() * q * self.topographic_factor
+
+    def external_pressure(self, face, z=None):
+        """4.1.7.3. Pression extérieure sur une face (kPa, positive vers la face).
+
+        Args:
+            face: "windward", "leeward", "side" ou "roof".
+            z: Hauteur (m) pour la face au vent (building_height par défaut).
+        """
+
+        cp, reference = FACES[face]
+        height = {"z": self.building_height if z is None else z, "mid": self.building_height / 2}
+        ce = self._exposure_factor(height.get(reference, self.building_height))
+
+        return self._base_pressure() * ce * 2.0 * cp
+
+    def internal_pressures(self):
+        """4.1.7.7. Pressions intérieures minimale et maximale (kPa), Ce à mi-hauteur, Cgi = 2.0."""
+
+        ce = self._exposure_factor(self.building_height / 2)
+        base = self._base_pressure() * ce * 2.0
+
+        return tuple(base * cpi for cpi in INTERNAL_PRESSURE[self.internal_category])
+
+    def net_pressure(self, face, z=None):
+        """Pression nette déterminante (extérieure moins intérieure) sur une face (kPa)."""
+
+        external = self.external_pressure(face, z)
+        low, high = self.internal_pressures()
+        if external >= 0:
+            return external - low
+
+        return external - high
+
+    def zone_pressure(self, zone, slope=0):
+        """4.1.7.6. Pression extérieure d'une zone d'un bâtiment de faible hauteur (kPa).
+
+        Args:
+            zone: Zone de la figure 4.1.7.6.-A ("1", "1E", "2", "2E", "3", "3E", "4", "4E").
+            slope: Pente du toit (°).
+        """
+
+        cp_cg = float(np.interp(slope, LOW_BUILDING_SLOPES, LOW_BUILDING_ZONES[zone]))
+        ce = self._exposure_factor(self.building_height)
+
+        return self._base_pressure() * ce * cp_cg
+
+
+@dataclass
+class WindLoadsBatch:
+    """4.1.7. Charge due au vent, évaluée en lot.
+        Même calcul que WindLoads, mais chaque argument accepte un tableau (un bâtiment par
+        élément). Les hauteurs z données aux méthodes sont diffusées avec les bâtiments, par
+        exemple des bâtiments de forme (n, 1) et des hauteurs de forme (m,) donnent (n, m).
+
+    Args:
+        location: Emplacements des bâtiments.
+        building_height: Hauteurs de référence des bâtiments (m).
+
+    Optional:
+        Mêmes options que WindLoads, en tableaux ou en scalaires.
+    """
+
+    location: np.ndarray
+    building_height: np.ndarray
+
+    importance: np.ndarray = "Normal"
+    limit_state: np.ndarray = "ÉLU"
+    terrain: np.ndarray = "open"
+    topographic_factor: np.ndarray = 1
+    internal_category: np.ndarray = 1
+
+    def __post_init__(self):
+        names = (
+            "location",
+            "building_height",
+            "importance",
+            "limit_state",
+            "terrain",
+            "topographic_factor",
+            "internal_category",
+        )
+        columns = np.broadcast_arrays(*(np.asarray(getattr(self, name)) for name in names))
+        for name, column in zip(names, columns):
+            setattr(self, name, column)
+        self.building_height = self.building_height.astype(float)
+        self.topographic_factor = self.topographic_factor.astype(float)
+
+        reference_data = get_reference_data()
+        locations, inverse = np.unique(self.location, return_inverse=True)
+        q = np.array([_climate(reference_data, name).wind for name in locations.tolist()])
+        self.q = q[inverse.reshape(self.location.shape)]
+
+    def _base_pressure(self):
+        """Iw · q · Ct (kPa) de chaque bâtiment."""
+
+        return _importance(self.importance, self.limit_state) * self.q * self.topographic_factor
+
+    def external_pressures(self, z=None):
+        """4.1.7.3. Pressions extérieures sur toutes les faces (kPa).
+
+        Args:
+            z: Hauteurs (m) pour la face au vent (building_height par défaut).
+        Returns:
+            Tableau (..., faces) dans l'ordre de FACES.
+        """
+
+        z = self.building_height if z is None else np.asarray(z, dtype=float)
+        heights = {"z": z, "mid": self.building_height / 2, "top": self.building_height}
+        base = self._base_pressure()
+        columns = [
+            base * _exposure(heights[reference], self.terrain) * 2.0 * cp
+            for cp, reference in FACES.values()
+        ]
+
+        return np.stack(np.broadcast_arrays(*columns), axis=-1)
+
+    def internal_pressures(self):
+        """4.1.7.7. Pressions intérieures minimales et maximales (kPa) de chaque bâtiment."""
+
+        ce = _exposure(self.building_height / 2, self.terrain)
+        base = self._base_pressure() * ce * 2.0
+        cpi = np.array([INTERNAL_PRESSURE[int(c)] for c in self.internal_category.ravel()])
+        cpi = cpi.reshape(*self.internal_category.shape, 2)
+
+        return base * cpi[..., 0], base * cpi[..., 1]
+
+    def net_pressures(self, z=None):
+        """Pressions nettes déterminantes sur toutes les faces (kPa), tableau (..., faces)."""
+
+        external = self.external_pressures(z)
+        low, high = self.internal_pressures()
+        low = low[..., np.newaxis]
+        high = high[..., np.newaxis]
+
+        return np.where(external >= 0, external - low, external - high)
+
+    def zone_pressures(self, slope=0):
+        """4.1.7.6. Pressions extérieures de toutes les zones d'un bâtiment de faible hauteur.
+
+        Args:
+            slope: Pentes des toits (°).
+        Returns:
+            Tableau (..., zones) dans l'ordre de LOW_BUILDING_ZONES.
+        """
+
+        ce = _exposure(self.building_height, self.terrain)
+        base = self._base_pressure() * ce
+        columns = [
+            base * np.interp(slope, LOW_BUILDING_SLOPES, values)
+            for values in LOW_BUILDING_ZONES.values()
+        ]
+
+        return np.stack(np.broadcast_arrays(*columns), axis=-1)
+
+    def design_load(self, face="windward", z=None):
+        """Charge W (kPa, valeur absolue de la pression nette) d'une face, pour
+        LimitStatesDesignBatch(wind=...).
+        """
+
+        return np.abs(self.net_pressures(z)[..., list(FACES).index(face)])
+
+
+# TESTS
+def tests():
+    """Tests pour les classes WindLoads et WindLoadsBatch."""
+
+    from limit_state_design import LimitStatesDesign, LimitStatesDesignBatch
+
+    print("------START_TESTS------")
+
+    building = WindLoads("Gaspé", 20)
+    q = building._get_climate_info().wind
+    test1_windward = building.external_pressure("windward")
+    expected_result = q * 2**0.2 * 2.0 * 0.8
+    if abs(test1_windward - expected_result) > 1e-12:
+        print("test1_windward -> FAILED")
+        print("result = ", test1_windward)
+        print("expected = ", expected_result)
+    else:
+        print("test1_windward -> PASSED")
+
+    test2_exposure = (
+        WindLoads("Gaspé", 5)._exposure_factor(5),
+        WindLoads("Gaspé", 5, terrain="rough")._exposure_factor(5),
+        WindLoads("Gaspé", 5, limit_state="ÉLTS")._importance_factor(),
+    )
+    expected_result = 0.9, 0.7, 0.75
+    if test2_exposure != expected_result:
+        print("test2_exposure -> FAILED")
+        print("result = ", test2_exposure)
+        print("expected = ", expected_result)
+    else:
+        print("test2_exposure -> PASSED")
+
+    locations = np.array(["Gaspé", "Alma", "Amos"])[:, np.newaxis]
+    heights = np.array([10.0, 40.0, 90.0])[:, np.newaxis]
+    z = np.linspace(1, 90, 50)
+    options = {"importance": "Élevé", "terrain": "rough", "internal_category": 2}
+    batch = WindLoadsBatch(locations, heights, **options)
+    test3_batch = batch.net_pressures(z).tolist()
+    expected_result = [
+        [
+            [WindLoads(name, height, **options).net_pressure(face, level) for face in FACES]
+            for level in z.tolist()
+        ]
+        for name, height in zip(locations.ravel().tolist(), heights.ravel().tolist())
+    ]
+    if test3_batch != expected_result:
+        print("test3_batch -> FAILED")
+    else:
+        print("test3_batch -> PASSED")
+
+    low = WindLoadsBatch(["Gaspé", "Alma"], [6, 8])
+    test4_zones = low.zone_pressures([10, 35]).tolist()
+    expected_result = [
+        [WindLoads(name, height).zone_pressure(zone, slope) for zone in LOW_BUILDING_ZONES]
+        for name, height, slope in (("Gaspé", 6, 10), ("Alma", 8, 35))
+    ]
+    if test4_zones != expected_result:
+        print("test4_zones -> FAILED")
+        print("result = ", test4_zones)
+        print("expected = ", expected_result)
+    else:
+        print("test4_zones -> PASSED")
+
+    wind = batch.design_load("windward", z)
+    uls, _, _ = LimitStatesDesignBatch(dead=1.5, live=2.4, wind=wind).uls()
+    test5_chain = uls.shape, uls[2, -1]
+    expected_result = (3, 50), LimitStatesDesign(1.5, 2.4, wind=wind[2, -1]).uls()
+    if test5_chain != expected_result:
+        print("test5_chain -> FAILED")
+        print("result = ", test5_chain)
+        print("expected = ", expected_result)
+    else:
+        print("test5_chain -> PASSED")
+
+    print("-------END_TESTS-------")
+
+
+# RUN FILE
+if __name__ == "__main__":
+    tests()
+
+# END